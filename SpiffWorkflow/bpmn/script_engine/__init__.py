@@ -18,4 +18,5 @@
 # 02110-1301  USA
 
 from .python_engine import PythonScriptEngine, TaskDataEnvironment
-from .python_environment import  BasePythonScriptEngineEnvironment
\ No newline at end of file
+from .python_environment import  BasePythonScriptEngineEnvironment, CodeCache
+from .process_environment import ProcessPoolEnvironment
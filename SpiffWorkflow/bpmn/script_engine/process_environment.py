@@ -0,0 +1,156 @@
+# Copyright (C) 2023 Sartography
+#
+# This file is part of SpiffWorkflow.
+#
+# SpiffWorkflow is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3.0 of the License, or (at your option) any later version.
+#
+# SpiffWorkflow is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+import pickle
+import signal
+import traceback
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from types import ModuleType
+
+from SpiffWorkflow.util.persistent_dict import _same_value
+from .python_environment import TaskDataEnvironment
+
+# The environment used to execute scripts in a worker process (set when the worker starts)
+_worker_environment = None
+
+
+def _start_worker(environment_globals):
+    global _worker_environment
+    _worker_environment = TaskDataEnvironment(environment_globals)
+
+
+def _on_timeout(signum, frame):
+    raise TimeoutError('Script execution timed out')
+
+
+def _run_script(script, serialized_context, external_context, timeout):
+    """Execute a script in a worker process.
+
+    Returns:
+        tuple: the updated values, the deleted names, and the error raised by the script along with the line it was
+            raised from (or None)
+    """
+    context = pickle.loads(serialized_context)
+    if timeout is not None and hasattr(signal, 'setitimer'):
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        _worker_environment.execute(script, context, external_context)
+    except Exception as err:
+        line_number = 0
+        for frame_summary in traceback.extract_tb(err.__traceback__):
+            if frame_summary.filename == '<string>':
+                line_number = frame_summary.lineno
+        try:
+            pickle.dumps(err)
+        except Exception:
+            err = Exception(f'{err.__class__.__name__}: {err}')
+        return None, None, (err, line_number)
+    finally:
+        if timeout is not None and hasattr(signal, 'setitimer'):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    original = pickle.loads(serialized_context)
+    updates = dict(
+        (key, value) for key, value in context.items()
+        if not isinstance(value, ModuleType) and (key not in original or not _same_value(original[key], value))
+    )
+    deletions = [key for key in original if key not in context]
+    return updates, deletions, None
+
+
+def _raise_from_line(err, line_number):
+    # Raise the error from a frame with the line number it was raised from in the worker, so that the script engine
+    # reports the same line that it would for a script executed in this process
+    exec(compile('\n' * (line_number - 1) + 'raise err', '<string>', 'exec'), {'err': err})
+
+
+class ProcessPoolEnvironment(TaskDataEnvironment):
+    """Executes scripts in a pool of worker processes, so that long running scripts do not hold the GIL.
+
+    The script and a copy of the task data are sent to a worker, and the values that the script changed are copied
+    back into the task data.  Expressions are evaluated in this process, since they are usually cheap.
+
+    The globals are sent to each worker when it starts, so they must be picklable (eg, functions and classes defined
+    at the top level of a module), as must the task data and the external context.
+
+    Attributes:
+        max_workers (int): the number of worker processes (defaults to the number of processors)
+        timeout (float): the number of seconds a script may run for (optional)
+    """
+
+    def __init__(self, environment_globals=None, max_workers=None, timeout=None, mp_context=None, code_cache=None):
+        """
+        Arguments:
+            environment_globals (dict): the globals available to scripts and expressions
+            max_workers (int): the number of worker processes (defaults to the number of processors)
+            timeout (float): the number of seconds a script may run for (optional)
+            mp_context: the multiprocessing context used to start workers (optional)
+            code_cache (`CodeCache`): the cache of compiled expressions (optional)
+        """
+        super().__init__(environment_globals, code_cache)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.mp_context = mp_context
+        self._executor = None
+
+    @property
+    def executor(self):
+        """The pool of worker processes, which is started when the first script is executed."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=self.mp_context,
+                initializer=_start_worker,
+                initargs=(self.globals,),
+            )
+        return self._executor
+
+    def execute(self, script, context, external_context=None):
+        self.check_for_overwrite(context, external_context or {})
+        self._prepare_context(context)
+        future = self.executor.submit(_run_script, script, pickle.dumps(context), external_context, self.timeout)
+        try:
+            # Scripts are interrupted by the worker when they time out, unless they're stuck outside the interpreter
+            updates, deletions, error = future.result(timeout=None if self.timeout is None else self.timeout + 5)
+        except FutureTimeoutError:
+            self.shutdown(terminate=True)
+            raise TimeoutError('Script execution timed out')
+        if error is not None:
+            err, line_number = error
+            if isinstance(err, SyntaxError) or line_number == 0:
+                raise err
+            _raise_from_line(err, line_number)
+        context.update(updates)
+        for key in deletions:
+            context.pop(key, None)
+        return True
+
+    def shutdown(self, terminate=False):
+        """Stop the worker processes; a new pool is started if another script is executed.
+
+        Arguments:
+            terminate (bool): stop the workers immediately rather than waiting for running scripts to finish
+        """
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            if terminate:
+                for process in list((executor._processes or {}).values()):
+                    process.terminate()
+            executor.shutdown(wait=not terminate, cancel_futures=terminate)
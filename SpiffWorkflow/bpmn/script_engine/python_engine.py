@@ -18,6 +18,7 @@
 # 02110-1301  USA
 
 import ast
+import copy
 import sys
 import traceback
 
@@ -37,12 +38,58 @@ class PythonScriptEngine:
     expressions in a different way.
     """
 
-    def __init__(self, environment=None):
+    def __init__(self, environment=None, service_executor=None):
+        """
+        Arguments:
+            environment (`BasePythonScriptEngineEnvironment`): the environment used to run scripts and call services
+            service_executor (`concurrent.futures.Executor`): if provided, service calls are submitted to the executor
+                and service tasks are completed when their calls finish (see `BpmnWorkflow.complete_service_tasks`)
+        """
         self.environment = environment or TaskDataEnvironment()
+        self.service_executor = service_executor
+
+    @property
+    def code_cache(self):
+        """The environment's cache of compiled expressions and scripts (see `CodeCache`)."""
+        return self.environment.code_cache
 
     def validate(self, expression):
         ast.parse(expression)
 
+    def precompile(self, spec):
+        """Compile the expressions and scripts of a process spec and add them to the code cache.
+
+        Sources that cannot be compiled are skipped; errors are reported when they are evaluated.
+
+        Arguments:
+            spec (`BpmnProcessSpec`): the spec
+        """
+        for task_spec in spec.task_specs.values():
+            for source, mode in self._get_sources(task_spec):
+                if isinstance(source, str):
+                    try:
+                        self.code_cache.compile(source, mode)
+                    except SyntaxError:
+                        pass
+
+    def _get_sources(self, task_spec):
+        """Returns the scripts and expressions of a task spec, along with their compilation modes."""
+        for attr in ['script', 'prescript', 'postscript']:
+            yield getattr(task_spec, attr, None), 'exec'
+        for attr in ['cardinality', 'condition']:
+            yield getattr(task_spec, attr, None), 'eval'
+        for condition, spec_name in getattr(task_spec, 'cond_task_specs', []):
+            if condition is not None:
+                yield condition.args[0], 'eval'
+        event_definitions = [getattr(task_spec, 'event_definition', None)]
+        while event_definitions:
+            event_definition = event_definitions.pop()
+            if event_definition is not None:
+                yield getattr(event_definition, 'expression', None), 'eval'
+                for prop in getattr(event_definition, 'correlation_properties', []):
+                    yield prop.retrieval_expression, 'eval'
+                event_definitions.extend(getattr(event_definition, 'event_definitions', []))
+
     def evaluate(self, task, expression, external_context=None):
         """
         Evaluate the given expression, within the context of the given task and
@@ -65,12 +112,25 @@ class PythonScriptEngine:
             raise wte
 
     def call_service(self, task, **kwargs):
-        """Override to control how external services are called from service tasks."""
+        """Override to control how external services are called from service tasks.
+
+        If a `concurrent.futures.Future` is returned, the task is left STARTED until the call finishes.
+        """
+        if self.service_executor is not None:
+            # The workflow may change the task data while the call is running
+            return self.service_executor.submit(self.environment.call_service, copy.deepcopy(task.data), **kwargs)
         try:
             return self.environment.call_service(task.data, **kwargs)
         except Exception as err:
-            wte = self.create_task_exec_exception(task, script, err)
-            raise wte
+            raise self.create_service_exception(task, err)
+
+    def create_service_exception(self, task, err):
+        if isinstance(err, SpiffWorkflowException):
+            return err
+        detail = err.__class__.__name__
+        if len(err.args) > 0:
+            detail += ":" + str(err.args[0])
+        return WorkflowTaskException(detail, task=task, exception=err)
 
     def create_task_exec_exception(self, task, script, err):
         line_number, error_line = self.get_error_line_number_and_content(script, err)
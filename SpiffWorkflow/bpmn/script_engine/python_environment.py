@@ -17,12 +17,72 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
-import copy
+import builtins as _builtins
+from collections import OrderedDict
+from collections.abc import Mapping
+
+
+class CodeCache:
+    """A cache of compiled code objects, keyed by source text and compilation mode.
+
+    Expressions and scripts are compiled once and the least recently used code objects are removed when the cache is
+    full, so that evaluating the same expression repeatedly does not require parsing it each time.
+
+    Attributes:
+        maxsize (int): the maximum number of code objects to keep
+        code (OrderedDict): compiled code objects, from least to most recently used
+        hits (int): the number of times compiled code was found in the cache
+        misses (int): the number of times source had to be compiled
+    """
+
+    def __init__(self, maxsize=1024):
+        """Create a code cache.
+
+        Arguments:
+            maxsize (int): the maximum number of code objects to keep
+        """
+        self.maxsize = maxsize
+        self.code = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source, mode):
+        """Get the compiled code for the source, compiling it if it is not in the cache.
+
+        Arguments:
+            source (str): the source text
+            mode (str): 'eval' for an expression or 'exec' for a script
+
+        Returns:
+            the code object
+
+        Raises:
+            `SyntaxError`: if the source cannot be compiled
+        """
+        key = (source, mode)
+        code = self.code.get(key)
+        if code is not None:
+            self.hits += 1
+            self.code.move_to_end(key)
+            return code
+        self.misses += 1
+        code = compile(source, '<string>', mode)
+        self.code[key] = code
+        if len(self.code) > self.maxsize:
+            self.code.popitem(last=False)
+        return code
+
+    def clear(self):
+        """Remove all code objects and reset the counters."""
+        self.code.clear()
+        self.hits = 0
+        self.misses = 0
 
 
 class BasePythonScriptEngineEnvironment:
-    def __init__(self, environment_globals=None):
+    def __init__(self, environment_globals=None, code_cache=None):
         self.globals = environment_globals or {}
+        self.code_cache = code_cache if code_cache is not None else CodeCache()
 
     def evaluate(self, expression, context, external_context=None):
         raise NotImplementedError("Subclass must implement this method")
@@ -34,25 +94,116 @@ class BasePythonScriptEngineEnvironment:
         raise NotImplementedError("Subclass must implement this method.")
 
 
+class TaskDataNamespace(dict):
+    """The globals used by `TaskDataEnvironment` to evaluate expressions and execute scripts.
+
+    Names are looked up in the task data, then in the external context, then in the environment's globals, then in
+    the builtins, so none of them are copied.  The value found is stored in the namespace, so a name is only looked
+    up the first time it is used and later lookups are as fast as they are in a plain dict.  If the namespace is
+    writable, names are assigned in the namespace and `write_back` copies the ones that changed to the task data,
+    so that only those names need to be checked afterwards.
+
+    Attributes:
+        context (dict): the task data
+        maps (list(dict)): the mappings that names are looked up in, in order
+        assigned (set(str)): the names written to the task data
+    """
+
+    def __init__(self, context, external_context, environment_globals, writable=False):
+        builtins = environment_globals.get('__builtins__', _builtins)
+        super().__init__(__builtins__=builtins)
+        self.context = context
+        self.maps = [
+            context,
+            external_context or {},
+            environment_globals,
+            builtins if isinstance(builtins, dict) else vars(builtins),
+        ]
+        self.writable = writable
+        self.assigned = set()
+        # The values that were looked up, so that names that were not changed are not written to the task data
+        self.found = {}
+        # Task data names deleted by the script
+        self.deleted = set()
+
+    def __missing__(self, key):
+        for mapping in self.maps:
+            if key in mapping and (mapping is not self.context or key not in self.deleted):
+                value = mapping[key]
+                dict.__setitem__(self, key, value)
+                self.found[key] = value
+                return value
+        raise KeyError(key)
+
+    # Scripts can check for names with `globals()` or `vars()`, which return the namespace
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or any(
+            key in mapping and (mapping is not self.context or key not in self.deleted) for mapping in self.maps[:3]
+        )
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __delitem__(self, key):
+        found = dict.__contains__(self, key)
+        if found:
+            dict.__delitem__(self, key)
+            self.found.pop(key, None)
+        if self.writable and key in self.context and key not in self.deleted:
+            self.deleted.add(key)
+            found = True
+        if not found:
+            raise NameError(f"name '{key}' is not defined")
+
+    def write_back(self):
+        """Copy the names that were assigned or deleted to the task data."""
+        found, context, missing = self.found, self.context, object()
+        written = set()
+        for key, value in list(self.items()):
+            if key != '__builtins__' and found.get(key, missing) is not value:
+                dict.__delitem__(self, key)
+                context[key] = value
+                written.add(key)
+        for key in self.deleted - written:
+            context.pop(key, None)
+        self.assigned.update(written)
+        self.deleted.clear()
+
+
 class TaskDataEnvironment(BasePythonScriptEngineEnvironment):
+    """Evaluates expressions and executes scripts using the task data as globals.
+
+    A `TaskDataNamespace` is used rather than a copy of the task data, so the cost of an evaluation depends on the
+    names it uses rather than the size of the task data.  Values assigned by scripts are written to the task data,
+    except for functions and names that are also defined in the environment's globals or the external context.
+
+    Note:
+        Names can be looked up in `globals()` (eg, `'x' in globals()` or `globals().get('x')`), but iterating over it
+        only returns the names the script has used or stored there itself, not all of the task data.
+    """
 
     def evaluate(self, expression, context, external_context=None):
-        my_globals = copy.copy(self.globals)  # else we pollute all later evals.
         self._prepare_context(context)
-        my_globals.update(external_context or {})
-        my_globals.update(context)
-        return eval(expression, my_globals)
+        if not isinstance(context, Mapping):
+            # Contexts that aren't mappings (eg, message payloads) are interpreted the way `dict.update` would
+            context = dict(context)
+        namespace = TaskDataNamespace(context, external_context, self.globals)
+        return eval(self.code_cache.compile(expression, 'eval'), namespace)
 
     def execute(self, script, context, external_context=None):
         self.check_for_overwrite(context, external_context or {})
-        my_globals = copy.copy(self.globals)
         self._prepare_context(context)
-        my_globals.update(external_context or {})
-        context.update(my_globals)
+        namespace = TaskDataNamespace(context, external_context, self.globals, writable=True)
         try:
-            exec(script, context)
+            exec(self.code_cache.compile(script, 'exec'), namespace)
         finally:
-            self._remove_globals_and_functions_from_context(context, external_context)
+            namespace.write_back()
+            if type(self)._remove_globals_and_functions_from_context is not \
+                    TaskDataEnvironment._remove_globals_and_functions_from_context:
+                # Respect subclasses that customize the cleanup
+                self._remove_globals_and_functions_from_context(context, external_context)
+            else:
+                self._remove_assigned_globals_and_functions(context, external_context, namespace.assigned)
         return True
 
     def _prepare_context(self, context):
@@ -61,7 +212,11 @@ class TaskDataEnvironment(BasePythonScriptEngineEnvironment):
     def _remove_globals_and_functions_from_context(self, context, external_context=None):
         """When executing a script, don't leave the globals, functions
         and external methods in the context that we have modified."""
-        for k in list(context):
+        self._remove_assigned_globals_and_functions(context, external_context, list(context))
+
+    def _remove_assigned_globals_and_functions(self, context, external_context, keys):
+        """Remove the globals, functions and external methods among the names assigned by a script."""
+        for k in [k for k in keys if k in context]:
             if k == "__builtins__" or \
                     hasattr(context[k], '__call__') or \
                     k in self.globals or \
@@ -73,8 +228,8 @@ class TaskDataEnvironment(BasePythonScriptEngineEnvironment):
         same name as a pre-defined script, rendering the script un-callable.
         This results in a nearly indecipherable error.  Better to fail
         fast with a sensible error message."""
-        func_overwrites = set(self.globals).intersection(context)
-        func_overwrites.update(set(external_context).intersection(context))
+        func_overwrites = set(k for k in self.globals if k in context)
+        func_overwrites.update(k for k in external_context if k in context)
         if len(func_overwrites) > 0:
             msg = f"You have task data that overwrites a predefined " \
                   f"function(s). Please change the following variable or " \
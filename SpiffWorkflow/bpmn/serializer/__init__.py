@@ -18,5 +18,6 @@
 # 02110-1301  USA
 
 from .workflow import BpmnWorkflowSerializer
+from .spec_cache import SpecCache
 from .config import DEFAULT_CONFIG
 from .helpers import DefaultRegistry
\ No newline at end of file
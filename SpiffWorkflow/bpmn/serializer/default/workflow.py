@@ -17,14 +17,21 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
+import logging
+from functools import reduce
 from uuid import UUID
 
 from SpiffWorkflow.task import TaskState
 from SpiffWorkflow.bpmn.specs.mixins.subworkflow_task import SubWorkflowTask
 from SpiffWorkflow.bpmn.specs.mixins.events.event_types import CatchingEvent
+from SpiffWorkflow.bpmn.util.subworkflow import DeferredTasks
 from SpiffWorkflow.util.deep_merge import DeepMerge
 
 from ..helpers.bpmn_converter import BpmnConverter
+from ..helpers.encoder import DeferredMapping
+from ..helpers.task_table import is_task_table, tasks_to_table, table_to_tasks, get_task_column
+
+logger = logging.getLogger('spiff.serializer')
 
 class TaskConverter(BpmnConverter):
 
@@ -33,13 +40,17 @@ class TaskConverter(BpmnConverter):
         # instead of the full materialized data when task has a parent
 
         if task.parent is None:
-            data = task.data
+            data = dict(task._peek_data())
             delta = {}
+        elif task._peek_data() is task.parent._peek_data():
+            # The task is still sharing its parent's data
+            data = {}
+            delta = {'updates': {}, 'deletions': []}
         else:
             data = {}
             delta = {
-                'updates': DeepMerge.get_updated_keys(task.parent.data, task.data),
-                'deletions': DeepMerge.get_deleted_keys(task.parent.data, task.data),
+                'updates': DeepMerge.get_updated_keys(task.parent._peek_data(), task._peek_data()),
+                'deletions': DeepMerge.get_deleted_keys(task.parent._peek_data(), task._peek_data()),
             }
 
         return {
@@ -50,7 +61,7 @@ class TaskConverter(BpmnConverter):
             'state': task.state,
             'task_spec': task.task_spec.name,
             'triggered': task.triggered,
-            'internal_data': self.registry.convert(task.internal_data),
+            'internal_data': self.registry.convert(task._peek_internal_data()),
             'data': data,
             'delta': delta
         }
@@ -69,15 +80,19 @@ class TaskConverter(BpmnConverter):
 
         delta = dct.get('delta')
         if delta and task.parent is not None:
-            data = DeepMerge.merge({}, task.parent.data)
-            data.update(self.registry.restore(delta.get('updates', {})))
-            for key in delta.get('deletions', {}):
-                if key in data:
-                    del data[key]
+            if workflow.persistent_data:
+                data = task.parent.snapshot_data().update(self.registry.restore(delta.get('updates', {})))
+                for key in delta.get('deletions', {}):
+                    if key in data:
+                        data = data.delete(key)
+                task.data = data
+            elif not delta.get('updates') and not delta.get('deletions'):
+                task._share_data(task.parent)
+            else:
+                # Unchanged values are shared with the parent until the data is accessed
+                task._borrow_data(task.parent, self.registry.restore(delta.get('updates', {})), delta.get('deletions', []))
         else:
-            data = self.registry.restore(dct['data'])
-
-        task.data = data
+            task.data = self.registry.restore(dct['data'])
 
         return task
 
@@ -92,8 +107,8 @@ class SimpleTaskConverter(BpmnConverter):
             'state': task.state,
             'task_spec': task.task_spec.name,
             'triggered': task.triggered,
-            'internal_data': self.registry.convert(task.internal_data),
-            'data': self.registry.convert(self.registry.clean(task.data)),
+            'internal_data': self.registry.convert(task._peek_internal_data()),
+            'data': self.registry.convert(self.registry.clean(dict(task._peek_data()))),
         }
 
     def from_dict(self, dct, workflow):
@@ -128,18 +143,52 @@ class BpmnEventConverter(BpmnConverter):
 
 class WorkflowConverter(BpmnConverter):
 
-    def to_dict(self, workflow):
-        """Get a dictionary of attributes associated with both top level and subprocesses"""
+    def to_dict(self, workflow, changed=None):
+        """Get a dictionary of attributes associated with both top level and subprocesses
+
+        Tasks are stored in a table (see `tasks_to_table`).  If a list of changed task ids is provided, only those
+        tasks are included, as a mapping of task id to task.
+        """
+        if changed is None:
+            tasks = tasks_to_table(self.mapping_to_dict(workflow.tasks))
+        else:
+            tasks = self.mapping_to_dict(
+                dict((task_id, workflow.tasks[task_id]) for task_id in changed if task_id in workflow.tasks)
+            )
         return {
             'data': self.registry.convert(self.registry.clean(workflow.data)),
             'correlations': workflow.correlations,
             'last_task': str(workflow.last_task.id) if workflow.last_task is not None else None,
             'success': workflow.success,
             'completed': workflow.completed,
-            'tasks': self.mapping_to_dict(workflow.tasks),
+            'tasks': tasks,
             'root': str(workflow.task_tree.id),
         }
 
+    def tasks_from_dict(self, dct, workflow):
+        """Restore the tasks of a workflow from either a task table or a mapping of task id to task.
+
+        Tasks that cannot be reached from the root are not restored, and a warning listing them is logged.
+        """
+        tasks = table_to_tasks(dct['tasks']) if is_task_table(dct['tasks']) else dct['tasks']
+        # Earlier versions of the 1.1 migration could leave tasks that are not connected to the tree in workflows
+        # that were migrated and then saved; they would be counted as unfinished and prevent the workflow from
+        # completing
+        reachable, pending = set(), [dct['root']]
+        while len(pending) > 0:
+            task_id = pending.pop()
+            if task_id in tasks and task_id not in reachable:
+                reachable.add(task_id)
+                pending.extend(tasks[task_id]['children'])
+        if len(reachable) != len(tasks):
+            dropped = [task_id for task_id in tasks if task_id not in reachable]
+            logger.warning(
+                f'Dropped {len(dropped)} serialized tasks that are not connected to the task tree',
+                extra={'workflow_spec': workflow.spec.name, 'task_ids': dropped},
+            )
+            tasks = dict((task_id, task) for task_id, task in tasks.items() if task_id in reachable)
+        return self.mapping_from_dict(tasks, UUID, workflow=workflow)
+
     def set_default_attributes(self, workflow, dct):
         workflow.success = dct['success']
         workflow.completed = dct.get('completed', False)
@@ -150,16 +199,57 @@ class WorkflowConverter(BpmnConverter):
 
 class BpmnSubWorkflowConverter(WorkflowConverter):
 
-    def to_dict(self, workflow):
-        dct = super().to_dict(workflow)
+    def to_dict(self, workflow, changed=None):
+        deferred = workflow._deferred_tasks
+        if deferred is not None:
+            # The tasks have not been restored, so they are unchanged since the subprocess was deserialized
+            dct = dict(deferred.serialization)
+            if changed is not None:
+                dct['tasks'] = {}
+            elif is_task_table(dct['tasks']):
+                dct['tasks'] = dict(dct['tasks'])
+            else:
+                # Patches are applied to tasks stored as a mapping
+                dct['tasks'] = tasks_to_table(dct['tasks'])
+            dct['correlations'] = workflow.correlations
+            dct['success'] = workflow.success
+            dct['completed'] = workflow.completed
+            return dct
+        dct = super().to_dict(workflow, changed)
         dct['parent_task_id'] = str(workflow.parent_task_id)
         dct['spec'] = workflow.spec.name
         return dct
 
-    def from_dict(self, dct, task, top_workflow):
+    def from_dict(self, dct, task, top_workflow, lazy=False):
+        """Restore a subprocess.
+
+        :param dct: the dictionary representation
+        :param task: the task that created the subprocess
+        :param top_workflow: the top level workflow
+        :param lazy: whether to postpone restoring the tasks until they are used, if they are all finished
+
+        Returns:
+            the subprocess
+        """
         spec = top_workflow.subprocess_specs.get(task.task_spec.spec)
         subprocess = self.target_class(spec, task.id, top_workflow, deserializing=True)
-        subprocess.tasks = self.mapping_from_dict(dct['tasks'], UUID, workflow=subprocess)
+        states = get_task_column(dct['tasks'], 'state')
+        if lazy and all(state & TaskState.FINISHED_MASK for state in states):
+            def load():
+                subprocess.tasks = self.tasks_from_dict(dct, subprocess)
+                subprocess.task_tree = subprocess.tasks.get(UUID(dct['root']))
+                if isinstance(dct['last_task'], str):
+                    subprocess.last_task = subprocess.tasks.get(UUID(dct['last_task']))
+                else:
+                    subprocess.last_task = None
+                subprocess.data = self.registry.restore(dct.get('data', {}))
+            subprocess.success = dct['success']
+            subprocess.completed = dct.get('completed', False)
+            subprocess.correlations = dct.get('correlations', {})
+            mask = reduce(lambda x, y: x | y, set(states), 0)
+            subprocess._defer_tasks(DeferredTasks(load, get_task_column(dct['tasks'], 'id'), mask, dct))
+            return subprocess
+        subprocess.tasks = self.tasks_from_dict(dct, subprocess)
         subprocess.task_tree = subprocess.tasks.get(UUID(dct['root']))
         self.set_default_attributes(subprocess, dct)
         return subprocess
@@ -167,25 +257,58 @@ class BpmnSubWorkflowConverter(WorkflowConverter):
 
 class BpmnWorkflowConverter(WorkflowConverter):
 
-    def to_dict(self, workflow):
+    def to_dict(self, workflow, changed=None, include_specs=True, streaming=False):
         """Return a JSON-serializable dictionary representation of the workflow.
 
+        If a list of changed task ids is provided, a patch is created instead: only the changed tasks are
+        included, the specs are omitted, and subprocesses that are completed and have no changed tasks are
+        represented by None.
+
         :param workflow: the workflow
+        :param changed: the ids of the tasks to include (optional)
+        :param include_specs: whether to include the workflow and subprocess specs
+        :param streaming: whether to defer converting subprocesses until they are encoded
 
         Returns:
             a dictionary representation of the workflow
         """
+        if changed is not None:
+            return self.to_patch_dict(workflow, changed)
         dct = super().to_dict(workflow)
-        dct['spec'] = self.registry.convert(workflow.spec)
-        dct['subprocess_specs'] = self.mapping_to_dict(workflow.subprocess_specs)
-        dct['subprocesses'] = self.mapping_to_dict(workflow.subprocesses)
+        if include_specs:
+            dct['spec'] = self.registry.convert(workflow.spec)
+            dct['subprocess_specs'] = self.mapping_to_dict(workflow.subprocess_specs)
+        if streaming:
+            dct['subprocesses'] = DeferredMapping(workflow.subprocesses, self.registry.convert)
+        else:
+            dct['subprocesses'] = self.mapping_to_dict(workflow.subprocesses)
         dct['bpmn_events'] = self.registry.convert(workflow.bpmn_events)
+        dct['copy_on_write_data'] = workflow.copy_on_write_data
+        dct['persistent_data'] = workflow.persistent_data
         return dct
 
-    def from_dict(self, dct):
+    def to_patch_dict(self, workflow, changed):
+        dct = super().to_dict(workflow, changed)
+        subprocesses = {}
+        for task_id, sp in workflow.subprocesses.items():
+            if sp.completed and (
+                sp._deferred_tasks is not None or not any(changed_id in sp.tasks for changed_id in changed)
+            ):
+                subprocesses[str(task_id)] = None
+            else:
+                subprocesses[str(task_id)] = self.registry.convert(sp, changed=changed)
+        dct['subprocesses'] = subprocesses
+        dct['bpmn_events'] = self.registry.convert(workflow.bpmn_events)
+        return dct
+
+    def from_dict(self, dct, lazy=False):
         """Create a workflow based on a dictionary representation.
 
+        If lazy is set, completed subprocesses that contain no other subprocesses are not fully restored: their
+        tasks are restored when they are first used (eg, by `get_task_from_id`, iteration or a reset).
+
         :param dct: the dictionary representation
+        :param lazy: whether to postpone restoring the tasks of completed subprocesses
 
         Returns:
             a BPMN Workflow object
@@ -195,27 +318,39 @@ class BpmnWorkflowConverter(WorkflowConverter):
         subprocess_specs = self.mapping_from_dict(dct.pop('subprocess_specs', {}))
 
         # Create the top-level workflow
-        workflow = self.target_class(spec, subprocess_specs, deserializing=True)
+        workflow = self.target_class(
+            spec,
+            subprocess_specs,
+            deserializing=True,
+            copy_on_write_data=dct.pop('copy_on_write_data', False),
+            persistent_data=dct.pop('persistent_data', False),
+        )
 
         # Restore the task tree
-        workflow.tasks = self.mapping_from_dict(dct['tasks'], UUID, workflow=workflow)
+        workflow.tasks = self.tasks_from_dict(dct, workflow)
         workflow.task_tree = workflow.tasks.get(UUID(dct['root']))
 
         # Restore other default attributes
         self.set_default_attributes(workflow, dct)
 
         # Handle the remaining top workflow attributes
-        self.subprocesses_from_dict(dct['subprocesses'], workflow)
+        self.subprocesses_from_dict(dct['subprocesses'], workflow, lazy=lazy)
         workflow.bpmn_events = self.registry.restore(dct.pop('bpmn_events', []))
 
         return workflow
 
-    def subprocesses_from_dict(self, dct, workflow, top_workflow=None):
+    def subprocesses_from_dict(self, dct, workflow, top_workflow=None, lazy=False):
         # This ensures we create parent workflows before their children; we need the tasks they're associated with
         top_workflow = top_workflow or workflow
         for task in workflow.tasks.values():
             if isinstance(task.task_spec, SubWorkflowTask) and str(task.id) in dct:
-                sp = self.registry.restore(dct.pop(str(task.id)), task=task, top_workflow=top_workflow)
+                sp_dct = dct.pop(str(task.id))
+                # Subprocesses that contain other subprocesses are always restored, since we need their tasks
+                defer = lazy and sp_dct.get('completed', False) and \
+                    not any(task_id in dct for task_id in get_task_column(sp_dct['tasks'], 'id'))
+                sp = self.registry.restore(sp_dct, task=task, top_workflow=top_workflow, lazy=defer)
                 top_workflow.subprocesses[task.id] = sp
+                task._invalidate_subtree_states()
                 sp.completed_event.connect(task.task_spec._on_subworkflow_completed, task)
-                self.subprocesses_from_dict(dct, sp, top_workflow)
+                if sp._deferred_tasks is None:
+                    self.subprocesses_from_dict(dct, sp, top_workflow, lazy)
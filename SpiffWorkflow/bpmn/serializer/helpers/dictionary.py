@@ -56,6 +56,8 @@ class DictionaryConverter:
         self.convert_to_dict = { }
         self.convert_from_dict = { }
         self.typenames = { }
+        # The conversion function for each class that has been converted, so that it is looked up only once
+        self._dispatch = { }
 
     def register(self, cls, to_dict, from_dict, typename=None):
         """Register a conversion/restoration.
@@ -74,6 +76,7 @@ class DictionaryConverter:
         self.typenames[cls] = typename
         self.convert_to_dict[typename] = partial(self._obj_to_dict, typename, to_dict)
         self.convert_from_dict[typename] = partial(self._obj_from_dict, from_dict)
+        self._dispatch.clear()
 
     @staticmethod
     def _obj_to_dict(typename, func, obj, **kwargs):
@@ -101,16 +104,44 @@ class DictionaryConverter:
         Returns:
             dict: the dictionary representation for registered objects or the original for unregistered objects
         """
-        typename = self.typenames.get(obj.__class__)
+        cls = obj.__class__
+        if cls in _JSON_PRIMITIVE_TYPES:
+            return obj
+        to_dict = self._dispatch.get(cls)
+        if to_dict is None:
+            to_dict = self._get_dispatch(cls)
+        return to_dict(obj, **kwargs)
+
+    def _get_dispatch(self, cls):
+        """Find the conversion function for a class and add it to the dispatch table."""
+        typename = self.typenames.get(cls)
         if typename in self.convert_to_dict:
-            to_dict = self.convert_to_dict.get(typename)
-            return to_dict(obj, **kwargs)
-        elif isinstance(obj, dict):
-            return {k: self.convert(v, **kwargs) for k, v in obj.items()}
-        elif isinstance(obj, (list, tuple, set)):
-            return obj.__class__([ self.convert(item, **kwargs) for item in obj ])
+            to_dict = self.convert_to_dict[typename]
+        elif issubclass(cls, dict):
+            to_dict = self._convert_dict
+        elif issubclass(cls, (list, tuple, set)):
+            to_dict = self._convert_collection
         else:
-            return obj
+            to_dict = self._convert_unknown
+        self._dispatch[cls] = to_dict
+        return to_dict
+
+    def _convert_dict(self, obj, **kwargs):
+        # Checking for primitive values here avoids a call for each of them
+        return {
+            k: v if v.__class__ in _JSON_PRIMITIVE_TYPES else self.convert(v, **kwargs)
+            for k, v in obj.items()
+        }
+
+    def _convert_collection(self, obj, **kwargs):
+        return obj.__class__([
+            item if item.__class__ in _JSON_PRIMITIVE_TYPES else self.convert(item, **kwargs)
+            for item in obj
+        ])
+
+    @staticmethod
+    def _convert_unknown(obj, **kwargs):
+        return obj
 
     def restore(self, val, **kwargs):
         """Restore a known object from a dictionary.
@@ -136,10 +167,13 @@ class DictionaryConverter:
                 dct = dict(val)
                 del dct['typename']
                 return from_dict(dct, **kwargs)
-            return {k: self.restore(v, **kwargs) for k, v in val.items()}
+            return {
+                k: v if v.__class__ in _JSON_PRIMITIVE_TYPES else self.restore(v, **kwargs)
+                for k, v in val.items()
+            }
 
         if val_type is list:
-            return [self.restore(item, **kwargs) for item in val]
+            return [item if item.__class__ in _JSON_PRIMITIVE_TYPES else self.restore(item, **kwargs) for item in val]
         if val_type is tuple:
             return tuple(self.restore(item, **kwargs) for item in val)
         if val_type is set:
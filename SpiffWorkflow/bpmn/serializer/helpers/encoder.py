@@ -17,3 +17,51 @@ def create_encoder(registry, user_encoder_cls=None):
             return super().default(obj)
 
     return SpiffEncoder
+
+
+def create_msgpack_default(registry):
+    """Create a function that converts objects msgpack cannot serialize, as `SpiffEncoder` does for JSON."""
+
+    def default(obj):
+        typename = registry.typenames.get(type(obj))
+        if typename is not None:
+            return registry.convert_to_dict[typename](obj)
+        if callable(obj) or isinstance(obj, ModuleType):
+            return None
+        if isinstance(obj, set):
+            return list(obj)
+        raise TypeError(f'Object of type {obj.__class__.__name__} is not serializable')
+
+    return default
+
+
+class DeferredMapping:
+    """A mapping whose keys and values are converted when it is encoded by `stream_encode`."""
+
+    def __init__(self, mapping, convert):
+        self.mapping = mapping
+        self.convert = convert
+
+    def items(self):
+        for key, value in self.mapping.items():
+            yield str(key), self.convert(value)
+
+
+def stream_encode(obj, encoder):
+    """Generate the JSON encoding of an object in chunks.
+
+    The result is identical to `encoder.encode(obj)` for an object with `DeferredMapping`s replaced by the
+    dictionaries they produce, but only one converted item of each mapping is in memory at a time.  Deferred
+    mappings are found in the object itself and in the dictionaries that it or other deferred mappings contain.
+    """
+    if isinstance(obj, DeferredMapping) or (
+        isinstance(obj, dict) and any(isinstance(value, DeferredMapping) for value in obj.values())
+    ):
+        separator = '{'
+        for key, value in obj.items():
+            yield separator + encoder.encode(key) + ': '
+            yield from stream_encode(value, encoder)
+            separator = ', '
+        yield '{}' if separator == '{' else '}'
+    else:
+        yield encoder.encode(obj)
@@ -21,7 +21,7 @@ from types import ModuleType
 from uuid import UUID
 from datetime import datetime, timedelta
 
-from .dictionary import DictionaryConverter
+from .dictionary import DictionaryConverter, _JSON_PRIMITIVE_TYPES
 
 class DefaultRegistry(DictionaryConverter):
     """This class forms the basis of serialization for BPMN workflows.
@@ -38,24 +38,29 @@ class DefaultRegistry(DictionaryConverter):
         self.register(datetime, lambda v:  { 'value': v.isoformat() }, lambda v: datetime.fromisoformat(v['value']))
         self.register(timedelta, lambda v: { 'days': v.days, 'seconds': v.seconds }, lambda v: timedelta(**v))
 
-    def convert(self, obj):
+    def convert(self, obj, **kwargs):
         """Convert an object to a dictionary, with preprocessing.
 
         Arguments:
             obj: the object to preprocess and convert
 
+        Keyword arguments:
+            optional keyword args that will be passed to the `to_dict` method of the object's converter
+
         Returns:
             the result of `convert` conversion after preprocessing
         """
+        if obj.__class__ in _JSON_PRIMITIVE_TYPES:
+            return obj
         if self._encoder_mode:
-            return self._convert_for_encoder(obj)
+            return self._convert_for_encoder(obj, **kwargs)
         cleaned = self.clean(obj)
-        return super().convert(cleaned)
+        return super().convert(cleaned, **kwargs)
 
-    def _convert_for_encoder(self, obj):
+    def _convert_for_encoder(self, obj, **kwargs):
         typename = self.typenames.get(obj.__class__)
         if typename in self.convert_to_dict:
-            return self.convert_to_dict[typename](obj)
+            return self.convert_to_dict[typename](obj, **kwargs)
         elif isinstance(obj, dict):
             return self.clean(obj)
         else:
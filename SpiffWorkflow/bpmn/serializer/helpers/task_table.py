@@ -0,0 +1,139 @@
+# Copyright (C) 2023 Sartography
+#
+# This file is part of SpiffWorkflow.
+#
+# SpiffWorkflow is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3.0 of the License, or (at your option) any later version.
+#
+# SpiffWorkflow is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+STRUCTURAL_KEYS = ('id', 'parent', 'children')
+# Attributes with few distinct values, which are stored once and referred to by index
+ENCODED_KEYS = ('task_spec', 'typename')
+
+
+def is_task_table(tasks):
+    """Check whether serialized tasks are stored in a table rather than a mapping of task id to task."""
+    return 'ids' in tasks and 'columns' in tasks
+
+
+def tasks_to_table(tasks):
+    """Convert a dictionary of serialized tasks into a table of columns.
+
+    Parents are stored as indexes into the table (-1 for no parent).  Children are not stored if they are the
+    tasks that list the task as their parent, in the order they appear in the table; otherwise the list of child
+    indexes is stored separately.  A task whose parent or children are not in the table has their ids stored
+    instead.  Every other attribute is stored in a column of its own; task spec names and typenames are stored
+    once and the column contains their indexes.
+
+    Arguments:
+        tasks (dict): a mapping of task id to the serialized task, as produced by `TaskConverter.to_dict`
+
+    Returns:
+        dict: the task table
+
+    Raises:
+        `ValueError`: if the tasks do not all have the same attributes
+    """
+    ids = list(tasks)
+    index = dict((task_id, idx) for idx, task_id in enumerate(ids))
+    parents, derived_children = [], [[] for task_id in ids]
+    for task in tasks.values():
+        parent = task['parent']
+        parents.append(-1 if parent is None else index.get(parent, parent))
+        if parent in index:
+            derived_children[index[parent]].append(task['id'])
+
+    children, columns, values, lookups = {}, {}, {}, {}
+    for idx, task in enumerate(tasks.values()):
+        if task['children'] != derived_children[idx]:
+            if all(child in index for child in task['children']):
+                children[str(idx)] = [index[child] for child in task['children']]
+            else:
+                children[str(idx)] = task['children']
+        for key, value in task.items():
+            if key in STRUCTURAL_KEYS:
+                continue
+            if key in ENCODED_KEYS:
+                lookup = lookups.setdefault(key, {})
+                if value not in lookup:
+                    lookup[value] = len(lookup)
+                    values.setdefault(key, []).append(value)
+                value = lookup[value]
+            columns.setdefault(key, []).append(value)
+    if any(len(column) != len(ids) for column in columns.values()):
+        raise ValueError('Tasks must have the same attributes to be stored in a table')
+
+    return {
+        'ids': ids,
+        'parents': parents,
+        'children': children,
+        'columns': columns,
+        'values': values,
+    }
+
+
+def table_to_tasks(table):
+    """Convert a task table created by `tasks_to_table` back into a dictionary of serialized tasks.
+
+    Arguments:
+        table (dict): the task table
+
+    Returns:
+        dict: a mapping of task id to serialized task
+    """
+    ids = table['ids']
+    children = [[] for task_id in ids]
+    parents = []
+    for idx, parent in enumerate(table['parents']):
+        if isinstance(parent, str):
+            parents.append(parent)
+        elif parent < 0:
+            parents.append(None)
+        else:
+            parents.append(ids[parent])
+            children[parent].append(ids[idx])
+    for idx, stored in table['children'].items():
+        children[int(idx)] = [ids[child] if isinstance(child, int) else child for child in stored]
+
+    columns = dict(table['columns'])
+    for key, values in table['values'].items():
+        columns[key] = [values[value] for value in columns[key]]
+    tasks = {}
+    for idx, task_id in enumerate(ids):
+        task = {'id': task_id, 'parent': parents[idx], 'children': children[idx]}
+        for key, column in columns.items():
+            task[key] = column[idx]
+        tasks[task_id] = task
+    return tasks
+
+
+def get_task_column(tasks, key):
+    """Get the values of one attribute of serialized tasks, stored either in a table or a mapping.
+
+    Arguments:
+        tasks (dict): a task table or a mapping of task id to serialized task
+        key (str): the name of the attribute ('id' returns the task ids)
+
+    Returns:
+        list: the value of the attribute for each task
+    """
+    if not is_task_table(tasks):
+        return [task[key] for task in tasks.values()]
+    if key == 'id':
+        return tasks['ids']
+    column = tasks['columns'].get(key, [])
+    if key in tasks['values']:
+        values = tasks['values'][key]
+        return [values[value] for value in column]
+    return column
@@ -24,6 +24,12 @@ from SpiffWorkflow.bpmn.specs.event_definitions.timer import LOCALTZ
 
 from ..exceptions import VersionMigrationError
 
+def remove_task(dct, task_id):
+    """Remove a task and its descendants, so that no tasks are left disconnected from the tree."""
+    task = dct['tasks'].pop(task_id)
+    for child_id in task['children']:
+        remove_task(dct, child_id)
+
 def td_to_iso(td):
     total = td.total_seconds()
     v1, seconds = total // 60, total % 60
@@ -78,8 +84,9 @@ def convert_timer_expressions(dct):
                 for task_id in remove['children']:
                     child = dct['tasks'][task_id]
                     if child['task_spec'].startswith('return') or child['state'] != TaskState.COMPLETED:
-                        dct['tasks'].pop(task_id)
+                        remove_task(dct, task_id)
                     else:
+                        child['parent'] = task['id']
                         task['children'].append(task_id)
                 task['children'].remove(remove['id'])
                 dct['tasks'].pop(remove['id'])
@@ -144,7 +151,7 @@ def remove_loop_reset(dct):
         if spec['typename'] == 'LoopResetTask':
             tasks = [t for t in dct['tasks'].values() if t['task_spec'] == spec['name']]
             for task in tasks:
-                dct['tasks'].pop(task['id'])
+                remove_task(dct, task['id'])
                 parent = dct['tasks'].get(task['parent'])
                 parent['children'] = [c for c in parent['children'] if c != task['id']]
         dct['spec']['task_specs'].pop(spec['name'])
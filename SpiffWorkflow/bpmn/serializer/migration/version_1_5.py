@@ -0,0 +1,7 @@
+from ..helpers.task_table import tasks_to_table
+
+def convert_tasks_to_tables(dct):
+
+    dct['tasks'] = tasks_to_table(dct['tasks'])
+    for sp in dct['subprocesses'].values():
+        sp['tasks'] = tasks_to_table(sp['tasks'])
@@ -36,6 +36,16 @@ from .version_1_3 import (
     update_data_objects,
 )
 from .version_1_4 import update_mi_states
+from .version_1_5 import convert_tasks_to_tables
+
+def from_version_1_4(dct):
+    """Upgrade serialization from v1.4 to v1.5
+
+    Tasks are stored in a table of columns rather than as a dictionary of task id to task, with parents as
+    indexes into the table and children derived from the parents.
+    """
+    dct['VERSION'] = "1.5"
+    convert_tasks_to_tables(dct)
 
 def from_version_1_3(dct):
     """Upgrade serialization from v1.3 to v1.4
@@ -45,6 +55,7 @@ def from_version_1_3(dct):
     """
     dct['VERSION'] = "1.3"
     update_mi_states(dct)
+    from_version_1_4(dct)
 
 def from_version_1_2(dct):
     """Upgrade serialization from v.1.2 to v.1.3
@@ -122,4 +133,5 @@ MIGRATIONS = {
     '1.1': from_version_1_1,
     '1.2': from_version_1_2,
     '1.3': from_version_1_3,
+    '1.4': from_version_1_4,
 }
@@ -0,0 +1,97 @@
+# Copyright (C) 2023 Sartography
+#
+# This file is part of SpiffWorkflow.
+#
+# SpiffWorkflow is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3.0 of the License, or (at your option) any later version.
+#
+# SpiffWorkflow is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+from collections import OrderedDict
+
+
+class SpecCache:
+    """A cache of workflow specs, keyed by the hash of their serializations.
+
+    When a serializer has a spec cache, serialized workflows contain the hashes of their specs rather than the
+    specs themselves, and the specs are restored from the cache.  Restored specs are kept in an LRU cache, so that
+    the serialization of a spec is parsed only when it is not already in memory.
+
+    The serializations are kept in a dictionary by default.  To store them elsewhere (eg, in a database), extend
+    this class and override `save` and `load`.
+
+    Attributes:
+        maxsize (int): the maximum number of restored specs to keep
+        specs (OrderedDict): restored specs, from least to most recently used
+        serializations (dict): serialized specs
+    """
+
+    def __init__(self, maxsize=128):
+        """Create a spec cache.
+
+        Arguments:
+            maxsize (int): the maximum number of restored specs to keep
+        """
+        self.maxsize = maxsize
+        self.specs = OrderedDict()
+        self.serializations = {}
+
+    def get(self, key):
+        """Get a restored spec.
+
+        Arguments:
+            key (str): the hash of the spec's serialization
+
+        Returns:
+            the spec, or None if it is not in the cache
+        """
+        spec = self.specs.get(key)
+        if spec is not None:
+            self.specs.move_to_end(key)
+        return spec
+
+    def add(self, key, spec):
+        """Add a restored spec, removing the least recently used spec if the cache is full.
+
+        Arguments:
+            key (str): the hash of the spec's serialization
+            spec: the spec
+        """
+        self.specs[key] = spec
+        self.specs.move_to_end(key)
+        if len(self.specs) > self.maxsize:
+            self.specs.popitem(last=False)
+
+    def save(self, key, serialization):
+        """Store a serialized spec.
+
+        This is called the first time the serializer encounters a spec.
+
+        Arguments:
+            key (str): the hash of the serialization
+            serialization (str): the JSON serialization of the spec
+        """
+        self.serializations[key] = serialization
+
+    def load(self, key):
+        """Retrieve a serialized spec.
+
+        This is called when a spec is needed to restore a workflow but is not in the cache.
+
+        Arguments:
+            key (str): the hash of the serialization
+
+        Returns:
+            str: the JSON serialization of the spec, or None if it does not exist
+        """
+        return self.serializations.get(key)
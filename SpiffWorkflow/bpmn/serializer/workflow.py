@@ -18,15 +18,22 @@
 # 02110-1301  USA
 
 import json, gzip
+from hashlib import sha256
+from uuid import UUID
+from weakref import WeakKeyDictionary
+
+from SpiffWorkflow.exceptions import WorkflowException
 
 from .migration.version_migration import MIGRATIONS
 from .helpers import DefaultRegistry
-from .helpers.encoder import create_encoder
+from .helpers.encoder import create_encoder, create_msgpack_default, stream_encode
+from .helpers.task_table import is_task_table, table_to_tasks
 
+from .exceptions import VersionMigrationError
 from .config import DEFAULT_CONFIG
 
 # This is the default version set on the workflow, it can be overridden in init
-VERSION = "1.4"
+VERSION = "1.5"
 
 
 class BpmnWorkflowSerializer:
@@ -44,11 +51,22 @@ class BpmnWorkflowSerializer:
     dictionary containing only JSON-serializable objects and the second is dumping to JSON, which happens
     only at the very end.
 
+    Workflows can also be saved incrementally.  After a workflow has been serialized or restored, it records
+    which of its tasks change, and `serialize_patch_json` creates a patch containing only those tasks.  The
+    workflow can be restored by passing the patches to `deserialize_json` with the last full serialization.
+
+    Workflows can also be serialized to msgpack with `serialize_binary`, which stores task ids as bytes.  This
+    requires the optional `msgpack` package.
+
+    If the serializer has a `SpecCache`, each spec is serialized once and workflows contain the hashes of their
+    specs instead of the specs themselves.
+
     Attributes:
         registry (`DictionaryConverter`): a registry that keeps track of all objects the serializer knows
         json_encoder_cls: passed into `convert` to provides additional json encding capabilities (optional)
         json_decoder_cls: passed into `restore` to provide additional json decoding capabilities (optional)
         version (str): the serializer version
+        spec_cache (`SpecCache`): where specs are stored, if they are serialized separately (optional)
     """
 
     VERSION_KEY = "serializer_version"  # Why is this customizable?
@@ -84,7 +102,7 @@ class BpmnWorkflowSerializer:
             converter_class(target_class, registry)
         return registry
 
-    def __init__(self, registry=None, version=VERSION, json_encoder_cls=None, json_decoder_cls=None):
+    def __init__(self, registry=None, version=VERSION, json_encoder_cls=None, json_decoder_cls=None, spec_cache=None):
         """Intializes a Workflow Serializer.
 
         Arguments:
@@ -92,13 +110,17 @@ class BpmnWorkflowSerializer:
             version (str): the serializer version
             json_encoder_cls: passed into `convert` to provides additional json encding capabilities (optional)
             json_decoder_cls: passed into `restore` to provide additional json decoding capabilities (optional)
+            spec_cache (`SpecCache`): if provided, specs are stored here and workflows refer to them by hash
         """
         super().__init__()
         self.registry = registry or self.configure()
         self.json_encoder_cls = json_encoder_cls
         self.json_decoder_cls = json_decoder_cls
         self.VERSION = version
+        self.spec_cache = spec_cache
         self._encoder_cls = create_encoder(self.registry, json_encoder_cls)
+        # The hashes of specs that have been serialized or restored
+        self._spec_keys = WeakKeyDictionary()
 
     def serialize_json(self, workflow, use_gzip=False):
         """Serialize the dictionary representation of the workflow to JSON.
@@ -112,27 +134,205 @@ class BpmnWorkflowSerializer:
         """
         self.registry._encoder_mode = True
         try:
-            dct = self.to_dict(workflow)
+            dct = self._workflow_to_dict(workflow)
+            json_str = json.dumps(dct, cls=self._encoder_cls)
+        finally:
+            self.registry._encoder_mode = False
+        workflow._checkpoint()
+        return gzip.compress(json_str.encode('utf-8')) if use_gzip else json_str
+
+    def serialize_stream(self, workflow, stream, use_gzip=False):
+        """Write the JSON serialization of the workflow to a binary file-like object.
+
+        The output is the same as that of `serialize_json`, but subprocesses are converted as they are written, so
+        that neither the whole dictionary representation nor the whole JSON string is kept in memory.  Other
+        compressors can be used by passing a stream that compresses its input.
+
+        Arguments:
+            workflow: the workflow to serialize
+            stream: a binary file-like object
+            use_gzip (bool): optionally gzip the output
+        """
+        output = gzip.GzipFile(filename='', mode='wb', fileobj=stream) if use_gzip else stream
+        self.registry._encoder_mode = True
+        try:
+            dct = self._workflow_to_dict(workflow, streaming=True)
+            chunks, size = [], 0
+            for chunk in stream_encode(dct, self._encoder_cls()):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > 65536:
+                    output.write(''.join(chunks).encode('utf-8'))
+                    chunks, size = [], 0
+            output.write(''.join(chunks).encode('utf-8'))
+        finally:
+            self.registry._encoder_mode = False
+            if use_gzip:
+                output.close()
+        workflow._checkpoint()
+
+    def _workflow_to_dict(self, workflow, **kwargs):
+        if self.spec_cache is None:
+            dct = self.to_dict(workflow, **kwargs)
+        else:
+            dct = self.to_dict(workflow, include_specs=False, **kwargs)
+            dct['spec'] = self._get_spec_key(workflow.spec)
+            dct['subprocess_specs'] = dict(
+                (name, self._get_spec_key(spec)) for name, spec in workflow.subprocess_specs.items()
+            )
+        dct[self.VERSION_KEY] = self.VERSION
+        return dct
+
+    def serialize_binary(self, workflow):
+        """Serialize the dictionary representation of the workflow to msgpack.
+
+        The task tables are stored with task ids packed as 16 byte binary values.  Custom data is converted by the
+        registry, as it is for JSON.
+
+        Arguments:
+            workflow: the workflow to serialize
+
+        Returns:
+            bytes: the packed dictionary representation
+        """
+        import msgpack
+        self.registry._encoder_mode = True
+        try:
+            dct = self._workflow_to_dict(workflow)
+            for wf in [dct] + list(dct['subprocesses'].values()):
+                wf['tasks']['ids'] = b''.join(UUID(task_id).bytes for task_id in wf['tasks']['ids'])
+            serialization = msgpack.packb(dct, default=create_msgpack_default(self.registry))
+        finally:
+            self.registry._encoder_mode = False
+        workflow._checkpoint()
+        return serialization
+
+    def serialize_patch_json(self, workflow, use_gzip=False):
+        """Serialize the changes to a workflow since it was last serialized or restored to JSON.
+
+        Arguments:
+            workflow: the workflow to serialize
+            use_gzip (bool): optionally gzip the resulting string
+
+        Returns:
+            a JSON dump of the patch or a gzipped version of it
+        """
+        self.registry._encoder_mode = True
+        try:
+            dct = self.to_patch_dict(workflow)
             dct[self.VERSION_KEY] = self.VERSION
             json_str = json.dumps(dct, cls=self._encoder_cls)
         finally:
             self.registry._encoder_mode = False
         return gzip.compress(json_str.encode('utf-8')) if use_gzip else json_str
 
-    def deserialize_json(self, serialization, use_gzip=False):
+    def deserialize_json(self, serialization, use_gzip=False, patches=None, lazy=False):
         """Deserialize a workflow from an optionally zipped JSON-dumped workflow.
 
         Arguments:
             serialization: the serialization to restore
             use_gzip (bool): optionally gunzip the input
+            patches (list): serialized patches to apply, in the order they were created (optional)
+            lazy (bool): restore the tasks of completed subprocesses only when they are used
 
         Returns:
             the restored workflow
         """
         json_str = gzip.decompress(serialization) if use_gzip else serialization
         dct = json.loads(json_str, cls=self.json_decoder_cls)           
+        return self._workflow_from_dict(dct, use_gzip, patches, lazy)
+
+    def deserialize_stream(self, stream, use_gzip=False, patches=None, lazy=False):
+        """Deserialize a workflow from an optionally zipped binary file-like object.
+
+        Arguments:
+            stream: a binary file-like object containing a serialization
+            use_gzip (bool): optionally gunzip the input
+            patches (list): serialized patches to apply, in the order they were created (optional)
+            lazy (bool): restore the tasks of completed subprocesses only when they are used
+
+        Returns:
+            the restored workflow
+        """
+        if use_gzip:
+            with gzip.GzipFile(mode='rb', fileobj=stream) as fh:
+                dct = json.load(fh, cls=self.json_decoder_cls)
+        else:
+            dct = json.load(stream, cls=self.json_decoder_cls)
+        return self._workflow_from_dict(dct, use_gzip, patches, lazy)
+
+    def deserialize_binary(self, serialization, patches=None, lazy=False):
+        """Deserialize a workflow serialized with `serialize_binary`.
+
+        Arguments:
+            serialization (bytes): the serialization to restore
+            patches (list): JSON patches to apply, in the order they were created (optional)
+            lazy (bool): restore the tasks of completed subprocesses only when they are used
+
+        Returns:
+            the restored workflow
+        """
+        import msgpack
+        dct = msgpack.unpackb(serialization, strict_map_key=False)
+        for wf in [dct] + list(dct['subprocesses'].values()):
+            ids = wf['tasks']['ids']
+            wf['tasks']['ids'] = [str(UUID(bytes=ids[idx:idx + 16])) for idx in range(0, len(ids), 16)]
+        return self._workflow_from_dict(dct, False, patches, lazy)
+
+    def _workflow_from_dict(self, dct, use_gzip, patches, lazy):
         self.migrate(dct)
-        return self.from_dict(dct)
+        if isinstance(dct.get('spec'), str):
+            dct['spec'] = self._restore_spec(dct['spec'])
+            dct['subprocess_specs'] = dict(
+                (name, self._restore_spec(key)) for name, key in dct['subprocess_specs'].items()
+            )
+        for patch in patches or []:
+            json_str = gzip.decompress(patch) if use_gzip else patch
+            self.apply_patch(dct, json.loads(json_str, cls=self.json_decoder_cls))
+        workflow = self.from_dict(dct, lazy=lazy)
+        workflow._checkpoint()
+        return workflow
+
+    def _get_spec_key(self, spec):
+        """Get the hash of a spec's serialization, and add the spec to the cache the first time it is seen."""
+        key = self._spec_keys.get(spec)
+        if key is None:
+            dct = self.to_dict(spec)
+            serialization = json.dumps(dct, cls=self._encoder_cls, sort_keys=True)
+            key = sha256(serialization.encode('utf-8')).hexdigest()
+            # The version is stored with the spec so that it can be migrated when it is restored
+            self.spec_cache.save(key, json.dumps({self.VERSION_KEY: self.VERSION, 'spec': dct}, cls=self._encoder_cls))
+            self.spec_cache.add(key, spec)
+            self._spec_keys[spec] = key
+        return key
+
+    def _restore_spec(self, key):
+        """Get a spec from the cache, restoring it from its serialization if necessary."""
+        if self.spec_cache is None:
+            raise WorkflowException('A spec cache is required to restore workflows serialized without their specs')
+        spec = self.spec_cache.get(key)
+        if spec is None:
+            serialization = self.spec_cache.load(key)
+            if serialization is None:
+                raise WorkflowException(f'The spec {key} could not be found')
+            spec = self.from_dict(self._migrate_spec(json.loads(serialization, cls=self.json_decoder_cls)))
+            self.spec_cache.add(key, spec)
+            self._spec_keys[spec] = key
+        return spec
+
+    def _migrate_spec(self, dct):
+        """Get a cached spec's serialization, updating the format if necessary."""
+        if self.VERSION_KEY in dct:
+            version, spec = dct[self.VERSION_KEY], dct['spec']
+        else:
+            # Specs cached before versions were stored; the cache was added in 1.4
+            version, spec = '1.4', dct
+        if version in MIGRATIONS:
+            # Migrations are applied to workflows, so the spec is migrated as part of a workflow with no tasks
+            wf = {'spec': spec, 'subprocess_specs': {}, 'subprocesses': {}, 'tasks': {}, 'data': {}}
+            MIGRATIONS[version](wf)
+            spec = wf['spec']
+        return spec
 
     def get_version(self, serialization):
         """Get the version specified in the serialization
@@ -169,6 +369,77 @@ class BpmnWorkflowSerializer:
         """
         return self.registry.convert(obj, **kwargs)
 
+    def to_patch_dict(self, workflow):
+        """Get the changes to a workflow since the last checkpoint.
+
+        The patch contains the tasks that were changed or removed and the attributes of the workflow and its
+        subprocesses, but not the specs.  A new checkpoint is started once the patch is created.
+
+        Arguments:
+            workflow: the workflow
+
+        Returns:
+            a dictionary representation of the changes
+
+        Raises:
+            `WorkflowException`: if changes to the workflow are not being tracked
+        """
+        if workflow._dirty_tasks is None:
+            raise WorkflowException('Changes to this workflow are not tracked until it is serialized or restored')
+        workflows = [workflow] + list(workflow.subprocesses.values())
+        changed, removed = {}, []
+        for task_id, data_changed in workflow._dirty_tasks.items():
+            if data_changed is None:
+                removed.append(str(task_id))
+                continue
+            changed[task_id] = True
+            if data_changed:
+                # The children only store the differences from this task's data, so they need to be updated too
+                task = next((wf.tasks[task_id] for wf in workflows if task_id in wf.tasks), None)
+                for child in task._get_children() if task is not None else []:
+                    if child is not None:
+                        changed[child.id] = True
+        dct = self.to_dict(workflow, changed=list(changed))
+        dct['removed_tasks'] = removed
+        workflow._checkpoint()
+        return dct
+
+    def apply_patch(self, dct, patch):
+        """Update the dictionary representation of a workflow with a patch.
+
+        Arguments:
+            dct: the dictionary representation of the workflow (this is modified)
+            patch: the dictionary representation of the patch
+
+        Raises:
+            `VersionMigrationError`: if the patch was created by a different serializer version
+        """
+        version = patch.pop(self.VERSION_KEY, None)
+        if version != self.VERSION:
+            raise VersionMigrationError(f'Patches created with serializer version {version} cannot be applied')
+        removed = patch.pop('removed_tasks')
+        subprocesses = {}
+        for task_id, sp in patch.pop('subprocesses').items():
+            if sp is None:
+                subprocesses[task_id] = dct['subprocesses'][task_id]
+            else:
+                subprocesses[task_id] = self._apply_workflow_patch(dct['subprocesses'].get(task_id), sp, removed)
+        self._apply_workflow_patch(dct, patch, removed)
+        dct['subprocesses'] = subprocesses
+
+    def _apply_workflow_patch(self, dct, patch, removed):
+        tasks = dct['tasks'] if dct is not None else {}
+        if is_task_table(tasks):
+            tasks = table_to_tasks(tasks)
+        for task_id in removed:
+            tasks.pop(task_id, None)
+        # Updated tasks keep their positions and new tasks are added in the order they were created
+        tasks.update(patch.pop('tasks'))
+        dct = dct if dct is not None else {}
+        dct.update(patch)
+        dct['tasks'] = tasks
+        return dct
+
     def from_dict(self, dct, **kwargs):
         """Restore an known object from a dict.
 
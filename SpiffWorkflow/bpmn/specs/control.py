@@ -18,7 +18,7 @@
 # 02110-1301  USA
 
 from SpiffWorkflow.exceptions import WorkflowException
-from SpiffWorkflow.util.task import TaskState, TaskIterator
+from SpiffWorkflow.util.task import TaskState
 from SpiffWorkflow.specs.StartTask import StartTask
 from SpiffWorkflow.specs.Join import Join
 
@@ -150,15 +150,9 @@ class StartEventJoin(Join, BpmnTaskSpec):
 class _EndJoin(UnstructuredJoin, BpmnTaskSpec):
 
     def _check_threshold_unstructured(self, my_task):
-        # Look at the tree to find all ready and waiting tasks (excluding ourself). The EndJoin waits for everyone!
-        for task in TaskIterator(my_task.workflow.task_tree, state=TaskState.NOT_FINISHED_MASK, end_at_spec=self.name):
-            if task == my_task:
-                continue
-            may_fire = False
-            break
-        else:
-            may_fire = True
-        return may_fire
+        # The EndJoin waits for everyone!  The only unfinished tasks can be this one and its descendants.
+        unfinished = sum(1 for task in my_task if task.has_state(TaskState.NOT_FINISHED_MASK))
+        return my_task.workflow._unfinished_task_count == unfinished
 
     def _run_hook(self, my_task):
         result = super()._run_hook(my_task)
@@ -73,7 +73,8 @@ class DataObject(BpmnDataSpecification):
             raise WorkflowDataException(message, my_task, data_input=self)
 
         my_task.data[self.bpmn_id] = deepcopy(wf.data_objects[self.bpmn_id])
-        logger.info(f'Read workflow variable', extra=my_task.collect_log_extras({'bpmn_id': self.bpmn_id}))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f'Read workflow variable', extra=my_task.collect_log_extras({'bpmn_id': self.bpmn_id}))
 
     def set(self, my_task):
         """Copy a value from the task data to the workflow data"""
@@ -88,7 +89,8 @@ class DataObject(BpmnDataSpecification):
 
         wf.data_objects[self.bpmn_id] = deepcopy(my_task.data[self.bpmn_id])
         del my_task.data[self.bpmn_id]
-        logger.info(f'Set workflow variable', extra=my_task.collect_log_extras({'bpmn_id': self.bpmn_id}))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f'Set workflow variable', extra=my_task.collect_log_extras({'bpmn_id': self.bpmn_id}))
 
     def delete(self, my_task):
         my_task.data.pop(self.bpmn_id, None)
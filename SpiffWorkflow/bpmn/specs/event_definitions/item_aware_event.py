@@ -13,7 +13,7 @@ class ItemAwareEventDefinition(EventDefinition):
         super().catch(my_task, event)
 
     def throw(self, my_task):
-        payload = deepcopy(my_task.data)
+        payload = deepcopy(dict(my_task._peek_data()))
         event = BpmnEvent(self, payload=payload)
         my_task.workflow.top_workflow.catch(event)
 
@@ -34,7 +34,7 @@ class CodeEventDefinition(ItemAwareEventDefinition):
         self.code = code
 
     def throw(self, my_task):
-        payload = deepcopy(my_task.data)
+        payload = deepcopy(dict(my_task._peek_data()))
         event = BpmnEvent(self, payload=payload, target=my_task.workflow)
         my_task.workflow.top_workflow.catch(event)
 
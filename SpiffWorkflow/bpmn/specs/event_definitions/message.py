@@ -39,7 +39,7 @@ class MessageEventDefinition(EventDefinition):
         super().catch(my_task, event)
 
     def throw(self, my_task):
-        payload = deepcopy(my_task.data)
+        payload = deepcopy(dict(my_task._peek_data()))
         correlations = self.get_correlations(my_task, payload)
         my_task.workflow.correlations.update(correlations)
         event = BpmnEvent(self, payload=payload, correlations=correlations)
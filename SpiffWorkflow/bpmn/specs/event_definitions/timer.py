@@ -203,10 +203,10 @@ class CycleTimerEventDefinition(TimerEventDefinition):
 
     def update_task(self, my_task):
         if self.cycle_complete(my_task):
-            for output in my_task.task_spec.outputs:
-                child = my_task._add_child(output, TaskState.FUTURE)
+            children = my_task._add_children_bulk(my_task.task_spec.outputs, TaskState.FUTURE)
+            for child in children:
                 child.task_spec._predict(child, mask=TaskState.NOT_FINISHED_MASK)
-                child.task_spec._update(child)
+            my_task._update_children_bulk(children)
 
     def details(self, my_task):
         event_value = my_task._get_internal_data('event_value')
@@ -141,23 +141,30 @@ class MultiInstanceTask(LoopTask):
         my_task.internal_data['merged'].append(str(child.id))
 
     def create_child(self, my_task, item, key_or_index=None):
+        return self.create_children_for_items(my_task, [(key_or_index, item)])[0]
+
+    def create_children_for_items(self, my_task, items):
+        """Create a child for each (key or index, item) pair, adding the children to the task all at once."""
 
         task_spec = my_task.workflow.spec.task_specs[self.task_spec]
         if not task_spec.completed_event.is_connected(self.merge_child):
             task_spec.completed_event.connect(self.merge_child)
-        child = my_task._add_child(task_spec, TaskState.WAITING)
-        child.triggered = True
         if self.input_item is not None and self.input_item.exists(my_task):
             raise WorkflowDataException(f'Multiinstance input item {self.input_item.bpmn_id} already exists.', my_task)
         if self.output_item is not None and self.output_item.exists(my_task):
             raise WorkflowDataException(f'Multiinstance output item {self.output_item.bpmn_id} already exists.', my_task)
-        if self.input_item is not None:       
-            self.input_item.set(child, deepcopy(item))
-        if key_or_index is not None:
-            child.internal_data['key_or_index'] = key_or_index
-        else:
-            child.internal_data['item'] = item
-        child.task_spec._update(child)
+
+        children = my_task._add_children_bulk([task_spec] * len(items), TaskState.WAITING)
+        for child, (key_or_index, item) in zip(children, items):
+            child.triggered = True
+            if self.input_item is not None:
+                self.input_item.set(child, deepcopy(item))
+            if key_or_index is not None:
+                child.internal_data['key_or_index'] = key_or_index
+            else:
+                child.internal_data['item'] = item
+        my_task._update_children_bulk(children)
+        return children
 
     def check_completion_condition(self, my_task):
 
@@ -345,8 +352,7 @@ class ParallelMultiInstanceTask(MultiInstanceTask):
             else:
                 self.init_data_output_with_cardinality(my_task)
 
-        for key_or_index, item in children:
-            self.create_child(my_task, item, key_or_index)
+        self.create_children_for_items(my_task, list(children))
 
     def children_complete(self, my_task):
         return all(c.state == TaskState.COMPLETED for c in self._instances(my_task))
@@ -28,3 +28,15 @@ class ServiceTask(ScriptEngineTask):
 
     def __init__(self, wf_spec, bpmn_id, **kwargs):
         super().__init__(wf_spec, bpmn_id, **kwargs)
+
+    def _update_service_result(self, my_task, result):
+        """Update the task data with the result of a service call made by the task.
+
+        This is called when a call that returned a future finishes; please override for specific implementations.
+        """
+        pass
+
+    def _post_assign(self, my_task):
+        # While the call is running, the assignments are deferred until its result has been set
+        if my_task.id not in my_task.workflow.top_workflow.service_calls.calls:
+            super()._post_assign(my_task)
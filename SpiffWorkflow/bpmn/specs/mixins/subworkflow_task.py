@@ -65,10 +65,10 @@ class SubWorkflowTask(TaskSpec):
 
     def copy_data(self, my_task, subworkflow):
         start = subworkflow.get_next_task(spec_name='Start')
-        start.set_data(**deepcopy(my_task.data))
+        start.set_data(**deepcopy(dict(my_task._peek_data())))
 
     def update_data(self, my_task, subworkflow):
-        my_task.data = deepcopy(subworkflow.last_task.data)
+        my_task.data = deepcopy(dict(subworkflow.last_task._peek_data()))
 
     def get_missing_subworkflow_error(self, my_task):
         return f"The subprocess '{self.spec}' was not found."
@@ -113,7 +113,7 @@ class CallActivity(SubWorkflowTask):
 
         if subworkflow.spec.io_specification is None or len(subworkflow.spec.io_specification.data_outputs) == 0:
             # Copy all workflow data if no outputs are specified
-            my_task.data = deepcopy(subworkflow.last_task.data)
+            my_task.data = deepcopy(dict(subworkflow.last_task._peek_data()))
         else:
             end = subworkflow.get_next_task(subworkflow.task_tree, skip_subprocesses=True, spec_name='End')
             # Otherwise only copy data with the specified names
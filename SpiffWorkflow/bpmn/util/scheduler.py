@@ -0,0 +1,75 @@
+# Copyright (C) 2012 Matthew Hampton, 2023 Sartography
+#
+# This file is part of SpiffWorkflow.
+#
+# SpiffWorkflow is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3.0 of the License, or (at your option) any later version.
+#
+# SpiffWorkflow is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+from SpiffWorkflow.util.task import TaskState
+from .task import sort_tasks
+
+
+class TaskScheduler:
+    """Keeps track of the engine tasks of a workflow and its subprocesses that are ready to run.
+
+    Tasks are added when they become READY, so that running engine steps only requires visiting the
+    tasks that can actually run rather than searching each workflow for READY tasks.  Tasks with manual
+    task specs are never added.
+
+    Tasks are checked again when they are removed from the queue, as they may have been run, cancelled,
+    or removed from the tree since being added.
+    """
+
+    def __init__(self, workflow):
+        self.workflow = workflow
+        self.queues = {}
+
+    def add_task(self, my_task):
+        """Add a task to its workflow's queue if it is an engine task."""
+        if not my_task.task_spec.manual:
+            self.queues.setdefault(my_task.workflow, {})[my_task.id] = my_task
+
+    def refresh(self):
+        """Add all READY engine tasks in the workflow and its subprocesses.
+
+        This picks up tasks that became READY without being added (eg, tasks restored by the serializer).
+        """
+        workflows = set([self.workflow] + list(self.workflow.subprocesses.values()))
+        for workflow in [wf for wf in self.queues if wf not in workflows]:
+            del self.queues[workflow]
+        for workflow in workflows:
+            for task_id in workflow._state_index[TaskState.READY]:
+                self.add_task(workflow.tasks[task_id])
+
+    def pop_tasks(self, workflow):
+        """Remove the queued tasks in the workflow and any subprocesses it contains.
+
+        Returns:
+            list(`Task`): the tasks that are still READY, in the order in which they appear in the tree
+        """
+        tasks = []
+        for wf in [wf for wf in self.queues if self._contains(workflow, wf)]:
+            tasks.extend(task for task in self.queues.pop(wf).values() if task.id in wf.tasks and task.state == TaskState.READY)
+        if len(tasks) > 1:
+            tasks = sort_tasks(workflow.task_tree, tasks)
+        return tasks
+
+    def _contains(self, workflow, subprocess):
+        while subprocess is not None and subprocess is not workflow:
+            if self.workflow.subprocesses.get(subprocess.parent_task_id) is not subprocess:
+                # The subprocess has been deleted
+                return False
+            subprocess = subprocess.parent_workflow
+        return subprocess is workflow
@@ -0,0 +1,131 @@
+# Copyright (C) 2023 Sartography
+#
+# This file is part of SpiffWorkflow.
+#
+# SpiffWorkflow is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3.0 of the License, or (at your option) any later version.
+#
+# SpiffWorkflow is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+import asyncio
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+from SpiffWorkflow.util.task import TaskState
+from SpiffWorkflow.bpmn.exceptions import WorkflowTaskException
+
+
+class ServiceCallManager:
+    """Keeps track of the service calls of a workflow and its subprocesses that have not finished.
+
+    Service tasks whose calls return a future are left STARTED, so that other branches can proceed while the call
+    runs.  The tasks are completed with the results of their calls by `complete`.
+
+    Coroutines returned by service calls are scheduled on the running event loop by `BpmnWorkflow.async_do_engine_steps`
+    (which sets `awaiting`), with at most `limit` of them running at once.  If no loop is running, they are run to
+    completion when the task runs, as if the call had been synchronous.
+
+    Futures cannot be serialized; a workflow should not be serialized while calls are pending unless the application
+    is prepared to run the STARTED tasks again.
+    """
+
+    def __init__(self, workflow):
+        self.workflow = workflow
+        self.calls = {}
+        self.limit = None
+        self.awaiting = False
+
+    @property
+    def pending(self):
+        """The ids of the tasks with pending calls."""
+        return list(self.calls)
+
+    def add_call(self, my_task, future):
+        """Track the call made by a task."""
+        self.calls[my_task.id] = future
+
+    def schedule(self, my_task, call):
+        """Schedule an awaitable returned by a task's service call.
+
+        Returns:
+            the `asyncio.Task` awaiting the call if the calls are being awaited, otherwise the result of the call
+
+        Raises:
+            WorkflowTaskException: if an event loop is running but the calls are not being awaited
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                return asyncio.run(self._await(call))
+            except Exception as exc:
+                raise self.workflow.script_engine.create_service_exception(my_task, exc)
+        if not self.awaiting:
+            # The call can neither be run here nor completed by `complete`, so the workflow would never proceed
+            if asyncio.iscoroutine(call):
+                call.close()
+            raise WorkflowTaskException(
+                'A service call returned a coroutine while an event loop is running; use async_do_engine_steps',
+                task=my_task,
+            )
+        return asyncio.ensure_future(self._await(call))
+
+    async def _await(self, call):
+        if self.limit is None:
+            return await call
+        async with self.limit:
+            return await call
+
+    async def wait_for_calls(self):
+        """Wait until at least one pending call has finished."""
+        if len(self.calls) > 0:
+            futures = [asyncio.wrap_future(f) if isinstance(f, Future) else f for f in self.calls.values()]
+            await asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
+
+    def complete(self, wait_for_calls=False, timeout=None):
+        """Complete the tasks whose calls have finished.
+
+        If a call failed or was cancelled, its task is put into ERROR and an exception is raised; tasks whose calls
+        finished before the failed call was reached are completed, and the remaining calls are completed when this is
+        called again.
+
+        Arguments:
+            wait_for_calls (bool): wait until at least one call has finished
+            timeout (float): the maximum number of seconds to wait
+
+        Returns:
+            list(`Task`): the tasks that were completed
+        """
+        futures = [f for f in self.calls.values() if isinstance(f, Future)]
+        if wait_for_calls and len(futures) > 0:
+            # Calls scheduled on an event loop can only be awaited
+            wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        completed = []
+        for task_id, future in [(task_id, f) for task_id, f in self.calls.items() if f.done()]:
+            del self.calls[task_id]
+            my_task = self.workflow.get_task_from_id(task_id)
+            if my_task is None or my_task.state != TaskState.STARTED:
+                # The task was cancelled or reset while the call was running
+                continue
+            if future.cancelled():
+                # This is not an `Exception`, so it is handled separately
+                my_task.error()
+                raise WorkflowTaskException('The service call was cancelled', task=my_task)
+            try:
+                my_task.task_spec._update_service_result(my_task, future.result())
+                my_task.task_spec._post_assign(my_task)
+            except Exception as exc:
+                my_task.error()
+                raise self.workflow.script_engine.create_service_exception(my_task, exc)
+            my_task.complete()
+            completed.append(my_task)
+        return completed
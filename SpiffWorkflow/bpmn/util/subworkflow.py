@@ -20,6 +20,39 @@
 from SpiffWorkflow import Workflow
 from .task import BpmnTaskIterator
 
+
+class DeferredTasks:
+    """The tasks of a deserialized subprocess that have not been restored yet.
+
+    This also stands in for the root of the subprocess when the masks of descendant states of the task that
+    created it are computed, so that the tasks need not be restored to find out which states they are in.
+
+    Attributes:
+        load (callable): a function that restores the tasks, task tree, last task and data of the subprocess
+        ids (set(str)): the ids of the tasks
+        serialization (dict): the serialized subprocess
+    """
+
+    # The workflow attributes that are not set until the tasks are restored
+    attributes = ('tasks', 'task_tree', 'last_task', 'data')
+
+    def __init__(self, load, ids, states, serialization):
+        """
+        Arguments:
+            load (callable): a function that restores the tasks, task tree, last task and data of the subprocess
+            ids (list(str)): the ids of the tasks
+            states (int): the states of the tasks combined into a mask
+            serialization (dict): the serialized subprocess
+        """
+        self.load = load
+        self.ids = set(ids)
+        self.serialization = serialization
+        self._subtree_states = states
+
+    def _get_subtree_states(self):
+        return self._subtree_states
+
+
 class BpmnBaseWorkflow(Workflow):
 
     def __init__(self, spec, **kwargs):
@@ -34,20 +67,57 @@ class BpmnBaseWorkflow(Workflow):
     def get_tasks_iterator(self, first_task=None, **kwargs):
         return BpmnTaskIterator(first_task or self.task_tree, **kwargs)
 
+    def _task_ready_notify(self, task):
+        self.top_workflow.scheduler.add_task(task)
+
+    def _get_subtree_children(self, task):
+        # The states of a subprocess are included in the states of the task that created it
+        subprocess = self.top_workflow.subprocesses.get(task.id)
+        if subprocess is None:
+            return task._get_children()
+        if subprocess._deferred_tasks is not None:
+            return [subprocess._deferred_tasks] + task._get_children()
+        return [subprocess.task_tree] + task._get_children()
+
 
 class BpmnSubWorkflow(BpmnBaseWorkflow):
 
+    # The tasks of a deserialized subprocess, if they have not been restored yet (see `_defer_tasks`)
+    _deferred_tasks = None
+
     def __init__(self, spec, parent_task_id, top_workflow, **kwargs):
         self.parent_task_id = parent_task_id
         self.top_workflow = top_workflow
+        self._parent_task = None
         self.correlations = {}
         self.depth = self._calculate_depth()
+        kwargs.setdefault('copy_on_write_data', top_workflow.copy_on_write_data)
+        kwargs.setdefault('persistent_data', top_workflow.persistent_data)
         super().__init__(spec, **kwargs)
 
     @property
     def script_engine(self):
         return self.top_workflow.script_engine
 
+    @property
+    def _state_hooks(self):
+        # Hooks are added to the top level workflow and called for changes in all its subprocesses
+        return self.top_workflow._state_hooks
+
+    def add_state_hook(self, hook, batched=False):
+        self.top_workflow.add_state_hook(hook, batched)
+
+    def remove_state_hook(self, hook):
+        self.top_workflow.remove_state_hook(hook)
+
+    def flush_state_changes(self):
+        self.top_workflow.flush_state_changes()
+
+    @property
+    def _dirty_tasks(self):
+        # Changes are tracked by the top level workflow
+        return self.top_workflow._dirty_tasks
+
     @property
     def parent_workflow(self):
         task = self.top_workflow.get_task_from_id(self.parent_task_id)
@@ -61,10 +131,52 @@ class BpmnSubWorkflow(BpmnBaseWorkflow):
         return depth
 
     def get_task_from_id(self, task_id):
+        deferred = self._deferred_tasks
+        if deferred is not None and str(task_id) not in deferred.ids:
+            return None
         return self.tasks.get(task_id)
 
+    def _get_subtree_parent(self, task):
+        if task._parent_id is not None:
+            return task.parent
+        # The subprocess task's mask is recomputed when the subprocess is added, so don't update it before then
+        if self._parent_task is None and self.top_workflow.subprocesses.get(self.parent_task_id) is self:
+            self._parent_task = self.top_workflow.get_task_from_id(self.parent_task_id)
+        return self._parent_task
+
+    def _defer_tasks(self, deferred):
+        """Postpone restoring the tasks of this subprocess until they are used.
+
+        Until then, the attributes listed in `DeferredTasks.attributes` are unset; accessing any of them
+        restores the tasks.  Tasks can be looked up by id without restoring them unless they belong to this
+        subprocess.
+
+        Arguments:
+            deferred (`DeferredTasks`): the tasks to restore
+        """
+        for name in DeferredTasks.attributes:
+            self.__dict__.pop(name, None)
+        self._deferred_tasks = deferred
+
+    def _restore_tasks(self):
+        deferred, self._deferred_tasks = self._deferred_tasks, None
+        self.tasks = {}
+        deferred.load()
+        # Restoring the tasks does not change them
+        dirty = self._dirty_tasks
+        if dirty is not None:
+            for task_id in self.tasks:
+                dirty.pop(task_id, None)
+
+    def __getattr__(self, name):
+        # This is only called for attributes that are not set, which is how deferred tasks get restored
+        if self.__dict__.get('_deferred_tasks') is not None and name in DeferredTasks.attributes:
+            self._restore_tasks()
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
     def collect_log_extras(self, dct=None):
-        dct = super().collect_log_extras()
+        dct = super().collect_log_extras(dct)
         dct.update({'parent_task_id': self.parent_task_id})
         return dct
 
@@ -17,7 +17,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
-from SpiffWorkflow.util.task import TaskFilter, TaskIterator, TaskState
+from SpiffWorkflow.util.task import TaskFilter, TaskIterator, TaskState, depth_first_order, get_child_position
 from SpiffWorkflow.bpmn.specs.mixins.events.event_types import CatchingEvent
 
 class BpmnTaskFilter(TaskFilter):
@@ -27,21 +27,45 @@ class BpmnTaskFilter(TaskFilter):
         self.catches_event = catches_event
         self.lane = lane
 
-    def matches(self, task):
+    def _get_conditions(self):
 
-        def _catches_event(task):
-            return isinstance(task.task_spec, CatchingEvent) and task.task_spec.catches(task, self.catches_event)
+        conditions = super()._get_conditions()
+        catches_event, lane = self.catches_event, self.lane
 
-        if not super().matches(task):
-            return False
+        if catches_event is not None:
+            conditions.append(
+                lambda task: isinstance(task.task_spec, CatchingEvent) and task.task_spec.catches(task, catches_event)
+            )
 
-        if not (self.catches_event is None or _catches_event(task)):
-            return False
+        if lane is not None:
+            conditions.append(lambda task: task.task_spec.lane == lane)
 
-        if not (self.lane is None or task.task_spec.lane == self.lane):
-            return False
+        return conditions
 
-        return True
+
+def sort_tasks(task, tasks):
+    """Sort tasks in a workflow and its subprocesses into the depth first order in which they are reached.
+
+    Args:
+        task (`Task`): the task to start from
+        tasks (list(`Task`)): the tasks to sort
+
+    Returns:
+        list(`Task`): the tasks that are reached from the starting task, in depth first order
+    """
+    return depth_first_order(task, tasks, _get_parent)
+
+
+def _get_parent(task, positions):
+    workflow = task.workflow
+    top_workflow = workflow.top_workflow
+    if task.parent is None and workflow.parent_task_id is not None:
+        # The root of a subprocess is visited before the other children of the subprocess task
+        return top_workflow.get_task_from_id(workflow.parent_task_id), -1
+    elif task.parent is not None:
+        parent = task.parent
+        return parent, get_child_position(parent, task, positions, parent.id in top_workflow.subprocesses)
+    return None, None
 
 
 class BpmnTaskIterator(TaskIterator):
@@ -49,42 +73,60 @@ class BpmnTaskIterator(TaskIterator):
     def __init__(self, task, end_at_spec=None, max_depth=1000, depth_first=True, skip_subprocesses=False, task_filter=None, **kwargs):
 
         task_filter = task_filter or BpmnTaskFilter(**kwargs)
-        super().__init__(task, end_at_spec, max_depth, depth_first, task_filter)
         self.skip_subprocesses = skip_subprocesses
+        super().__init__(task, end_at_spec, max_depth, depth_first, task_filter)
 
-    def _next(self):
+    def _get_indexed_workflows(self, task):
+        top_workflow = task.workflow.top_workflow
+        if self.skip_subprocesses:
+            return [task.workflow]
+        # Don't restore the tasks of subprocesses that contain no tasks in the requested states
+        return [top_workflow] + [
+            sp for sp in top_workflow.subprocesses.values()
+            if sp._deferred_tasks is None or sp._deferred_tasks._subtree_states & self.task_filter.state
+        ]
+
+    def _get_parent(self, task, positions):
+
+        if task.parent is None and self.skip_subprocesses:
+            return None, None
+        parent, position = _get_parent(task, positions)
+        if parent is None:
+            return None, None
+
+        subprocess = task.workflow.top_workflow.subprocesses.get(parent.id)
+        if (parent.state < self.min_state and subprocess is None) or parent.task_spec.name == self.end_at_spec:
+            return None, None
+        if position == -1 and parent.state >= TaskState.FINISHED_MASK and self.task_filter.state <= TaskState.FINISHED_MASK:
+            return None, None
+        return parent, position
 
-        if not self.task_list:
-            raise StopIteration()
+    def _next(self):
 
-        task = self.task_list.pop(0)
+        task, depth = self._pop()
         subprocess = task.workflow.top_workflow.subprocesses.get(task.id)
 
         if (task._children or subprocess is not None) and \
             (task.state >= self.min_state or subprocess is not None) and \
-            self.depth < self.max_depth and \
+            depth < self.max_depth and \
             task.task_spec.name != self.end_at_spec:
-            
+
             # Do not descend into a completed subprocess to look for unfinished tasks.
+            # Nor into a subprocess whose tasks haven't been restored if none of them are in the requested states.
             if (
                 subprocess is None
                 or self.skip_subprocesses
                 or (task.state >= TaskState.FINISHED_MASK and self.task_filter.state <= TaskState.FINISHED_MASK)
+                or (
+                    subprocess._deferred_tasks is not None
+                    and not subprocess._deferred_tasks._subtree_states & self.task_filter.state
+                )
             ):
-                subprocess_tasks = []
+                self._add_next_tasks(task._get_children(), depth + 1)
+            elif self.depth_first:
+                self._add_next_tasks([subprocess.task_tree] + task._get_children(), depth + 1)
             else:
-                subprocess_tasks = [subprocess.task_tree]
-
-            if self.depth_first:
-                next_tasks = subprocess_tasks + task.children
-                self.task_list = next_tasks + self.task_list
-            else:
-                next_tasks = task.children + subprocess_tasks
-                self.task_list.extend(next_tasks)
-
-            self._update_depth(task)
-
-        elif self.depth_first and self.task_list:
-            self._handle_leaf_depth(task)
+                self._add_next_tasks(task._get_children() + [subprocess.task_tree], depth + 1)
 
+        self.depth = depth
         return task
@@ -17,6 +17,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
+import asyncio
 import warnings
 
 from SpiffWorkflow.task import Task
@@ -28,6 +29,8 @@ from SpiffWorkflow.bpmn.specs.event_definitions.timer import TimerEventDefinitio
 
 from SpiffWorkflow.bpmn.util.subworkflow import BpmnBaseWorkflow, BpmnSubWorkflow
 from SpiffWorkflow.bpmn.util.event import EventManager
+from SpiffWorkflow.bpmn.util.scheduler import TaskScheduler
+from SpiffWorkflow.bpmn.util.service import ServiceCallManager
 
 from .script_engine.python_engine import PythonScriptEngine
 
@@ -51,6 +54,8 @@ class BpmnWorkflow(BpmnBaseWorkflow):
         self.bpmn_events = []
         self.correlations = {}
         self.event_manager = EventManager(self)
+        self.scheduler = TaskScheduler(self)
+        self.service_calls = ServiceCallManager(self)
         super().__init__(spec, **kwargs)
 
         for obj in self.spec.data_objects:
@@ -88,6 +93,7 @@ class BpmnWorkflow(BpmnBaseWorkflow):
             parent_task_id=my_task.id,
             top_workflow=self)
         self.subprocesses[my_task.id] = subprocess
+        my_task._invalidate_subtree_states()
         return subprocess
 
     def get_subprocess(self, my_task):
@@ -99,6 +105,7 @@ class BpmnWorkflow(BpmnBaseWorkflow):
         for sp in [c for c in self.subprocesses.values() if c.parent_workflow == subprocess]:
             tasks.extend(self.delete_subprocess(self.get_task_from_id(sp.parent_task_id)))
         del self.subprocesses[my_task.id]
+        my_task._invalidate_subtree_states()
         return tasks
 
     def get_active_subprocesses(self):
@@ -131,25 +138,53 @@ class BpmnWorkflow(BpmnBaseWorkflow):
 
         :param will_complete_task: Callback that will be called prior to completing a task
         :param did_complete_task: Callback that will be called after completing a task
+
+        Batched state hooks are called with the state changes when all the tasks have run.
         """
+        self.scheduler.refresh()
         count = self._do_engine_steps(will_complete_task, did_complete_task)
         while count > 0:
             count = self._do_engine_steps(will_complete_task, did_complete_task)
         self.refresh_timers()
+        self.flush_state_changes()
+
+    async def async_do_engine_steps(self, max_concurrency=None, will_complete_task=None, did_complete_task=None):
+        """
+        Execute READY engine tasks as `do_engine_steps` does, until only tasks that cannot
+        be run by the engine are left, awaiting the service calls made by service tasks.
+
+        Service tasks whose calls return coroutines are left STARTED while their calls
+        run, so service tasks in parallel branches are run concurrently; each task is
+        completed when its call finishes, and the tasks that follow it are then run.
+
+        :param max_concurrency: the maximum number of service calls awaited at once
+        :param will_complete_task: Callback that will be called prior to completing a task
+        :param did_complete_task: Callback that will be called after completing a task
+        """
+        self.service_calls.limit = asyncio.Semaphore(max_concurrency) if max_concurrency is not None else None
+        self.service_calls.awaiting = True
+        try:
+            self.do_engine_steps(will_complete_task, did_complete_task)
+            while len(self.service_calls.calls) > 0:
+                await self.service_calls.wait_for_calls()
+                self.complete_service_tasks()
+                self.do_engine_steps(will_complete_task, did_complete_task)
+        finally:
+            self.service_calls.limit = None
+            self.service_calls.awaiting = False
 
     def _do_engine_steps(self, will_complete_task=None, did_complete_task=None):
 
         def update_workflow(wf):
             count = 0
-            # Wanted to use the iterator method here, but at least this is a shorter list
-            for task in wf.get_tasks(state=TaskState.READY):
-                if not task.task_spec.manual:
-                    if will_complete_task is not None:
-                        will_complete_task(task)
-                    task.run()
-                    count += 1
-                    if did_complete_task is not None:
-                        did_complete_task(task)
+            # Tasks that become ready while these run are queued for the next pass
+            for task in self.scheduler.pop_tasks(wf):
+                if will_complete_task is not None:
+                    will_complete_task(task)
+                task.run()
+                count += 1
+                if did_complete_task is not None:
+                    did_complete_task(task)
             return count
 
         active_subprocesses = self.get_active_subprocesses()
@@ -164,6 +199,24 @@ class BpmnWorkflow(BpmnBaseWorkflow):
         count = update_workflow(self)
         return count > 0 or len(self.get_active_subprocesses()) > len(active_subprocesses)
 
+    def complete_service_tasks(self, wait=False, timeout=None):
+        """
+        Complete the STARTED service tasks whose calls have finished.  This does not run
+        any tasks that become READY; call `do_engine_steps` afterwards.
+
+        Only calls that return a `concurrent.futures.Future` can be waited for here.  Service
+        calls that return coroutines must be run with `async_do_engine_steps` if an event loop
+        is running.
+
+        :param wait: wait until at least one call has finished
+        :param timeout: the maximum number of seconds to wait
+
+        :returns: the tasks that were completed
+        """
+        completed = self.service_calls.complete(wait, timeout)
+        self.flush_state_changes()
+        return completed
+
     def refresh_waiting_tasks(self, will_refresh_task=None, did_refresh_task=None):
         """
         Refresh the state of all WAITING tasks. This will, for example, update
@@ -181,8 +181,8 @@ def valueof(scope, op, default=None):
     if op is None:
         return default
     elif isinstance(op, Attrib):
-        if op.name not in scope.data:
-            logger.debug("Attrib('{op.name}') not present in task data", extra=scope.collect_log_extras({'data': scope.data}))
+        if op.name not in scope.data and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Attrib('{op.name}') not present in task data", extra=scope.collect_log_extras({'data': scope.data}))
         return scope.get_data(op.name, default)
     elif isinstance(op, PathAttrib):
         if not op.path:
@@ -191,7 +191,8 @@ def valueof(scope, op, default=None):
         data = scope.data
         for part in parts:
             if part not in data:
-                logger.debug(f"PathAttrib('{op.name}') not present in task data",  extra=scope.collect_log_extras({'data': scope.data}))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"PathAttrib('{op.name}') not present in task data", extra=scope.collect_log_extras({'data': scope.data}))
                 return default
             data = data[part]  # move down the path
         return data
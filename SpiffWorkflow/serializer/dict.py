@@ -510,7 +510,7 @@ class DictionarySerializer(Serializer):
         s_state['triggered'] = task.triggered
         s_state['task_spec'] = task.task_spec.name
         s_state['last_state_change'] = task.last_state_change
-        s_state['data'] = self.serialize_dict(task.data)
+        s_state['data'] = self.serialize_dict(task._peek_data())
         s_state['internal_data'] = task.internal_data
         return s_state
 
@@ -525,10 +525,9 @@ class DictionarySerializer(Serializer):
         task_id = s_state['id']
         parent_id = s_state['parent']
         parent = workflow.get_task_from_id(parent_id) if parent_id is not None else None
-        task = Task(workflow, task_spec, parent, id=task_id)
+        task = Task(workflow, task_spec, parent, state=s_state['state'], id=task_id)
 
         task.children = self._deserialize_task_children(task, s_state, ignored_specs)
-        task._state = s_state['state']
         task.triggered = s_state['triggered']
         task.last_state_change = s_state['last_state_change']
         task.data = self.deserialize_dict(s_state['data'])
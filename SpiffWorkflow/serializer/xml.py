@@ -696,7 +696,7 @@ class XmlSerializer(Serializer):
         SubElement(elem, 'spec').text = task.task_spec.name
         SubElement(elem, 'last-state-change').text = str(
             task.last_state_change)
-        self.serialize_value_map(SubElement(elem, 'data'), task.data)
+        self.serialize_value_map(SubElement(elem, 'data'), task._peek_data())
         internal_data_elem = SubElement(elem, 'internal-data')
         self.serialize_value_map(internal_data_elem, task.internal_data)
 
@@ -714,16 +714,15 @@ class XmlSerializer(Serializer):
         # when children are deserialized
         parent_id = elem.findtext('parent')
         parent = workflow.tasks[UUID(parent_id)] if parent_id is not None else None
-        task = Task(workflow, task_spec, parent, id=task_id)
+        state_name = elem.findtext('state')
+        state_value = TaskState.get_value(state_name)
+        assert state_value is not None
+        task = Task(workflow, task_spec, parent, state=state_value, id=task_id)
 
         for child_elem in elem.find('children'):
             child_task = self.deserialize_task(workflow, child_elem)
             task.children.append(child_task)
 
-        state_name = elem.findtext('state')
-        state_value = TaskState.get_value(state_name)
-        assert state_value is not None
-        task._state = state_value
         task.triggered = elem.find('triggered') is not None
         task.last_state_change = float(elem.findtext('last-state-change'))
         task.data = self.deserialize_value_map(elem.find('data'))
@@ -71,10 +71,9 @@ class MultiInstance(TaskSpec):
             state = TaskState.READY
         else:
             state = TaskState.FUTURE
-        for output in self.outputs:
-            new_task = my_task._add_child(output, state)
+        for new_task in my_task._add_children_bulk(self.outputs, state):
             new_task.triggered = True
-            output._predict(new_task, mask=TaskState.FUTURE|TaskState.READY|TaskState.PREDICTED_MASK)
+            new_task.task_spec._predict(new_task, mask=TaskState.FUTURE|TaskState.READY|TaskState.PREDICTED_MASK)
 
     def _get_predicted_outputs(self, my_task):
         split_n = int(valueof(my_task, self.times, 1))
@@ -103,7 +103,7 @@ class SubWorkflow(TaskSpec):
             my_task.workflow.tasks[task.id] = task
         subworkflow.tasks[my_task.id] = my_task
         subworkflow.task_tree.parent = my_task
-        my_task._children.insert(0, subworkflow.task_tree.id)
+        my_task._children = [subworkflow.task_tree.id] + my_task._children
         subworkflow.completed_event.connect(self._on_subworkflow_completed, my_task)
         my_task._set_internal_data(subworkflow=subworkflow)
         my_task._set_state(TaskState.WAITING)
@@ -56,7 +56,8 @@ class Transform(TaskSpec):
 
         if self.transforms:
             for transform in self.transforms:
-                logger.debug('Execute transform', extra=my_task.collect_log_extras({'transform': transform}))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('Execute transform', extra=my_task.collect_log_extras({'transform': transform}))
                 exec(transform)
         return True
 
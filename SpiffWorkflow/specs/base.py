@@ -267,7 +267,10 @@ class TaskSpec:
         Returning True will cause the task to go into READY.
         """
         my_task._inherit_data()
-        self.update_event.emit(my_task.workflow, my_task)
+        batch = my_task.workflow._task_batch
+        if batch is None or my_task.id not in batch:
+            # Tasks updated as a group emit the event once, after they have all been updated
+            self.update_event.emit(my_task.workflow, my_task)
         return True
 
     def _on_ready(self, my_task):
@@ -312,14 +315,23 @@ class TaskSpec:
         # This is the easiest way of dealing with all other errors.
         try:
             result = self._run_hook(my_task)
-            # Run user code, if any.
-            for assignment in self.post_assign:
-                assignment.assign(my_task, my_task)
+            self._post_assign(my_task)
             return result
         except Exception as exc:
             my_task.error()
             raise exc
 
+    def _post_assign(self, my_task):
+        """
+        Make the post assignments; this is called by _run() after the task specific work is done.
+
+        :type  my_task: Task
+        :param my_task: The associated task in the task tree.
+        """
+        # Run user code, if any.
+        for assignment in self.post_assign:
+            assignment.assign(my_task, my_task)
+
     def _run_hook(self, my_task):
         """
         A hook into _run() that does the task specific work.
@@ -17,7 +17,10 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
+import asyncio
+import inspect
 import json
+from concurrent.futures import Future
 
 from SpiffWorkflow.bpmn.specs.mixins.service_task import ServiceTask
 
@@ -59,5 +62,15 @@ class ServiceTask(ServiceTask):
             operation_name=self.operation_name,
             operation_params=self.evalutate_params(task),
         )
-        task.data[self.result_variable] = json.loads(result)
+        service_calls = task.workflow.top_workflow.service_calls
+        if inspect.isawaitable(result):
+            result = service_calls.schedule(task, result)
+        if isinstance(result, (Future, asyncio.Future)):
+            # Leave the task STARTED until the call finishes
+            service_calls.add_call(task, result)
+            return None
+        self._update_service_result(task, result)
         return True
+
+    def _update_service_result(self, task, result):
+        task.data[self.result_variable] = json.loads(result)
@@ -18,10 +18,12 @@
 # 02110-1301  USA
 
 from copy import deepcopy
+from functools import reduce
 
 import logging
 import time
-from typing import Optional, Any, TYPE_CHECKING
+from collections.abc import Mapping
+from typing import Optional, Any, Callable, TYPE_CHECKING
 from uuid import uuid4, UUID
 
 if TYPE_CHECKING:
@@ -31,6 +33,7 @@ from .specs import StartTask
 from .specs.base import TaskSpec
 from .util.task import TaskState, TaskIterator
 from .util.deep_merge import DeepMerge
+from .util.persistent_dict import PersistentDict
 from .exceptions import WorkflowException
 
 logger = logging.getLogger('spiff.task')
@@ -59,10 +62,27 @@ class Task:
     Warning:
         The `data` attribute represents the state of the data as this particular task is executed. It is copied from
         its parent when the task is updated (this can behavior can be modified in the `TaskSpec.update` method).
-        This can be VERY resource intensive in large workflows or with lots of data.
+        This can be VERY resource intensive in large workflows or with lots of data.  If the workflow's
+        `copy_on_write_data` option is set, a task shares its parent's data until either task's `data` is accessed,
+        so that only data that might be modified is copied.  If the `persistent_data` option is set, data is stored
+        as a `PersistentDict` snapshot when a child inherits it, so that tasks share all unchanged keys with their
+        parents, and it is converted back to a dict when it is accessed.  Tasks restored from a serialization share
+        unchanged values with their parents in the same way, regardless of these options.
+
+    Note:
+        Tasks define `__slots__` to keep the per task overhead down, and `data` and `internal_data` are not allocated
+        until they are first accessed, since most predicted tasks never use them.  A `__dict__` slot is retained
+        so that task specs and applications can still set arbitrary attributes; it is only allocated when used.
     """
 
+    __slots__ = (
+        'id', 'workflow', 'task_spec', 'thread_id', 'triggered', 'last_state_change',
+        '_state', '_parent_id', '_parent_task', '_child_ids', '_child_tasks', '_depth', '_subtree_states', '_child_states', '_data', '_internal_data',
+        '_data_shared', '_data_snapshot', '_data_borrowed', '__dict__',
+    )
+
     thread_id_pool = 0    # Pool for assigning a unique thread id to every new Task.
+    _max_scanned_children = 16    # Tasks with more children count the states of their children instead
 
     def __init__(
         self,
@@ -84,21 +104,37 @@ class Task:
         """
         self.id = id or uuid4()
         workflow.tasks[self.id] = self
+        workflow._state_index[state].add(self.id)
+        if state & TaskState.NOT_FINISHED_MASK:
+            workflow._unfinished_task_count += 1
+        if workflow._dirty_tasks is not None:
+            workflow._dirty_tasks[self.id] = False
         self.workflow = workflow
 
-        self._parent = parent.id if parent is not None else None
-        self._children = []
+        # The ids are what gets serialized; the task objects and depth are resolved as needed and cached
+        self._parent_id = parent.id if parent is not None else None
+        self._parent_task = parent
+        self._child_ids = []
+        self._child_tasks = None
+        self._depth = None
         self._state = state
+        # The states of this task and its descendants, or None if they need to be recomputed
+        self._subtree_states = state
+        # The number of children whose masks include each state, only kept for tasks with many children
+        self._child_states = None
 
         self.triggered = False
         self.task_spec = task_spec if task_spec else StartTask(workflow.spec)
 
         self.thread_id = self.__class__.thread_id_pool
-        self.data = {}
-        self.internal_data = {}
+        self._data = None
+        self._data_shared = None
+        self._data_snapshot = None
+        self._data_borrowed = False
+        self._internal_data = None
         self.last_state_change = time.time()
-        if _parent := self.parent:
-            _parent._child_added_notify(self)
+        if parent is not None:
+            parent._child_added_notify(self)
 
     @property
     def state(self) -> int:
@@ -118,33 +154,141 @@ class Task:
             )
         self._set_state(value)
 
+    @property
+    def data(self) -> dict:
+        """This task's data."""
+        # The data might be modified once it is returned
+        self._mark_dirty(True)
+        if self._data is None:
+            self._data = {}
+        elif self._data_shared is not None:
+            if self._data_shared[0] > 1:
+                # Other tasks still refer to the shared dict, so we need our own copy before it can be modified
+                self._data = DeepMerge.merge({}, self._data)
+            self._release_data()
+        elif self._data_borrowed:
+            # The values still belong to the task the data was derived from
+            self._data = DeepMerge.merge({}, self._data)
+            self._data_borrowed = False
+        elif isinstance(self._data, PersistentDict):
+            # Keep the snapshot so that the unchanged values can be shared again when the data is next snapshotted;
+            # the values are copied so that modifying nested values does not change the snapshot
+            self._data_snapshot = self._data
+            self._data = deepcopy(dict(self._data.items()))
+        return self._data
+
+    @data.setter
+    def data(self, value: dict) -> None:
+        self._mark_dirty(True)
+        self._release_data()
+        if isinstance(self._data, PersistentDict):
+            self._data_snapshot = self._data
+        self._data = value
+
+    def snapshot_data(self) -> PersistentDict:
+        """Return an immutable snapshot of this task's data.
+
+        If the workflow's `persistent_data` option is set, the task keeps the snapshot, and its values are shared
+        with the previous snapshot wherever they are unchanged.  Otherwise the snapshot is a copy of the data.
+        """
+        if isinstance(self._data, PersistentDict):
+            return self._data
+        elif not self.workflow.persistent_data:
+            return PersistentDict(deepcopy(self._peek_data()))
+        base = self._data_snapshot if self._data_snapshot is not None else PersistentDict()
+        snapshot = base.sync(self._peek_data(), copy_value=deepcopy)
+        self._release_data()
+        self._data, self._data_snapshot = snapshot, None
+        return snapshot
+
+    @property
+    def internal_data(self) -> dict:
+        """Information relevant to the task state or execution."""
+        self._mark_dirty()
+        if self._internal_data is None:
+            self._internal_data = {}
+        return self._internal_data
+
+    @internal_data.setter
+    def internal_data(self, value: dict) -> None:
+        self._mark_dirty()
+        self._internal_data = value
+
     @property
     def parent(self) -> Optional["Task"]:
         """This task's parent task."""
-        return self.workflow.tasks.get(self._parent)
+        if self._parent_task is None and self._parent_id is not None:
+            self._parent_task = self.workflow.tasks.get(self._parent_id)
+        return self._parent_task
 
     @parent.setter
     def parent(self, task: Optional["Task"]) -> None:
-        self._parent = task.id if task is not None else None
+        self._mark_dirty()
+        self._parent_id = task.id if task is not None else None
+        self._parent_task = task
+        self._reset_depth()
+        self._invalidate_parent_states()
+
+    @property
+    def _parent(self) -> Optional[UUID]:
+        """The id of this task's parent."""
+        return self._parent_id
+
+    @_parent.setter
+    def _parent(self, task_id: Optional[UUID]) -> None:
+        self._mark_dirty()
+        self._parent_id = task_id
+        self._parent_task = None
+        self._reset_depth()
+        self._invalidate_parent_states()
 
     @property
     def children(self) -> list["Task"]:
         """This task's child tasks."""
-        return [self.workflow.tasks.get(child) for child in self._children]
+        return self._get_children()[:]
 
     @children.setter
     def children(self, tasks: list["Task"]) -> None:
-        self._children = [child.id for child in tasks]
+        self._mark_dirty()
+        self._child_ids = [child.id for child in tasks]
+        self._child_tasks = list(tasks)
+        self._invalidate_subtree_states()
+
+    def _get_children(self) -> list["Task"]:
+        """Return the cached list of child tasks, which must not be modified."""
+        if self._child_tasks is None:
+            children = [self.workflow.tasks.get(child) for child in self._child_ids]
+            if None in children:
+                # Don't cache anything if some of the children haven't been added to the workflow yet
+                return children
+            self._child_tasks = children
+        return self._child_tasks
+
+    @property
+    def _children(self) -> list[UUID]:
+        """The ids of this task's children."""
+        return self._child_ids
+
+    @_children.setter
+    def _children(self, task_ids: list[UUID]) -> None:
+        self._mark_dirty()
+        self._child_ids = list(task_ids)
+        self._child_tasks = None
+        self._invalidate_subtree_states()
 
     @property
     def depth(self) -> int:
         """The task's depth."""
-        depth = 0
-        task = self.parent
-        while task is not None:
-            depth += 1
-            task = task.parent
-        return depth
+        if self._depth is None:
+            ancestors, task = [], self
+            while task is not None and task._depth is None:
+                ancestors.append(task)
+                task = task.parent
+            depth = task._depth if task is not None else -1
+            for task in reversed(ancestors):
+                depth += 1
+                task._depth = depth
+        return self._depth
 
     def has_state(self, state: int) -> bool:
         """Check the state of this task.
@@ -172,7 +316,7 @@ class Task:
         Returns:
             the value of the key, or the default
         """
-        return self.data.get(name, default)
+        return self._peek_data().get(name, default)
 
     def reset_branch(self, data: Optional[dict]) -> list["Task"]:
         """Removes all descendants of this task and set this task to be runnable.
@@ -183,9 +327,10 @@ class Task:
         Returns:
             Tasks removed from the tree.
         """
-        logger.info(f'Branch reset', extra=self.collect_log_extras())
-        self.internal_data = {}
-        self.data = deepcopy(self.parent.data) if data is None else data    
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f'Branch reset', extra=self.collect_log_extras())
+        self._internal_data = None
+        self.data = deepcopy(dict(self.parent._peek_data())) if data is None else data    
         descendants = list(self)
         self._drop_children(force=True)
         self._set_state(TaskState.FUTURE)
@@ -244,6 +389,76 @@ class Task:
             task._ready()
         return task
 
+    def _add_children_bulk(self, task_specs: list[TaskSpec], state: int = TaskState.MAYBE) -> list["Task"]:
+        """Adds a new child for each of the given TaskSpecs.
+
+        This is equivalent to calling `_add_child` for each spec, but this task is only notified once, so it is
+        much faster when a task has many children (eg, the instances of a parallel multi-instance task).
+
+        Args:
+            task_specs: The specs associated with the children.
+            state: The state to assign.
+
+        Returns:
+            The new child `Task`s.
+
+        Raises:
+            `WorkflowException`: if an invalid task addition occurs
+        """
+        if self.has_state(TaskState.PREDICTED_MASK) and state & TaskState.PREDICTED_MASK == 0:
+            raise WorkflowException('Attempt to add non-predicted child to predicted task', task_spec=self.task_spec)
+        children = []
+        for task_spec in task_specs:
+            task = Task(self.workflow, task_spec, state=state)
+            task._parent_id, task._parent_task, task.thread_id = self.id, self, self.thread_id
+            children.append(task)
+        if len(children) > 0:
+            self._mark_dirty()
+            self._child_ids.extend(child.id for child in children)
+            if self._child_tasks is not None:
+                self._child_tasks.extend(children)
+            self._update_subtree_states(state, 0, len(children))
+        if state == TaskState.READY:
+            self._batch_updates(children, Task._ready)
+        return children
+
+    def _update_children_bulk(self, children: list["Task"]) -> None:
+        """Updates children that were added with `_add_children_bulk`.
+
+        This is equivalent to calling `TaskSpec._update` for each child, but the state changes are logged with
+        one record per state, and each spec's update event is emitted once, with the list of its children, rather
+        than once per child.
+
+        Args:
+            children: The children to update.
+        """
+        self._batch_updates(children, lambda child: child.task_spec._update(child))
+        updated = {}
+        for child in children:
+            updated.setdefault(child.task_spec.name, []).append(child)
+        for tasks in updated.values():
+            tasks[0].task_spec.update_event.emit(self.workflow, tasks)
+
+    def _batch_updates(self, tasks: list["Task"], update: Callable[["Task"], None]) -> None:
+        """Applies an update to each of the tasks, logging their state changes with one record per new state."""
+        batch, states = self.workflow._task_batch, [task._state for task in tasks]
+        self.workflow._task_batch = set(task.id for task in tasks).union(batch or ())
+        try:
+            for task in tasks:
+                update(task)
+        finally:
+            self.workflow._task_batch = batch
+        if logger.isEnabledFor(logging.INFO):
+            changed = {}
+            for task, state in zip(tasks, states):
+                if task._state != state:
+                    changed.setdefault(task._state, []).append(task)
+            for state, group in changed.items():
+                logger.info(
+                    f'State changed to {TaskState.get_name(state)}',
+                    extra=group[0].collect_log_extras({'task_ids': [task.id for task in group]})
+                )
+
     def _sync_children(self, task_specs: list[TaskSpec], state: int = TaskState.MAYBE) -> None:
         """Syncs the task's children with the given list of task specs.
 
@@ -281,12 +496,128 @@ class Task:
         # Update children accordingly
         for child in unneeded_children:
             self.workflow._remove_task(child.id)
-        for task_spec in new_children:
-            self._add_child(task_spec, state)
+        self._add_children_bulk(new_children, state)
 
     def _child_added_notify(self, child: "Task") -> None:
         """Called by another task to let us know that a child was added."""
-        self._children.append(child.id)
+        self._mark_dirty()
+        self._child_ids.append(child.id)
+        if self._child_tasks is not None:
+            self._child_tasks.append(child)
+        self._update_subtree_states(child._get_subtree_states(), 0, 1)
+
+    def _child_removed_notify(self, child: "Task") -> None:
+        """Called by the workflow to let us know that a child was removed."""
+        self._mark_dirty()
+        self._child_ids.remove(child.id)
+        if self._child_tasks is not None:
+            self._child_tasks.remove(child)
+        if child._subtree_states is None:
+            self._invalidate_subtree_states()
+        else:
+            self._update_subtree_states(0, child._subtree_states, 1)
+
+    def _reset_depth(self) -> None:
+        """Clear the cached depth of this task and its descendants."""
+        tasks = [self]
+        while tasks:
+            task = tasks.pop()
+            if task._depth is not None or task is self:
+                task._depth = None
+                tasks.extend(child for child in task.children if child is not None)
+
+    def _get_subtree_states(self) -> int:
+        """Returns the states of this task and all its descendants combined into a mask.
+
+        The mask is cached and updated as tasks change state, so that a `TaskIterator` can skip subtrees that
+        contain no tasks in the requested states.
+        """
+        if self._subtree_states is None:
+            # Compute the masks from the bottom up, starting from any descendants that are already up to date
+            tasks = [self]
+            while tasks:
+                task = tasks[-1]
+                children = task.workflow._get_subtree_children(task)
+                pending = [child for child in children if child is not None and child._subtree_states is None]
+                if pending:
+                    tasks.extend(pending)
+                    continue
+                states = task._state
+                for child in children:
+                    states |= child._subtree_states if child is not None else TaskState.ANY_MASK
+                task._subtree_states = states
+                tasks.pop()
+        return self._subtree_states
+
+    def _update_subtree_states(self, added: int, removed: int, children: int = 0) -> None:
+        """Add states to and remove states from the masks of this task and its ancestors.
+
+        Updates stop as soon as a mask does not change, so a state change usually affects only a few tasks.
+
+        Args:
+            added: states added to the task (or to the mask of one of its children)
+            removed: states removed from the task (or from the mask of one of its children)
+            children: the number of children whose masks changed (0 if the states belong to the task itself)
+        """
+        if self.workflow.tasks.get(self.id) is not self:
+            # Tasks that have been removed from the workflow (eg, cancelled descendants) are not part of the tree
+            return
+        task = self
+        while task is not None and task._subtree_states is not None:
+            current, counts = task._subtree_states, task._child_states
+            if counts is not None and children > 0:
+                states = current | added
+                changed = added | removed
+                while changed:
+                    state = changed & -changed
+                    changed ^= state
+                    if state & added:
+                        counts[state] = counts.get(state, 0) + children
+                    else:
+                        counts[state] -= children
+                        if counts[state] == 0:
+                            del counts[state]
+                            states &= ~state | task._state
+            elif counts is not None:
+                states = reduce(lambda x, y: x | y, counts, task._state)
+            else:
+                states = current | added
+                # A removed state is kept if the task or any of its other descendants is still in it
+                removed &= states & ~added & ~task._state
+                if removed:
+                    subtree = task.workflow._get_subtree_children(task)
+                    if len(subtree) > self._max_scanned_children and None not in subtree:
+                        # Rather than scanning all the children each time one changes, count them once
+                        counts = task._child_states = {}
+                        for child in subtree:
+                            for state in TaskState._values:
+                                if state & child._get_subtree_states():
+                                    counts[state] = counts.get(state, 0) + 1
+                        states = reduce(lambda x, y: x | y, counts, task._state)
+                    else:
+                        for child in subtree:
+                            removed &= ~child._get_subtree_states() if child is not None else 0
+                            if not removed:
+                                break
+                        states &= ~removed
+            if states == current:
+                break
+            task._subtree_states = states
+            added, removed, children = states & ~current, current & ~states, 1
+            task = task.workflow._get_subtree_parent(task)
+
+    def _invalidate_subtree_states(self) -> None:
+        """Clear the masks of this task and its ancestors so that they are recomputed when next needed."""
+        task = self
+        while task is not None and task._subtree_states is not None:
+            task._subtree_states = None
+            task._child_states = None
+            task = task.workflow._get_subtree_parent(task)
+
+    def _invalidate_parent_states(self) -> None:
+        parent = self.workflow._get_subtree_parent(self)
+        if parent is not None:
+            parent._invalidate_subtree_states()
 
     def _drop_children(self, force: bool = False):
         """Remove this task's children from the tree."""
@@ -305,15 +636,34 @@ class Task:
         """Force set the state on a task"""
 
         if value != self.state:
-            elapsed = time.time() - self.last_state_change
-            self.last_state_change = time.time()
-            self._state = value
-            logger.info(
-                f'State changed to {TaskState.get_name(value)}',
-                extra=self.collect_log_extras({'elapsed': elapsed})
-            )
-        else:
+            now = time.time()
+            elapsed = now - self.last_state_change
+            self.last_state_change = now
+            index = self.workflow._state_index
+            index[self._state].discard(self.id)
+            index[value].add(self.id)
+            if value & TaskState.NOT_FINISHED_MASK:
+                if not self._state & TaskState.NOT_FINISHED_MASK:
+                    self.workflow._unfinished_task_count += 1
+            elif self._state & TaskState.NOT_FINISHED_MASK:
+                self.workflow._unfinished_task_count -= 1
+            removed, self._state = self._state, value
+            self._mark_dirty()
+            self._update_subtree_states(value, removed)
+            batch = self.workflow._task_batch
+            if logger.isEnabledFor(logging.INFO) and (batch is None or self.id not in batch):
+                logger.info(
+                    f'State changed to {TaskState.get_name(value)}',
+                    extra=self.collect_log_extras({'elapsed': elapsed})
+                )
+            hooks = self.workflow._state_hooks
+            if hooks:
+                for hook in hooks:
+                    hook(self, removed, value, now)
+        elif logger.isEnabledFor(logging.DEBUG):
             logger.debug(f'State set to {TaskState.get_name(value)}', extra=self.collect_log_extras())
+        if value == TaskState.READY:
+            self.workflow._task_ready_notify(self)
 
     def _assign_new_thread_id(self, recursive: bool = True) -> int:
         """Assigns a new thread id to the task."""
@@ -328,7 +678,74 @@ class Task:
 
     def _inherit_data(self) -> None:
         """Inherits data from the parent."""
-        self.data = DeepMerge.merge(self.data, self.parent.data)
+        if self.workflow.persistent_data:
+            snapshot = self.parent.snapshot_data()
+            if not self._data:
+                self._mark_dirty(True)
+                self._release_data()
+                self._data, self._data_snapshot = snapshot, None
+            else:
+                self.data = DeepMerge.merge(self.data, deepcopy(dict(snapshot.items())))
+        elif self.workflow.copy_on_write_data and not self._data:
+            self._share_data(self.parent)
+        else:
+            self.data = DeepMerge.merge(self.data, self.parent._peek_data())
+
+    def _share_data(self, task: "Task") -> None:
+        """Use another task's data until one of the tasks accesses it."""
+        if task._data is None:
+            task._data = {}
+        if task._data_shared is None:
+            # The number of tasks referring to the dict; this is shared by all of them
+            task._data_shared = [1]
+        self._mark_dirty(True)
+        self._release_data()
+        task._data_shared[0] += 1
+        self._data = task._data
+        self._data_shared = task._data_shared
+
+    def _mark_dirty(self, data: bool = False) -> None:
+        """Record that this task was changed since the workflow's last checkpoint, if changes are being tracked.
+
+        Args:
+            data: whether the task's data might have changed
+        """
+        dirty = self.workflow._dirty_tasks
+        if dirty is not None:
+            if data:
+                dirty[self.id] = True
+            elif self.id not in dirty:
+                dirty[self.id] = False
+
+    def _borrow_data(self, task: "Task", updates: dict, deletions: list) -> None:
+        """Use a copy of another task's data with some keys updated or deleted.
+
+        The unchanged values are shared with the other task until this task's data is accessed.
+        """
+        data = dict(task._peek_data())
+        data.update(updates)
+        for key in deletions:
+            data.pop(key, None)
+        self._mark_dirty(True)
+        self._release_data()
+        self._data = data
+        self._data_borrowed = True
+
+    def _release_data(self) -> None:
+        """Stop counting this task as a user of shared data."""
+        self._data_borrowed = False
+        if self._data_shared is not None:
+            self._data_shared[0] -= 1
+            self._data_shared = None
+
+    def _peek_data(self) -> Mapping:
+        """Return this task's data without copying it if it is shared or a snapshot.  The result must not be
+        modified, and may be a `PersistentDict`."""
+        return self._data if self._data is not None else {}
+
+    def _peek_internal_data(self) -> dict:
+        """Return this task's internal data without recording a possible change.  The result must not be modified."""
+        return self._internal_data if self._internal_data is not None else {}
 
     def _set_internal_data(self, **kwargs) -> None:
         """Defines the given attribute/value pairs in this task's internal data."""
@@ -336,7 +753,7 @@ class Task:
 
     def _get_internal_data(self, name: str, default: Optional[Any] = None) -> Optional[Any]:
         """Retrieves an internal data field."""
-        return self.internal_data.get(name, default)
+        return self._internal_data.get(name, default) if self._internal_data is not None else default
 
     def _ready(self) -> None:
         """Marks the task as ready for execution."""
@@ -383,6 +800,8 @@ class Task:
         """Marks this task complete."""
         self._set_state(TaskState.COMPLETED)
         self.task_spec._on_complete(self)
+        if self.workflow.persistent_data:
+            self.snapshot_data()
 
     def error(self) -> None:
         """Marks this task as error."""
@@ -397,7 +816,11 @@ class Task:
         self.task_spec._on_trigger(self, *args)
 
     def collect_log_extras(self, dct: Optional[dict] = None) -> dict:
-        """Return logging details for this task"""
+        """Return logging details for this task.
+
+        Building these is relatively expensive, so callers should check that the logger is enabled for the
+        level of the record first.  The task data is included only when debug logging is enabled.
+        """
         extra = {
             'workflow_spec': self.workflow.spec.name,
             'task_spec': self.task_spec.name,
@@ -406,14 +829,14 @@ class Task:
             'state': TaskState.get_name(self._state),
             'last_state_change': self.last_state_change,
             'elapsed': 0,
-            'parent': None if self.parent is None else self.parent.id,
+            'parent': self._parent_id,
         }
         if dct is not None:
             extra.update(dct)
-        if logger.level < 20:
+        if logger.isEnabledFor(logging.DEBUG):
             extra.update({
-                'data': self.data if logger.level < 20 else None,
-                'internal_data': self.internal_data if logger.level < 20 else None,
+                'data': self._peek_data(),
+                'internal_data': self._peek_internal_data(),
             })
         return extra
 
@@ -19,6 +19,8 @@
 
 from copy import copy
 
+_MISSING = object()
+
 class DeepMerge:
     # Merges two deeply nested json-like dictionaries,
     # useful for updating things like task data.
@@ -94,7 +96,13 @@ class DeepMerge:
     @staticmethod
     def get_updated_keys(a, b):
         """get a list of keys from b that are different from a"""
-        return {key: b[key] for key in b if key not in a or b[key] != a[key]}
+        # Values that are shared are equal, so they are checked by identity before comparing them
+        updated = {}
+        for key, value in b.items():
+            previous = a.get(key, _MISSING)
+            if previous is not value and previous != value:
+                updated[key] = value
+        return updated
 
     @staticmethod
     def get_deleted_keys(a, b):
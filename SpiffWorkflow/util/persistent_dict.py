@@ -0,0 +1,258 @@
+# Copyright (C) 2023 Sartography
+#
+# This file is part of SpiffWorkflow.
+#
+# SpiffWorkflow is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3.0 of the License, or (at your option) any later version.
+#
+# SpiffWorkflow is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+
+from collections.abc import Mapping
+
+# Each level of the trie consumes this many bits of the key's hash
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+
+_missing = object()
+
+
+def _hash(key):
+    return hash(key) & _HASH_MASK
+
+
+def _same_key(a, b):
+    return a is b or a == b
+
+
+def _same_value(a, b):
+    """Check whether two values are equal and of the same types (`1`, `1.0` and `True` are equal but not the same)."""
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if type(a) in (list, tuple):
+        return len(a) == len(b) and all(_same_value(x, y) for x, y in zip(a, b))
+    if type(a) is dict:
+        return len(a) == len(b) and all(k in b and _same_value(v, b[k]) for k, v in a.items())
+    if type(a) in (set, frozenset):
+        return set((type(x), x) for x in a) == set((type(y), y) for y in b)
+    return a == b
+
+
+def _merge_entries(shift, first, first_hash, entry):
+    """Create a node containing an existing entry (or collision list) and a new entry with a different hash."""
+    top = node = {}
+    while True:
+        first_frag = (first_hash >> shift) & _MASK
+        frag = (entry[0] >> shift) & _MASK
+        if first_frag != frag:
+            node[first_frag] = first
+            node[frag] = entry
+            return top
+        # The hashes agree at this level, so both go into a single child
+        child = {}
+        node[frag] = child
+        node, shift = child, shift + _BITS
+
+
+def _lookup(node, h, key):
+    shift = 0
+    while True:
+        entry = node.get((h >> shift) & _MASK)
+        if entry is None:
+            return _missing
+        elif type(entry) is dict:
+            node, shift = entry, shift + _BITS
+        elif type(entry) is tuple:
+            return entry[2] if entry[0] == h and _same_key(entry[1], key) else _missing
+        else:
+            for eh, ek, ev in entry:
+                if eh == h and _same_key(ek, key):
+                    return ev
+            return _missing
+
+
+def _assoc(node, shift, h, key, value):
+    """Return a copy of the node with the key set (or the node itself if nothing changed), and whether the key
+    was added."""
+    frag = (h >> shift) & _MASK
+    entry = node.get(frag)
+    if entry is None:
+        replacement, added = (h, key, value), True
+    elif type(entry) is dict:
+        replacement, added = _assoc(entry, shift + _BITS, h, key, value)
+        if replacement is entry:
+            return node, False
+    elif type(entry) is tuple:
+        if entry[0] != h:
+            replacement, added = _merge_entries(shift + _BITS, entry, entry[0], (h, key, value)), True
+        elif _same_key(entry[1], key):
+            if entry[2] is value:
+                return node, False
+            replacement, added = (h, key, value), False
+        else:
+            # Different keys with the same hash are kept in a list
+            replacement, added = [entry, (h, key, value)], True
+    elif entry[0][0] != h:
+        replacement, added = _merge_entries(shift + _BITS, entry, entry[0][0], (h, key, value)), True
+    else:
+        replacement = [item for item in entry if not _same_key(item[1], key)]
+        added = len(replacement) == len(entry)
+        replacement.append((h, key, value))
+    new = node.copy()
+    new[frag] = replacement
+    return new, added
+
+
+def _dissoc(node, shift, h, key):
+    """Return a copy of the node with the key removed, or the node itself if the key was not found."""
+    frag = (h >> shift) & _MASK
+    entry = node.get(frag)
+    if entry is None:
+        return node
+    elif type(entry) is dict:
+        replacement = _dissoc(entry, shift + _BITS, h, key)
+        if replacement is entry:
+            return node
+    elif type(entry) is tuple:
+        if entry[0] != h or not _same_key(entry[1], key):
+            return node
+        replacement = None
+    else:
+        replacement = [item for item in entry if item[0] != h or not _same_key(item[1], key)]
+        if len(replacement) == len(entry):
+            return node
+        elif len(replacement) == 1:
+            replacement = replacement[0]
+    new = node.copy()
+    if replacement:
+        new[frag] = replacement
+    else:
+        del new[frag]
+    return new
+
+
+def _iter_entries(node):
+    for entry in node.values():
+        if type(entry) is dict:
+            yield from _iter_entries(entry)
+        elif type(entry) is tuple:
+            yield entry
+        else:
+            yield from entry
+
+
+class PersistentDict(Mapping):
+    """An immutable mapping that shares structure with the mappings it was derived from.
+
+    The map is a hash array mapped trie: changing a key copies only the nodes on the path to that key, so a
+    modified map costs O(log n) new storage and the rest is shared with the original.  This makes it cheap to keep
+    many versions of data that differ by a few keys (such as the data of a sequence of tasks).
+
+    The values are not copied, so they should not be modified once they are added to a map.
+    """
+
+    __slots__ = ('_root', '_len')
+
+    def __init__(self, *args, **kwargs):
+        self._root, self._len = {}, 0
+        if args or kwargs:
+            root, length = self._root, 0
+            for key, value in dict(*args, **kwargs).items():
+                root, added = _assoc(root, 0, _hash(key), key, value)
+                length += added
+            self._root, self._len = root, length
+
+    @classmethod
+    def _create(cls, root, length):
+        instance = cls.__new__(cls)
+        instance._root, instance._len = root, length
+        return instance
+
+    def __getitem__(self, key):
+        value = _lookup(self._root, _hash(key), key)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return _lookup(self._root, _hash(key), key) is not _missing
+
+    def __iter__(self):
+        return (entry[1] for entry in _iter_entries(self._root))
+
+    def __len__(self):
+        return self._len
+
+    def items(self):
+        return [(entry[1], entry[2]) for entry in _iter_entries(self._root)]
+
+    def values(self):
+        return [entry[2] for entry in _iter_entries(self._root)]
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({dict(self.items())!r})'
+
+    def __reduce__(self):
+        return self.__class__, (dict(self.items()),)
+
+    def set(self, key, value):
+        """Return a map with the key set to the value."""
+        root, added = _assoc(self._root, 0, _hash(key), key, value)
+        return self if root is self._root else self._create(root, self._len + added)
+
+    def delete(self, key):
+        """Return a map without the key.
+
+        Raises:
+            KeyError: if the key is not in the map
+        """
+        root = _dissoc(self._root, 0, _hash(key), key)
+        if root is self._root:
+            raise KeyError(key)
+        return self._create(root, self._len - 1)
+
+    def update(self, *args, **kwargs):
+        """Return a map with the keys and values of the given mapping added."""
+        root, length = self._root, self._len
+        for key, value in dict(*args, **kwargs).items():
+            root, added = _assoc(root, 0, _hash(key), key, value)
+            length += added
+        return self if root is self._root else self._create(root, length)
+
+    def sync(self, mapping, copy_value=None):
+        """Return a map with the same contents as the given mapping.
+
+        Values that are equal to (and of the same type as) the ones in this map are kept, so that only changed keys
+        use new storage.
+
+        Args:
+            mapping: the contents of the new map
+            copy_value: a function applied to the values that are added (eg, `copy.deepcopy`), so that the map
+                does not share them with the mapping (optional)
+        """
+        root, length = self._root, self._len
+        for key, value in mapping.items():
+            h = _hash(key)
+            current = _lookup(root, h, key)
+            if current is _missing or not _same_value(current, value):
+                if copy_value is not None:
+                    value = copy_value(value)
+                root, added = _assoc(root, 0, h, key, value)
+                length += added
+        if length > len(mapping):
+            for key in [key for key in self if key not in mapping]:
+                root = _dissoc(root, 0, _hash(key), key)
+                length -= 1
+        return self if root is self._root else self._create(root, length)
@@ -17,6 +17,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301  USA
 
+from collections import deque, namedtuple
 from functools import reduce
 
 
@@ -40,8 +41,9 @@ class TaskState:
       predecessors have completed and the task may now be run using `Task.run`.
 
     - STARTED: `Task.run` has been called, but the task returned
-      before finishing.  SpiffWorkflow does not track tasks in this state, as
-      it is currently unused by any of the included task specs.
+      before finishing.  Service tasks whose calls return a future are left
+      in this state until `BpmnWorkflow.complete_service_tasks` is called;
+      otherwise SpiffWorkflow does not track tasks in this state.
 
     - COMPLETED: The task was regularily completed.
 
@@ -54,12 +56,11 @@ class TaskState:
         - LIKELY and MAYBE tasks are merely predicted/guessed, so those tasks may be
           removed from the tree at runtime later.
 
-        - The STARTED state will eventually be used by SpiffWorkflow.   The intention
-          is that this state would be used if a time-consuming and/or resource intensive
-          operation was being carried out external to the workflow.  The task could
-          return immediately and its branch would not proceed until the workflow application
-          called `Task.complete`, but without blocking other branches that were ready to
-          execute.
+        - The STARTED state is used when a time-consuming and/or resource intensive
+          operation is being carried out external to the workflow.  The task returns
+          immediately and its branch does not proceed until the workflow application
+          calls `Task.complete`, but other branches that are ready to execute are not
+          blocked.
     """
     MAYBE = 1
     LIKELY = 2
@@ -80,6 +81,17 @@ class TaskState:
     _names = ['MAYBE', 'LIKELY', 'FUTURE', 'WAITING', 'READY', 'STARTED', 'COMPLETED', 'ERROR', 'CANCELLED']
     _values = [1, 2, 4, 8, 16, 32, 64, 128, 256]
 
+    # Names of states and masks (combinations of states are added as they are looked up)
+    _state_names = dict(zip(_values, _names))
+    _state_names.update({
+        FINISHED_MASK: 'FINISHED_MASK',
+        DEFINITE_MASK: 'DEFINITE_MASK',
+        PREDICTED_MASK: 'PREDICTED_MASK',
+        NOT_FINISHED_MASK: 'NOT_FINISHED_MASK',
+        ANY_MASK: 'ANY_MASK',
+    })
+    _state_values = dict((name, value) for value, name in _state_names.items())
+
     @classmethod
     def get_name(cls, state):
         """Get the name of the state or mask from the value.
@@ -90,15 +102,12 @@ class TaskState:
         Returns:
             str: the name of the state
         """
-        names = dict(zip(cls._values, cls._names))
-        names.update({
-            TaskState.FINISHED_MASK: 'FINISHED_MASK',
-            TaskState.DEFINITE_MASK: 'DEFINITE_MASK',
-            TaskState.PREDICTED_MASK: 'PREDICTED_MASK',
-            TaskState.NOT_FINISHED_MASK: 'NOT_FINISHED_MASK',
-            TaskState.ANY_MASK: 'ANY_MASK',
-        })
-        return names.get(state) or '|'.join([ names.get(v) for v in cls._values if v & state ])
+        name = cls._state_names.get(state)
+        if name is None:
+            name = '|'.join([ cls._state_names.get(v) for v in cls._values if v & state ])
+            if 0 < state <= cls.ANY_MASK:
+                cls._state_names[state] = name
+        return name
 
     @classmethod
     def get_value(cls, name):
@@ -110,20 +119,16 @@ class TaskState:
         Returns:
             int: the value of the state
         """
-        values = dict(zip(cls._names, cls._values))
-        values.update({
-            'FINISHED_MASK': TaskState.FINISHED_MASK,
-            'DEFINITE_MASK': TaskState.DEFINITE_MASK,
-            'PREDICTED_MASK': TaskState.PREDICTED_MASK,
-            'NOT_FINISHED_MASK': TaskState.NOT_FINISHED_MASK,
-            'ANY_MASK': TaskState.ANY_MASK,
-        })
         names = name.upper().split('|')
         if len(names) == 1:
-            return values.get(name.upper(), 0)
+            return cls._state_values.get(names[0], 0)
         else:
             return reduce(lambda x, y: x | y, [TaskState.get_value(v) for v in name.upper().split('|')])
 
+
+# A task state change, as delivered to batched workflow state hooks
+TaskStateChange = namedtuple('TaskStateChange', ['task', 'previous_state', 'state', 'timestamp'])
+
  
 class TaskFilter:
     """This is the default class for filtering during task iteration.
@@ -146,6 +151,7 @@ class TaskFilter:
         self.manual = manual
         self.spec_name = spec_name
         self.spec_class = spec_class
+        self._predicate = None
 
     def matches(self, task):
         """Check if the task matches this filter.
@@ -156,25 +162,128 @@ class TaskFilter:
         Returns:
             bool: indicates whether the task matches
         """
+        if self._predicate is None:
+            self._predicate = self._combine_conditions()
+        return self._predicate(task)
+
+    def compile(self):
+        """Combine the checks required by the filter values into a single predicate.
+
+        Checks are only included for values that were provided, so that a filter on state alone does not
+        test every attribute of every task.  Subclasses that override `matches` rather than `_get_conditions`
+        are respected.
+
+        Note:
+            The filter values should not be changed once the filter has been used.
+
+        Returns:
+            callable: a function that accepts a `Task` and returns whether it matches
+        """
+        if type(self).matches is not TaskFilter.matches:
+            return self.matches
+        if self._predicate is None:
+            self._predicate = self._combine_conditions()
+        return self._predicate
+
+    def _combine_conditions(self):
+        conditions = self._get_conditions()
+        if len(conditions) == 0:
+            return lambda task: True
+        elif len(conditions) == 1:
+            return conditions[0]
+        else:
+            return lambda task: all(condition(task) for condition in conditions)
+
+    def _get_conditions(self):
+        """Returns a list of functions that must all return True for a task to match."""
+
+        conditions = []
+        state, updated_ts = self.state, self.updated_ts
+        manual, spec_name, spec_class = self.manual, self.spec_name, self.spec_class
+
+        if (state & TaskState.ANY_MASK) != TaskState.ANY_MASK:
+            conditions.append(lambda task: (task._state & state) != 0)
+
+        if updated_ts:
+            conditions.append(lambda task: task.last_state_change >= updated_ts)
+
+        if manual is not None:
+            conditions.append(lambda task: task.task_spec.manual == manual)
+
+        if spec_name is not None:
+            conditions.append(lambda task: task.task_spec.name == spec_name)
+
+        if spec_class is not None:
+            conditions.append(lambda task: isinstance(task.task_spec, spec_class))
+
+        return conditions
+
+
+def depth_first_order(task, tasks, get_parent=None, max_depth=None):
+    """Sort tasks into the depth first order in which they are reached from a task.
+
+    Args:
+        task (`Task`): the task to start from
+        tasks (list(`Task`)): the tasks to sort
+        get_parent (callable): accepts a task and a dict of child positions and returns the task's parent and its
+            position among the parent's children, or (None, None) if the parent is not expanded (follows
+            `Task.parent` by default)
+        max_depth (int): omit tasks more than this many levels below the starting task
+
+    Returns:
+        list(`Task`): the tasks that are reached from the starting task, in depth first order
+    """
+    get_parent = get_parent or _get_parent
+    paths, positions, found = {task.id: (0, ())}, {}, []
+    for candidate in tasks:
+        depth, path = _get_path(candidate, paths, positions, get_parent)
+        if path is not None and (max_depth is None or depth <= max_depth):
+            found.append((path, depth, candidate))
+    found.sort(key=lambda item: item[:2])
+    return [item[2] for item in found]
+
+
+def get_child_position(parent, task, positions, include_only_child=False):
+    """Get the position of a task among its parent's children, caching the positions of all the children.
+
+    The positions of only children are omitted unless requested, so that long chains of tasks don't result in long
+    paths.
+    """
+    if len(parent._children) == 1 and not include_only_child:
+        return None
+    if parent.id not in positions:
+        positions[parent.id] = dict((child_id, idx) for idx, child_id in enumerate(parent._children))
+    return positions[parent.id][task.id]
+
+
+def _get_parent(task, positions):
+    parent = task.parent
+    return (None, None) if parent is None else (parent, get_child_position(parent, task, positions))
+
+
+def _get_path(task, paths, positions, get_parent):
+    """Get the depth and path from the first task to this one, or None if the task is not reached.
+
+    The path is a tuple of child positions; together with the depth, it sorts in depth first order.
+    """
+    chain = []
+    while task.id not in paths:
+        parent, position = get_parent(task, positions)
+        chain.append((task, position))
+        if parent is None:
+            depth, path = 0, None
+            break
+        task = parent
+    else:
+        depth, path = paths[task.id]
+
+    for task, position in reversed(chain):
+        depth += 1
+        if path is not None and position is not None:
+            path = path + (position,)
+        paths[task.id] = (depth, path)
+    return depth, path
 
-        if not task.has_state(self.state):
-            return False
-
-        if not task.last_state_change >= self.updated_ts:
-            return False
-            
-        if not (self.manual is None or task.task_spec.manual == self.manual):
-            return False
-            
-        if not (self.spec_name is None or task.task_spec.name == self.spec_name):
-            return False
-            
-        if not (self.spec_class is None or isinstance(task.task_spec, self.spec_class)):
-            return False
-        
-        
-        return True
-        
 
 class TaskIterator:
     """Default task iteration class."""
@@ -195,13 +304,19 @@ class TaskIterator:
             Keyword args not used by this class will be passed into `TaskFilter` if no `task_filter` is provided.
             This is for convenience (filter values can be used directly from `Workflow.get_tasks`) as well as
             backwards compatilibity for queries about `TaskState`.
+
+            Subtrees that contain no tasks in the requested states (according to the mask of descendant states
+            each task keeps) are skipped entirely.
         """
         self.task_filter = task_filter or TaskFilter(**kwargs)
+        self._matches = self.task_filter.compile()
         self.end_at_spec = end_at_spec
         self.max_depth = max_depth
         self.depth_first = depth_first
 
-        self.task_list = [task]
+        # Tasks to visit along with their depths; used as a stack for depth first iteration and a queue otherwise
+        self.task_list = deque([(task, 0)])
+        # The depth of the last task returned
         self.depth = 0
         # Figure out which states need to be traversed.
         # Predicted tasks can follow definite tasks but not vice versa; definite tasks can follow finished tasks but not vice versa
@@ -213,55 +328,113 @@ class TaskIterator:
             self.min_state = TaskState.FUTURE
         else:
             self.min_state = TaskState.COMPLETED
+        # If there are relatively few tasks in the requested states, find them with the workflow's state index
+        self.indexed_tasks = self._find_indexed_tasks(task)
 
     def __iter__(self):
         return self
 
     def __next__(self):
+        if self.indexed_tasks is not None:
+            return self._next_indexed()
         task = self._next()
-        while not self.task_filter.matches(task):
+        while not self._matches(task):
             task = self._next()
         return task
 
-    def _next(self):
+    def _next_indexed(self):
+        # Tasks may have changed (or been removed) since the index was searched, so recheck them
+        while self.indexed_tasks:
+            task = self.indexed_tasks.popleft()
+            if task.id in task.workflow.tasks and self._matches(task):
+                return task
+        raise StopIteration()
 
-        if not self.task_list:
-            raise StopIteration()
+    def _find_indexed_tasks(self, task):
+        """Look up tasks in the requested states in the workflow's state index.
+
+        Candidates are returned in the order the traversal would have produced them.  The index is used only
+        for depth first iteration, and only when at most half of the workflow's tasks are in the requested states.
+
+        Args:
+            task (`Task`): the task to start from
 
-        task = self.task_list.pop(0)
+        Returns:
+            deque(`Task`): the tasks that can be reached from this task, or None if the tree must be traversed
+        """
+        if not self.depth_first:
+            return None
+
+        workflows = self._get_indexed_workflows(task)
+        states = [state for state in TaskState._values if state & self.task_filter.state]
+        count, total = 0, 0
+        for workflow in workflows:
+            index = getattr(workflow, '_state_index', None)
+            # Tasks can be added to a workflow's task dict from another workflow (eg, by the core `SubWorkflow`)
+            if index is None or sum(len(ids) for ids in index.values()) != len(workflow.tasks):
+                return None
+            count += sum(len(index[state]) for state in states)
+            total += len(workflow.tasks)
+        if count * 2 > total:
+            return None
+
+        candidates = []
+        for workflow in workflows:
+            for state in states:
+                candidates.extend(workflow.tasks[task_id] for task_id in workflow._state_index[state])
+        return deque(self.sort_tasks(task, candidates))
+
+    def sort_tasks(self, task, tasks):
+        """Sort tasks into the order in which this iterator would reach them.
+
+        Args:
+            task (`Task`): the task the iteration starts from
+            tasks (list(`Task`)): the tasks to sort
+
+        Returns:
+            list(`Task`): the tasks that would be reached from the starting task, in depth first order
+        """
+        return depth_first_order(task, tasks, self._get_parent, self.max_depth)
+
+    def _get_indexed_workflows(self, task):
+        """Returns the workflows containing tasks that might be reached from this task."""
+        return [task.workflow]
+
+    def _get_parent(self, task, positions):
+        """Returns the parent of this task and the task's position, or (None, None) if the parent is not expanded."""
+        parent = task.parent
+        if parent is None or parent.state < self.min_state or parent.task_spec.name == self.end_at_spec:
+            return None, None
+        return parent, get_child_position(parent, task, positions)
+
+    def _pop(self):
+        """Remove the next task to visit, skipping subtrees that contain no tasks in the requested states."""
+        pop = self.task_list.pop if self.depth_first else self.task_list.popleft
+        while self.task_list:
+            task, depth = pop()
+            states = task._subtree_states
+            if states is None:
+                states = task._get_subtree_states()
+            if states & self.task_filter.state:
+                return task, depth
+        raise StopIteration()
+
+    def _next(self):
+
+        task, depth = self._pop()
         if task._children and \
             task.state >= self.min_state and \
-            self.depth < self.max_depth and \
+            depth < self.max_depth and \
             task.task_spec.name != self.end_at_spec:
-            
-            if self.depth_first:
-                self.task_list = task.children + self.task_list
-            else:
-                self.task_list.extend(task.children)
-            self._update_depth(task)
-        elif self.depth_first and self.task_list:
-            self._handle_leaf_depth(task)
-    
-        return task
+            self._add_next_tasks(task._get_children(), depth + 1)
 
-    def _update_depth(self, task):
+        self.depth = depth
+        return task
 
+    def _add_next_tasks(self, tasks, depth):
+        """Add tasks to visit, in the order in which they should be visited."""
         if self.depth_first:
-            # Since we visit the children before siblings, we always increment depth when adding children
-            self.depth += 1
+            # Tasks at the end of the stack are visited first
+            self.task_list.extend((task, depth) for task in reversed(tasks))
         else:
-            # In this case, we have to check for a common ancestor at the same depth
-            first, second = task, self.task_list[0]
-            for i in range(self.depth):
-                first = first.parent if first is not None else None
-                second = second.parent if second is not None else None
-            if first != second:
-                self.depth += 1
-
-    def _handle_leaf_depth(self, task):
-
-        ancestor = self.task_list[0].parent
-        current = task.parent
-        while current is not None and current != ancestor:
-            current = current.parent
-            self.depth -= 1
+            self.task_list.extend((task, depth) for task in tasks)
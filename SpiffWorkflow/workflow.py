@@ -18,13 +18,13 @@
 # 02110-1301  USA
 
 import logging
-from typing import Optional, Any
+from typing import Optional, Any, Callable
 from uuid import UUID
 
 from .serializer.base import Serializer
 from .specs import WorkflowSpec
 from .task import Task
-from .util.task import TaskState, TaskIterator, TaskFilter
+from .util.task import TaskState, TaskIterator, TaskFilter, TaskStateChange
 from .util.compat import mutex
 from .util.event import Event
 from .exceptions import TaskNotFoundException
@@ -46,24 +46,44 @@ class Workflow:
         tasks (dict(id, `Task`)): a mapping of task ids to tasks
         task_tree (`Task`): the root task of this workflow's task tree
         completed_event (`Event`): an event holding callbacks to be run when the workflow completes
+        copy_on_write_data (bool): whether tasks share their parent's data until it is accessed
+        persistent_data (bool): whether task data is kept as `PersistentDict` snapshots that share unchanged keys
     """
 
+    # Callbacks for task state changes; these are replaced rather than modified, and empty unless hooks are added
+    _state_hooks = ()
+    _batched_state_hooks = ()
+    # The ids of the tasks changed since the last checkpoint (see `_checkpoint`), or None if changes aren't tracked
+    _dirty_tasks = None
+    # The ids of the tasks being updated as a group (see `Task._batch_updates`), or None
+    _task_batch = None
+
     def __init__(
         self,
         workflow_spec: WorkflowSpec,
         deserializing: bool = False,
+        copy_on_write_data: bool = False,
+        persistent_data: bool = False,
     ) -> None:
         """
         Parameters:
             workflow_spec: The spec that describes this workflow.
             deserializing: Whether this workflow is being deserialized.
+            copy_on_write_data: Whether tasks should share their parent's data rather than copying it when updated.
+            persistent_data: Whether tasks should store snapshots of their data that share unchanged keys.
         """
         self.spec = workflow_spec
+        self.copy_on_write_data = copy_on_write_data
+        self.persistent_data = persistent_data
         self.data = {}
         self.locks = {}
         self.last_task = None
         self.success = True
         self.tasks = {}
+        # The ids of the tasks in each state, so that searching by state does not require traversing the tree
+        self._state_index = dict((state, set()) for state in TaskState._values)
+        # The number of unfinished tasks, updated whenever a task is added, removed, or changes state
+        self._unfinished_task_count = 0
         self.completed = False
 
         # Events.
@@ -72,7 +92,8 @@ class Workflow:
         if not deserializing:
             self.task_tree = Task(self, self.spec.start, state=TaskState.FUTURE)
             self.task_tree.task_spec._predict(self.task_tree, mask=TaskState.NOT_FINISHED_MASK)
-            logger.info('Initialized workflow', extra=self.collect_log_extras())
+            if logger.isEnabledFor(logging.INFO):
+                logger.info('Initialized workflow', extra=self.collect_log_extras())
             self.task_tree._ready()
 
     def is_completed(self) -> bool:
@@ -82,13 +103,20 @@ class Workflow:
             True if the workflow has no unfinished tasks.
         """
         if not self.completed:
-            _iter = TaskIterator(self.task_tree, state=TaskState.NOT_FINISHED_MASK)
-            try:
-                next(_iter)
-            except StopIteration:
-                self.completed = True
+            if self._has_foreign_tasks():
+                tasks = TaskIterator(self.task_tree, state=TaskState.NOT_FINISHED_MASK)
+                self.completed = next(tasks, None) is None
+            else:
+                self.completed = self._unfinished_task_count == 0
         return self.completed
 
+    def _has_foreign_tasks(self) -> bool:
+        """Check whether tasks from another workflow have been added to this one (eg, by the core `SubWorkflow`).
+
+        The state index and unfinished task count only include the tasks that belong to this workflow.
+        """
+        return sum(len(ids) for ids in self._state_index.values()) != len(self.tasks)
+
     def manual_input_required(self) -> bool:
         """Checks whether the workflow requires manual input.
 
@@ -205,6 +233,55 @@ class Workflow:
         """
         while self.run_next(use_last_task, halt_on_manual):
             pass
+        self.flush_state_changes()
+
+    def add_state_hook(self, hook: Callable, batched: bool = False) -> None:
+        """Add a callback for task state changes.
+
+        Hooks are called as `hook(task, previous_state, state, timestamp)` whenever a task in this workflow
+        changes state.  Batched hooks are instead called with a list of `TaskStateChange` by `flush_state_changes`,
+        so that the changes made by a series of steps can be handled at once.
+
+        Args:
+            hook: the callback
+            batched: whether the hook should receive the changes in batches
+        """
+        if batched:
+            if not self._batched_state_hooks:
+                self._pending_state_changes = []
+                self._state_hooks += (self._queue_state_change,)
+            self._batched_state_hooks += (hook,)
+        else:
+            self._state_hooks += (hook,)
+
+    def remove_state_hook(self, hook: Callable) -> None:
+        """Remove a callback for task state changes.
+
+        Args:
+            hook: the callback
+
+        Raises:
+            ValueError: if the hook was not added
+        """
+        if hook in self._batched_state_hooks:
+            self._batched_state_hooks = tuple(h for h in self._batched_state_hooks if h != hook)
+            if not self._batched_state_hooks:
+                self._state_hooks = tuple(h for h in self._state_hooks if h != self._queue_state_change)
+                self._pending_state_changes = []
+        elif hook in self._state_hooks:
+            self._state_hooks = tuple(h for h in self._state_hooks if h != hook)
+        else:
+            raise ValueError('The hook was not added to this workflow')
+
+    def flush_state_changes(self) -> None:
+        """Call the batched state hooks with the task state changes that occurred since the last call."""
+        if self._batched_state_hooks and self._pending_state_changes:
+            changes, self._pending_state_changes = self._pending_state_changes, []
+            for hook in self._batched_state_hooks:
+                hook(changes)
+
+    def _queue_state_change(self, task: Task, previous_state: int, state: int, timestamp: float) -> None:
+        self._pending_state_changes.append(TaskStateChange(task, previous_state, state, timestamp))
 
     def update_waiting_tasks(self) -> None:
         """Update all tasks in the WAITING state"""
@@ -222,7 +299,8 @@ class Workflow:
         """
         self.success = success
         self.completed = True
-        logger.info(f'Workflow cancelled', extra=self.collect_log_extras())
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f'Workflow cancelled', extra=self.collect_log_extras())
         cancelled = []
         for task in TaskIterator(self.task_tree, state=TaskState.NOT_FINISHED_MASK):
             cancelled.append(task)
@@ -262,7 +340,10 @@ class Workflow:
         return task.reset_branch(data)
 
     def collect_log_extras(self, dct: Optional[dict] = None) -> dict:
-        """Return logging details for this workflow."""
+        """Return logging details for this workflow.
+
+        The ids of the workflow's tasks are included only when debug logging is enabled.
+        """
         extra = dct or {}
         extra.update({
             'workflow_spec': self.spec.name,
@@ -270,15 +351,35 @@ class Workflow:
             'completed': self.completed,
             'root': self.task_tree.id
         })
-        if logger.level < 20:
+        if logger.isEnabledFor(logging.DEBUG):
             extra.update({'tasks': [t.id for t in Workflow.get_tasks(self)]})
         return extra
 
+    def _checkpoint(self) -> None:
+        """Start recording the tasks that change from this point.
+
+        Task ids are mapped to True if the task's data might have been changed, False if only its state or
+        structure changed, and None if it was removed.
+        """
+        self._dirty_tasks = {}
+
     def _predict(self, mask: int = TaskState.NOT_FINISHED_MASK) -> None:
         """Predict tasks with the provided mask."""
         for task in Workflow.get_tasks(self, state=TaskState.NOT_FINISHED_MASK):
             task.task_spec._predict(task, mask=mask)
 
+    def _get_subtree_parent(self, task: Task) -> Optional[Task]:
+        """Returns the task whose subtree state mask includes this task's states."""
+        return task.parent
+
+    def _get_subtree_children(self, task: Task) -> list[Task]:
+        """Returns the tasks whose states are included in this task's subtree state mask."""
+        return task._get_children()
+
+    def _task_ready_notify(self, task: Task) -> None:
+        """Called whenever a task becomes ready."""
+        pass
+
     def _task_completed_notify(self, task: Task) -> None:
         """Called whenever a task completes."""
         self.last_task = task
@@ -293,11 +394,17 @@ class Workflow:
         task = self.tasks[task_id]
         for child in task.children:
             self._remove_task(child.id)
-        task.parent._children.remove(task.id)
+        task.parent._child_removed_notify(task)
         self.tasks.pop(task_id)
+        self._state_index[task.state].discard(task_id)
+        if task.state & TaskState.NOT_FINISHED_MASK:
+            self._unfinished_task_count -= 1
+        if self._dirty_tasks is not None:
+            self._dirty_tasks[task_id] = None
 
     def _mark_complete(self, task: Task) -> None:
-        logger.info('Workflow completed', extra=self.collect_log_extras())
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Workflow completed', extra=self.collect_log_extras())
         self.data.update(task.data)
         self.completed = True
 
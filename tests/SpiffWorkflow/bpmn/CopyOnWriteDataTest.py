@@ -0,0 +1,95 @@
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn import BpmnWorkflow
+from SpiffWorkflow.util.persistent_dict import PersistentDict
+
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class CopyOnWriteDataTest(BpmnWorkflowTestCase):
+
+    option = 'copy_on_write_data'
+
+    def run_workflow(self, filename, process_name, enabled):
+        spec, subprocesses = self.load_workflow_spec(filename, process_name)
+        workflow = BpmnWorkflow(spec, subprocesses, **{self.option: enabled})
+        workflow.do_engine_steps()
+        self.assertTrue(workflow.completed)
+        return workflow
+
+    def get_task_data(self, workflow):
+        return [(task.task_spec.name, task.data) for task in workflow.get_tasks()]
+
+    def check_workflow(self, filename, process_name):
+        expected = self.run_workflow(filename, process_name, False)
+        workflow = self.run_workflow(filename, process_name, True)
+        self.assertDictEqual(workflow.data, expected.data)
+        self.assertListEqual(self.get_task_data(workflow), self.get_task_data(expected))
+
+        workflow = self.run_workflow(filename, process_name, True)
+        restored = self.serializer.deserialize_json(self.serializer.serialize_json(workflow))
+        self.assertTrue(getattr(restored, self.option))
+        self.assertListEqual(self.get_task_data(restored), self.get_task_data(expected))
+
+    def test_scripts_and_multiinstance(self):
+        self.check_workflow('performance_test.bpmn', 'Process_3no3Cw9')
+
+    def test_call_activity(self):
+        self.check_workflow('call_activity_*.bpmn', 'Process_8200379')
+
+    def test_data_is_copied_when_accessed(self):
+        spec, subprocesses = self.load_workflow_spec('performance_test.bpmn', 'Process_3no3Cw9')
+        workflow = BpmnWorkflow(spec, subprocesses, **{self.option: True})
+        start = workflow.get_next_task(state=TaskState.READY)
+        start.data['value'] = 'original'
+        start.run()
+        child = start.children[0]
+        self.assertIs(child._peek_data(), start._peek_data())
+        self.assertEqual(child.get_data('value'), 'original')
+        child.data['value'] = 'changed'
+        self.assertEqual(start.data['value'], 'original')
+        self.assertEqual(child.data['value'], 'changed')
+
+
+class PersistentDataTest(CopyOnWriteDataTest):
+
+    option = 'persistent_data'
+
+    def test_snapshots_share_unchanged_values(self):
+        spec, subprocesses = self.load_workflow_spec('performance_test.bpmn', 'Process_3no3Cw9')
+        workflow = BpmnWorkflow(spec, subprocesses, persistent_data=True)
+        workflow.do_engine_steps()
+        before = workflow.get_next_task(spec_name='Event_1bb5dyo')
+        script = workflow.get_next_task(spec_name='Activity_0h7683r')
+        self.assertIsInstance(script._peek_data(), PersistentDict)
+        self.assertIs(script.snapshot_data(), script.snapshot_data())
+        # The script task's data was copied when it ran, but the unchanged values are shared again
+        self.assertIs(script.snapshot_data()['items'], before.snapshot_data()['items'])
+        self.assertNotIn('out_item', before.snapshot_data())
+        self.assertIn('out_item', script.snapshot_data())
+
+    def test_snapshots_keep_changed_types(self):
+        spec, subprocesses = self.load_workflow_spec('performance_test.bpmn', 'Process_3no3Cw9')
+        workflow = BpmnWorkflow(spec, subprocesses, persistent_data=True)
+        start = workflow.get_next_task(state=TaskState.READY)
+        start.data.update({'flag': 1, 'amount': 1})
+        start.run()
+        child = start.children[0]
+        child.data.update({'flag': True, 'amount': 1.0})
+        child.run()
+        self.assertIs(child.data['flag'], True)
+        self.assertIs(type(child.data['amount']), float)
+        self.assertIs(start.data['flag'], 1)
+
+    def test_snapshots_are_not_changed_by_nested_updates(self):
+        spec, subprocesses = self.load_workflow_spec('performance_test.bpmn', 'Process_3no3Cw9')
+        workflow = BpmnWorkflow(spec, subprocesses, persistent_data=True)
+        start = workflow.get_next_task(state=TaskState.READY)
+        start.data['d'] = {'inner': {'k': 1}}
+        start.run()
+        snapshot = start.snapshot_data()
+        child = start.children[0]
+        child.data['d']['inner']['k'] = 2
+        child.run()
+        self.assertEqual(snapshot['d'], {'inner': {'k': 1}})
+        self.assertEqual(start.data['d'], {'inner': {'k': 1}})
+        self.assertEqual(child.snapshot_data()['d'], {'inner': {'k': 2}})
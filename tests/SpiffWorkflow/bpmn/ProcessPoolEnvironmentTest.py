@@ -0,0 +1,99 @@
+import os
+import unittest
+
+from SpiffWorkflow.bpmn import BpmnWorkflow
+from SpiffWorkflow.bpmn.exceptions import WorkflowTaskException
+from SpiffWorkflow.bpmn.script_engine import PythonScriptEngine, ProcessPoolEnvironment, TaskDataEnvironment
+
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+def worker_pid():
+    return os.getpid()
+
+
+class ProcessPoolEnvironmentTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        self.environment = ProcessPoolEnvironment({'worker_pid': worker_pid}, max_workers=2, timeout=2)
+        self.script_engine = PythonScriptEngine(environment=self.environment)
+        spec, subprocesses = self.load_workflow_spec('task_data_size.bpmn', 'Process_ccz6oq2')
+        self.workflow = BpmnWorkflow(spec, subprocesses, script_engine=self.script_engine)
+
+    def tearDown(self):
+        self.environment.shutdown()
+
+    def testRunWorkflow(self):
+        expected = BpmnWorkflow(self.workflow.spec, self.workflow.subprocess_specs)
+        expected.do_engine_steps()
+        self.workflow.do_engine_steps()
+        self.assertTrue(self.workflow.completed)
+        self.assertDictEqual(self.workflow.data, expected.data)
+
+    def testExecuteMergesChanges(self):
+        task = self.workflow.task_tree
+        task.data = {'a': 1, 'b': [1], 'c': 3}
+        self.script_engine.execute(task, 'b.append(a)\ndel c\nd = 4\npid = worker_pid()\nimport math')
+        self.assertNotEqual(task.data.pop('pid'), os.getpid())
+        self.assertDictEqual(task.data, {'a': 1, 'b': [1, 1], 'd': 4})
+        self.assertTrue(self.script_engine.evaluate(task, 'worker_pid() == pid', {'pid': os.getpid()}))
+
+    def testMatchesTaskDataEnvironment(self):
+        script = '\n'.join([
+            'flag = True',
+            'amount = float(amount)',
+            'items[0] = True',
+            'nested["x"] = 1.0',
+            'del removed',
+            'added = [flag, amount]',
+        ])
+        contexts = []
+        for environment in [TaskDataEnvironment(), self.environment]:
+            context = {'flag': 1, 'amount': 1, 'items': [1], 'nested': {'x': 1}, 'removed': 0}
+            environment.execute(script, context)
+            contexts.append(context)
+        self.assertDictEqual(contexts[1], contexts[0])
+        self.assertListEqual(
+            [type(v) for v in contexts[1].values()],
+            [type(v) for v in contexts[0].values()],
+        )
+        self.assertIs(contexts[1]['flag'], True)
+        self.assertIs(contexts[1]['items'][0], True)
+        self.assertIs(type(contexts[1]['nested']['x']), float)
+
+    def testErrorLineNumbers(self):
+        task = self.workflow.task_tree
+        task.data = {'a': 1}
+        with self.assertRaises(WorkflowTaskException) as ctx:
+            self.script_engine.execute(task, 'b = a\nc = a / 0\nd = c')
+        self.assertEqual(ctx.exception.line_number, 2)
+        self.assertEqual(ctx.exception.error_line, 'c = a / 0')
+        self.assertEqual(ctx.exception.error_type, 'ZeroDivisionError')
+        self.assertDictEqual(task.data, {'a': 1})
+        with self.assertRaises(WorkflowTaskException) as ctx:
+            self.script_engine.execute(task, 'b = a\nc = (a')
+        self.assertEqual(ctx.exception.line_number, 2)
+
+    def testTimeout(self):
+        self.environment.timeout = 0.5
+        task = self.workflow.task_tree
+        with self.assertRaises(WorkflowTaskException) as ctx:
+            self.script_engine.execute(task, 'a = 1\nwhile True:\n    a += 1')
+        self.assertEqual(ctx.exception.error_type, 'TimeoutError')
+        self.assertIn(ctx.exception.line_number, [2, 3])
+        # The worker can still be used after a script times out
+        self.script_engine.execute(task, 'a = 1')
+        self.assertEqual(task.data['a'], 1)
+
+
+class ProcessPoolShutdownTest(unittest.TestCase):
+
+    def testShutdown(self):
+        environment = ProcessPoolEnvironment(max_workers=1)
+        context = {}
+        environment.execute('a = 1', context)
+        environment.shutdown(terminate=True)
+        # A new pool is started when it is needed
+        environment.execute('b = a + 1', context)
+        environment.shutdown()
+        self.assertDictEqual(context, {'a': 1, 'b': 2})
@@ -1,9 +1,15 @@
 import json
+import math
+import unittest
 
 from SpiffWorkflow import TaskState
 from SpiffWorkflow.bpmn import BpmnWorkflow
 from SpiffWorkflow.bpmn.script_engine import PythonScriptEngine
-from SpiffWorkflow.bpmn.script_engine.python_environment import BasePythonScriptEngineEnvironment, TaskDataEnvironment
+from SpiffWorkflow.bpmn.script_engine.python_environment import (
+    BasePythonScriptEngineEnvironment,
+    TaskDataEnvironment,
+    TaskDataNamespace,
+)
 
 from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
 
@@ -89,6 +95,74 @@ class PythonScriptEngineEnvironmentTest(BpmnWorkflowTestCase):
         return task_data_len
 
 
+class TaskDataEnvironmentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.environment = TaskDataEnvironment({'example_global': example_global, 'limit': 10})
+
+    def testEvaluateDoesNotModifyContext(self):
+        context = {'items': [1, 5, 12], 'threshold': 4}
+        # Names used in nested scopes are found in the task data too
+        self.assertEqual(self.environment.evaluate('[x for x in items if threshold < x < limit]', context), [5])
+        self.assertEqual(self.environment.evaluate('(y := threshold + 1)', context), 5)
+        self.assertTrue(self.environment.evaluate("'threshold' in globals() and 'missing' not in globals()", context))
+        self.assertEqual(self.environment.evaluate('threshold', context, {'threshold': 1}), 4)
+        self.assertDictEqual(context, {'items': [1, 5, 12], 'threshold': 4})
+
+    def testExecuteUpdatesContext(self):
+        context = {'a': 1, 'b': 2}
+        script = '\n'.join([
+            'def f(x):',
+            '    global c',
+            '    c = x + a + limit',
+            'f(3)',
+            'del b',
+            'd = [n * a for n in range(2)]',
+            'limit = 0',
+            'import math',
+        ])
+        self.environment.execute(script, context, {'external': len})
+        self.assertEqual(context.pop('math').pi, math.pi)
+        self.assertDictEqual(context, {'a': 1, 'c': 14, 'd': [0, 1]})
+
+    def testExecuteChecksForOverwrites(self):
+        self.assertRaises(ValueError, self.environment.execute, 'a = 1', {'limit': 1})
+
+    def testDeleteUndefinedName(self):
+        self.assertRaises(NameError, self.environment.execute, 'del missing', {'a': 1})
+        self.assertRaises(NameError, self.environment.execute, 'def f():\n    global missing\n    del missing\nf()', {})
+        namespace = TaskDataNamespace({'a': 1}, None, self.environment.globals, writable=True)
+        with self.assertRaises(NameError):
+            del namespace['missing']
+
+    def testNamesAreLookedUpOnce(self):
+
+        class CountingNamespace(TaskDataNamespace):
+            lookups = []
+            def __missing__(self, key):
+                self.lookups.append(key)
+                return super().__missing__(key)
+
+        context = {'a': 1, 'sum': 5}
+        namespace = CountingNamespace(context, {'external': 2}, self.environment.globals, writable=True)
+        exec('for n in range(3):\n    b = sum + a + limit + external + len([n])', namespace)
+        namespace.write_back()
+        self.assertCountEqual(CountingNamespace.lookups, ['range', 'sum', 'a', 'limit', 'external', 'len'])
+        # Only the names that were assigned are written to the task data
+        self.assertSetEqual(namespace.assigned, {'n', 'b'})
+        self.assertDictEqual(context, {'a': 1, 'sum': 5, 'n': 2, 'b': 19})
+
+    def testRemoveGlobalsOverride(self):
+
+        class KeepFunctionsEnvironment(TaskDataEnvironment):
+            def _remove_globals_and_functions_from_context(self, context, external_context=None):
+                context.pop('secret', None)
+
+        context = {'a': 1, 'secret': 'x'}
+        KeepFunctionsEnvironment().execute('b = len', context)
+        self.assertDictEqual(context, {'a': 1, 'b': len})
+
+
 class StartedTaskTest(BpmnWorkflowTestCase):
 
     def setUp(self):
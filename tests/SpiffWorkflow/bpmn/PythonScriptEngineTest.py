@@ -1,6 +1,6 @@
 from SpiffWorkflow import TaskState
 from SpiffWorkflow.bpmn import BpmnWorkflow
-from SpiffWorkflow.bpmn.script_engine import PythonScriptEngine
+from SpiffWorkflow.bpmn.script_engine import PythonScriptEngine, CodeCache
 from SpiffWorkflow.bpmn.exceptions import WorkflowTaskException
 
 from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
@@ -12,8 +12,8 @@ class PythonScriptEngineTest(BpmnWorkflowTestCase):
 
     def setUp(self):
         self.expressionEngine = PythonScriptEngine()
-        spec, subprocesses = self.load_workflow_spec('ScriptTest.bpmn', 'Process_1l85e0n')
-        self. workflow = BpmnWorkflow(spec, subprocesses)
+        self.spec, self.subprocesses = self.load_workflow_spec('ScriptTest.bpmn', 'Process_1l85e0n')
+        self. workflow = BpmnWorkflow(self.spec, self.subprocesses)
 
     def testRunThroughHappy(self):
 
@@ -48,3 +48,41 @@ class PythonScriptEngineTest(BpmnWorkflowTestCase):
         self.assertIn('testvar2', task.data)
         self.assertIn('sample', task.data)
         self.assertNotIn('my_function', task.data)
+
+    def testCompiledCodeIsCached(self):
+        engine = PythonScriptEngine()
+        workflow = BpmnWorkflow(self.spec, self.subprocesses, script_engine=engine)
+        workflow.do_engine_steps()
+        misses = engine.code_cache.misses
+        self.assertGreater(misses, 0)
+        self.assertEqual(engine.code_cache.hits, 0)
+        workflow = BpmnWorkflow(self.spec, self.subprocesses, script_engine=engine)
+        workflow.do_engine_steps()
+        self.assertEqual(engine.code_cache.misses, misses)
+        self.assertEqual(engine.code_cache.hits, misses)
+        self.assertEqual(workflow.last_task.data['sample'], ['b', 'c'])
+
+    def testPrecompile(self):
+        engine = PythonScriptEngine()
+        engine.precompile(self.spec)
+        misses = engine.code_cache.misses
+        self.assertGreater(misses, 0)
+        workflow = BpmnWorkflow(self.spec, self.subprocesses, script_engine=engine)
+        workflow.do_engine_steps()
+        self.assertEqual(engine.code_cache.misses, misses)
+
+    def testPrecompileConditions(self):
+        spec, subprocesses = self.load_workflow_spec('exclusive_gateway_no_default.bpmn', 'NoDefaultGateway')
+        engine = PythonScriptEngine()
+        engine.precompile(spec)
+        self.assertIn(('x > 1', 'eval'), engine.code_cache.code)
+        self.assertIn(('x < 1', 'eval'), engine.code_cache.code)
+
+    def testCodeCacheEviction(self):
+        cache = CodeCache(maxsize=2)
+        cache.compile('a', 'eval')
+        cache.compile('b', 'eval')
+        cache.compile('a', 'eval')
+        cache.compile('c', 'eval')
+        self.assertListEqual(list(cache.code), [('a', 'eval'), ('c', 'eval')])
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
@@ -0,0 +1,71 @@
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn import BpmnWorkflow
+from SpiffWorkflow.util.task import TaskStateChange
+
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class StateHookTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        self.spec, self.subprocesses = self.load_workflow_spec('call_activity_*.bpmn', 'Process_8200379')
+        self.workflow = BpmnWorkflow(self.spec, self.subprocesses)
+        self.changes, self.batches = [], []
+
+    def record_change(self, task, previous_state, state, timestamp):
+        self.changes.append(TaskStateChange(task, previous_state, state, timestamp))
+
+    def test_hooks_are_called_for_each_change(self):
+        self.workflow.add_state_hook(self.record_change)
+        before = self.workflow.get_tasks(state=TaskState.COMPLETED)
+        self.workflow.do_engine_steps()
+        self.assertTrue(self.workflow.completed)
+        # Every task that was run went from READY to STARTED to COMPLETED, including the call activity's tasks
+        completed = [change.task for change in self.changes if change.state == TaskState.COMPLETED]
+        self.assertIn('End_Called_Activity', [task.task_spec.name for task in completed])
+        self.assertCountEqual(completed, [t for t in self.workflow.get_tasks(state=TaskState.COMPLETED) if t not in before])
+        current, timestamp = {}, 0
+        for change in self.changes:
+            self.assertEqual(change.previous_state, current.get(change.task, change.previous_state))
+            self.assertGreaterEqual(change.timestamp, timestamp)
+            current[change.task], timestamp = change.state, change.timestamp
+        self.assertTrue(all(task.state == state for task, state in current.items()))
+
+    def test_batched_hooks_are_called_after_engine_steps(self):
+        self.workflow.add_state_hook(self.record_change)
+        self.workflow.add_state_hook(self.batches.append, batched=True)
+        self.assertListEqual(self.batches, [])
+        self.workflow.do_engine_steps()
+        self.assertEqual(len(self.batches), 1)
+        self.assertListEqual(self.batches[0], self.changes)
+        self.workflow.do_engine_steps()
+        self.assertEqual(len(self.batches), 1)
+
+    def test_remove_hooks(self):
+        self.workflow.add_state_hook(self.record_change)
+        self.workflow.add_state_hook(self.batches.append, batched=True)
+        self.workflow.remove_state_hook(self.record_change)
+        self.workflow.remove_state_hook(self.batches.append)
+        self.assertEqual(self.workflow._state_hooks, ())
+        self.assertRaises(ValueError, self.workflow.remove_state_hook, self.record_change)
+        self.workflow.do_engine_steps()
+        self.assertTrue(self.workflow.completed)
+        self.assertListEqual(self.changes, [])
+        self.assertListEqual(self.batches, [])
+
+    def test_hooks_added_to_subprocess(self):
+        while len(self.workflow.subprocesses) == 0:
+            self.workflow.get_next_task(state=TaskState.READY).run()
+        subprocess = list(self.workflow.subprocesses.values())[0]
+        subprocess.add_state_hook(self.record_change)
+        subprocess.add_state_hook(self.batches.append, batched=True)
+        # The hooks are shared with the top level workflow
+        self.assertIn(self.record_change, self.workflow._state_hooks)
+        self.workflow.do_engine_steps()
+        self.assertTrue(self.workflow.completed)
+        self.assertEqual(len(self.batches), 1)
+        self.assertListEqual(self.batches[0], self.changes)
+        self.assertSetEqual(set(change.task.workflow for change in self.changes), set([self.workflow, subprocess]))
+        subprocess.remove_state_hook(self.record_change)
+        subprocess.remove_state_hook(self.batches.append)
+        self.assertEqual(self.workflow._state_hooks, ())
@@ -0,0 +1,44 @@
+import random
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn import BpmnWorkflow
+from SpiffWorkflow.bpmn.util.task import sort_tasks
+
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class TaskSchedulerTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        self.spec, self.subprocesses = self.load_workflow_spec('call_activity_*.bpmn', 'Process_8200379')
+        self.workflow = BpmnWorkflow(self.spec, self.subprocesses)
+
+    def test_ready_tasks_are_queued(self):
+        queued = list(self.workflow.scheduler.queues.get(self.workflow, {}).values())
+        self.assertListEqual(queued, self.workflow.get_tasks(state=TaskState.READY, manual=False))
+
+    def test_engine_steps_run_queued_tasks(self):
+        completed = []
+        self.workflow.do_engine_steps(did_complete_task=lambda t: completed.append(t))
+        self.assertTrue(self.workflow.completed)
+        self.assertDictEqual(self.workflow.scheduler.queues, {})
+        # Tasks from the call activity were run before the call activity completed
+        names = [t.task_spec.name for t in completed]
+        self.assertLess(names.index('End_Called_Activity'), names.index('Activity_Call_Activity'))
+        self.assertTrue(all(t.state == TaskState.COMPLETED for t in completed))
+
+    def test_restored_tasks_are_run(self):
+        self.workflow = self.serializer.deserialize_json(self.serializer.serialize_json(self.workflow))
+        self.assertDictEqual(self.workflow.scheduler.queues, {})
+        self.workflow.do_engine_steps()
+        self.assertTrue(self.workflow.completed)
+        self.assertDictEqual(self.workflow.data, {'pre_var': 'some string', 'my_var': 'World', 'my_other_var': 'Mike'})
+
+    def test_sort_tasks(self):
+        while len(self.workflow.subprocesses) == 0 or len(self.workflow.get_tasks(state=TaskState.READY)) == 0:
+            self.workflow.get_next_task(state=TaskState.READY).run()
+        expected = self.workflow.get_tasks()
+        tasks = list(expected)
+        random.Random(1).shuffle(tasks)
+        # Tasks are sorted into the order an iterator over the workflow and its subprocesses would return them
+        self.assertListEqual(sort_tasks(self.workflow.task_tree, tasks), expected)
@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime
+from uuid import uuid4
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn import BpmnWorkflow
+
+from ..BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class BinarySerializerTest(BpmnWorkflowTestCase):
+
+    # Options passed to the workflow that change how task data is stored
+    data_options = {}
+
+    def setUp(self):
+        spec, subprocesses = self.load_workflow_spec('resetworkflowA-*.bpmn', 'TopLevel')
+        self.workflow = BpmnWorkflow(spec, subprocesses, **self.data_options)
+        self.workflow.do_engine_steps()
+        self.get_ready_user_tasks()[0].run()
+        self.workflow.do_engine_steps()
+        self.workflow.data['timestamp'] = datetime.now()
+        self.workflow.get_next_task(spec_name='SubTask2').data.update({'numbers': {1, 2}, 'id': uuid4()})
+
+    def test_binary_round_trip(self):
+        serialization = self.serializer.serialize_binary(self.workflow)
+        self.assertLess(len(serialization), len(self.serializer.serialize_json(self.workflow)))
+        restored = self.serializer.deserialize_binary(serialization)
+        self.assertEqual(restored.data['timestamp'], self.workflow.data['timestamp'])
+        self.assertEqual(self.serializer.serialize_json(restored), self.serializer.serialize_json(self.workflow))
+        task = restored.get_next_task(spec_name='SubTask2')
+        self.assertEqual(task.state, TaskState.READY)
+        task.run()
+        restored.do_engine_steps()
+        self.assertEqual(len(restored.get_tasks(state=TaskState.READY, manual=True)), 1)
+
+    def test_binary_with_patches(self):
+        serialization = self.serializer.serialize_binary(self.workflow)
+        self.workflow.get_next_task(spec_name='SubTask2').run()
+        self.workflow.do_engine_steps()
+        patch = self.serializer.serialize_patch_json(self.workflow)
+        restored = self.serializer.deserialize_binary(serialization, patches=[patch])
+        self.assertEqual(self.serializer.serialize_json(restored), self.serializer.serialize_json(self.workflow))
+
+
+class CopyOnWriteBinarySerializerTest(BinarySerializerTest):
+    data_options = {'copy_on_write_data': True}
+
+
+class PersistentBinarySerializerTest(BinarySerializerTest):
+    data_options = {'persistent_data': True}
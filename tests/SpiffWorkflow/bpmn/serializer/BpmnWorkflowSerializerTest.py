@@ -1,9 +1,12 @@
 import unittest
 import os
 import json
+from uuid import UUID, uuid4
 
+from SpiffWorkflow.exceptions import TaskNotFoundException
 from SpiffWorkflow.bpmn import BpmnWorkflow
 from SpiffWorkflow.bpmn.serializer import BpmnWorkflowSerializer
+from SpiffWorkflow.bpmn.serializer.helpers.task_table import table_to_tasks
 from SpiffWorkflow.bpmn.script_engine import PythonScriptEngine
 
 from .BaseTestCase import BaseTestCase
@@ -79,7 +82,8 @@ class BpmnWorkflowSerializerTest(BaseTestCase):
         finally:
             a_task.data.pop('jsonTest',None)
 
-        serialized_task = [x for x in json.loads(serialized_workflow)['tasks'].values() if x['task_spec'] == a_task_spec.name][0]
+        tasks = table_to_tasks(json.loads(serialized_workflow)['tasks'])
+        serialized_task = [x for x in tasks.values() if x['task_spec'] == a_task_spec.name][0]
         self.assertEqual(serialized_task['data']['jsonTest'], {'a': 1, 'my_type': 'mycls'})
 
         deserialized_workflow = custom_serializer.deserialize_json(serialized_workflow)
@@ -132,7 +136,7 @@ class BpmnWorkflowSerializerTest(BaseTestCase):
         user_task.data = { 'f': f }
         task_id = str(user_task.id)
         dct = self.serializer.to_dict(self.workflow)
-        self.assertNotIn('f', dct['tasks'][task_id]['data'])
+        self.assertNotIn('f', table_to_tasks(dct['tasks'])[task_id]['data'])
 
     def testLastTaskIsSetAndWorksThroughRestore(self):
         self.workflow.do_engine_steps()
@@ -153,6 +157,34 @@ class BpmnWorkflowSerializerTest(BaseTestCase):
         assert 'x' not in self.workflow.last_task.data
         assert 'some_fun' not in self.workflow.last_task.data
 
+    def testRestoredDataSharesUnchangedValues(self):
+        self.workflow.do_engine_steps()
+        task = self.get_ready_user_tasks()[0]
+        task.data = {'items': [1, 2], 'value': 1}
+        task.run()
+        child = task.children[0]
+        child.data['value'] = 2
+        restored = self.serializer.deserialize_json(self.serializer.serialize_json(self.workflow))
+        parent, child = restored.get_task_from_id(task.id), restored.get_task_from_id(child.id)
+        self.assertIs(child._peek_data()['items'], parent._peek_data()['items'])
+        self.assertEqual(child.get_data('value'), 2)
+        child.data['items'].append(3)
+        self.assertListEqual(parent.data['items'], [1, 2])
+        self.assertListEqual(child.data['items'], [1, 2, 3])
+        self._compare_with_deserialized_copy(restored)
+
+    def testDisconnectedTasksAreDropped(self):
+        self.workflow.do_engine_steps()
+        dct = json.loads(self.serializer.serialize_json(self.workflow))
+        dct['tasks'] = table_to_tasks(dct['tasks'])
+        task = dict(dct['tasks'][str(self.get_ready_user_tasks()[0].id)], id=str(uuid4()), parent=str(uuid4()))
+        dct['tasks'][task['id']] = task
+        with self.assertLogs('spiff.serializer', level='WARNING') as logs:
+            restored = self.serializer.deserialize_json(json.dumps(dct))
+        self.assertListEqual(logs.records[0].task_ids, [task['id']])
+        self.assertRaises(TaskNotFoundException, restored.get_task_from_id, UUID(task['id']))
+        self._compare_workflows(self.workflow, restored)
+
     def _compare_with_deserialized_copy(self, wf):
         json = self.serializer.serialize_json(wf)
         wf2 = self.serializer.deserialize_json(json)
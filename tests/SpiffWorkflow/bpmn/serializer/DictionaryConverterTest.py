@@ -28,3 +28,24 @@ class DictionaryConverterTest(unittest.TestCase):
         self.assertIsInstance(restored, Thing)
         self.assertEqual(42, restored.value)
         self.assertEqual({'typename': 'Thing', 'value': 42}, data)
+
+    def test_convert_after_register(self):
+        class Thing:
+
+            def __init__(self, value):
+                self.value = value
+
+        converter = DictionaryConverter()
+        thing = Thing(42)
+        data = {'things': [thing, 'a'], 'count': 1, 'nested': {'thing': thing}}
+        # Unregistered objects are returned unchanged
+        self.assertEqual({'things': [thing, 'a'], 'count': 1, 'nested': {'thing': thing}}, converter.convert(data))
+
+        converter.register(Thing, lambda thing: {'value': thing.value}, lambda dct: Thing(dct['value']))
+        converted = converter.convert(data)
+        self.assertEqual(
+            {'things': [{'value': 42, 'typename': 'Thing'}, 'a'], 'count': 1, 'nested': {'thing': {'value': 42, 'typename': 'Thing'}}},
+            converted,
+        )
+        self.assertIsNot(converted['nested'], data['nested'])
+        self.assertEqual(42, converter.restore(converted)['nested']['thing'].value)
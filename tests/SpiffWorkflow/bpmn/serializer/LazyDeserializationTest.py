@@ -0,0 +1,90 @@
+import json
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn import BpmnWorkflow
+
+from ..BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class LazyDeserializationTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        spec, subprocesses = self.load_workflow_spec('resetworkflowA-*.bpmn', 'TopLevel')
+        self.workflow = BpmnWorkflow(spec, subprocesses)
+        self.workflow.do_engine_steps()
+        # Run the subprocess to completion
+        self.get_ready_user_tasks()[0].run()
+        self.workflow.do_engine_steps()
+        self.get_ready_user_tasks()[0].run()
+        self.workflow.do_engine_steps()
+        self.subprocess = list(self.workflow.subprocesses.values())[0]
+        self.assertTrue(self.subprocess.completed)
+        self.state = self.serializer.serialize_json(self.workflow)
+
+    def restore(self):
+        restored = self.serializer.deserialize_json(self.state, lazy=True)
+        self.assertIsNotNone(restored.subprocesses[self.subprocess.parent_task_id]._deferred_tasks)
+        return restored
+
+    def assertDeferred(self, workflow, deferred=True):
+        subprocess = workflow.subprocesses[self.subprocess.parent_task_id]
+        self.assertEqual(subprocess._deferred_tasks is not None, deferred)
+
+    def test_complete_workflow_without_restoring(self):
+        self.workflow = self.restore()
+        task = self.get_ready_user_tasks()[0]
+        self.assertEqual(task.task_spec.name, 'Task2')
+        task.run()
+        self.workflow.do_engine_steps()
+        self.assertTrue(self.workflow.completed)
+        self.assertDeferred(self.workflow)
+        # The subprocess is serialized as it was restored
+        state = json.loads(self.serializer.serialize_json(self.workflow))
+        self.assertDictEqual(state['subprocesses'], json.loads(self.state)['subprocesses'])
+
+    def test_restore_by_id(self):
+        restored = self.restore()
+        task = self.subprocess.get_next_task(spec_name='SubTask2')
+        # Looking up tasks in other workflows does not restore the subprocess
+        self.assertIsNotNone(restored.get_task_from_id(self.workflow.task_tree.id))
+        self.assertDeferred(restored)
+        restored_task = restored.get_task_from_id(task.id)
+        self.assertDeferred(restored, False)
+        self.assertEqual(restored_task.state, TaskState.COMPLETED)
+        self.assertDictEqual(restored_task.data, task.data)
+        self.assertEqual(self.serializer.serialize_json(restored), self.state)
+
+    def test_restore_by_iteration(self):
+        restored = self.restore()
+        self.assertEqual(len(restored.get_tasks(state=TaskState.READY)), 1)
+        self.assertDeferred(restored)
+        self.assertEqual(len(restored.get_tasks()), len(self.workflow.get_tasks()))
+        self.assertDeferred(restored, False)
+
+    def test_reset(self):
+        restored = self.restore()
+        for workflow in [self.workflow, restored]:
+            task = workflow.get_next_task(spec_name='SubTask2')
+            workflow.reset_from_task_id(task.id)
+            self.assertEqual(task.state, TaskState.READY)
+        self.assertListEqual(
+            [(task.task_spec.name, task.state) for task in restored.get_tasks()],
+            [(task.task_spec.name, task.state) for task in self.workflow.get_tasks()],
+        )
+
+    def test_patches(self):
+        self.workflow = self.restore()
+        self.get_ready_user_tasks()[0].run()
+        self.workflow.do_engine_steps()
+        patch = self.serializer.serialize_patch_json(self.workflow)
+        self.assertIsNone(json.loads(patch)['subprocesses'][str(self.subprocess.parent_task_id)])
+        restored = self.serializer.deserialize_json(self.state, patches=[patch])
+        self.assertEqual(self.serializer.serialize_json(restored), self.serializer.serialize_json(self.workflow))
+
+    def test_restoring_does_not_change_tasks(self):
+        restored = self.restore()
+        restored.get_tasks()
+        self.assertDeferred(restored, False)
+        patch = json.loads(self.serializer.serialize_patch_json(restored))
+        self.assertDictEqual(patch['tasks'], {})
+        self.assertIsNone(patch['subprocesses'][str(self.subprocess.parent_task_id)])
@@ -0,0 +1,93 @@
+import json
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn import BpmnWorkflow
+from SpiffWorkflow.exceptions import WorkflowException
+from SpiffWorkflow.bpmn.serializer.exceptions import VersionMigrationError
+
+from ..BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class PatchSerializerTest(BpmnWorkflowTestCase):
+
+    # Options passed to the workflow that change how task data is stored
+    data_options = {}
+
+    def setUp(self):
+        spec, subprocesses = self.load_workflow_spec('resetworkflowA-*.bpmn', 'TopLevel')
+        self.workflow = BpmnWorkflow(spec, subprocesses, **self.data_options)
+        self.workflow.do_engine_steps()
+        self.state = self.serializer.serialize_json(self.workflow)
+        self.patches = []
+
+    def run_ready_task(self):
+        task = self.get_ready_user_tasks()[0]
+        task.run()
+        self.workflow.do_engine_steps()
+        self.patches.append(self.serializer.serialize_patch_json(self.workflow))
+        return task
+
+    def check_restored(self):
+        restored = self.serializer.deserialize_json(self.state, patches=self.patches)
+        expected = json.loads(self.serializer.serialize_json(self.workflow))
+        self.assertDictEqual(json.loads(self.serializer.serialize_json(restored)), expected)
+        return restored
+
+    def test_patch_contains_changed_tasks(self):
+        task = self.run_ready_task()
+        patch = json.loads(self.patches[0])
+        self.assertIn(str(task.id), patch['tasks'])
+        self.assertLess(len(patch['tasks']), len(self.workflow.tasks))
+        self.assertNotIn('spec', patch)
+        # The subprocess was started by the task that was run
+        self.assertEqual(len(patch['subprocesses']), 1)
+        self.check_restored()
+
+    def test_unchanged_workflow(self):
+        self.patches.append(self.serializer.serialize_patch_json(self.workflow))
+        patch = json.loads(self.patches[0])
+        self.assertDictEqual(patch['tasks'], {})
+        self.assertListEqual(patch['removed_tasks'], [])
+        self.check_restored()
+
+    def test_patches_through_completion(self):
+        while len(self.get_ready_user_tasks()) > 0:
+            self.run_ready_task()
+        self.assertTrue(self.workflow.completed)
+        restored = self.check_restored()
+        self.assertTrue(restored.completed)
+
+    def test_removed_tasks_and_subprocesses(self):
+        self.run_ready_task()
+        self.run_ready_task()
+        self.workflow.reset_from_task_id(self.workflow.get_next_task(spec_name='Task1').id)
+        self.patches.append(self.serializer.serialize_patch_json(self.workflow))
+        patch = json.loads(self.patches[-1])
+        self.assertGreater(len(patch['removed_tasks']), 0)
+        self.assertDictEqual(patch['subprocesses'], {})
+        restored = self.check_restored()
+        self.assertEqual(restored.get_next_task(spec_name='Task1').state, TaskState.READY)
+
+    def test_restored_workflow_is_tracked(self):
+        self.run_ready_task()
+        self.workflow = self.serializer.deserialize_json(self.state, patches=self.patches)
+        self.state, self.patches = self.serializer.serialize_json(self.workflow), []
+        self.run_ready_task()
+        self.check_restored()
+
+    def test_untracked_workflow(self):
+        workflow = BpmnWorkflow(self.workflow.spec, self.workflow.subprocess_specs)
+        self.assertRaises(WorkflowException, self.serializer.serialize_patch_json, workflow)
+
+    def test_patch_version(self):
+        self.patches.append(self.serializer.serialize_patch_json(self.workflow).replace(
+            f'"serializer_version": "{self.serializer.VERSION}"', '"serializer_version": "1.0"'))
+        self.assertRaises(VersionMigrationError, self.serializer.deserialize_json, self.state, patches=self.patches)
+
+
+class CopyOnWritePatchSerializerTest(PatchSerializerTest):
+    data_options = {'copy_on_write_data': True}
+
+
+class PersistentPatchSerializerTest(PatchSerializerTest):
+    data_options = {'persistent_data': True}
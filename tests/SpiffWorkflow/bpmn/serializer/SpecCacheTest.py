@@ -0,0 +1,101 @@
+import json
+from unittest.mock import patch
+
+from SpiffWorkflow.bpmn import BpmnWorkflow
+from SpiffWorkflow.bpmn.serializer import BpmnWorkflowSerializer, SpecCache
+from SpiffWorkflow.exceptions import WorkflowException
+
+from ..BpmnWorkflowTestCase import BpmnWorkflowTestCase, registry
+
+
+class SpecCacheTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        self.spec_cache = SpecCache()
+        self.serializer = BpmnWorkflowSerializer(registry, spec_cache=self.spec_cache)
+        self.spec, self.subprocesses = self.load_workflow_spec('call_activity_*.bpmn', 'Process_8200379')
+        self.workflow = BpmnWorkflow(self.spec, self.subprocesses)
+
+    def test_specs_are_referenced(self):
+        state = json.loads(self.serializer.serialize_json(self.workflow))
+        self.assertIsInstance(state['spec'], str)
+        self.assertEqual(len(state['subprocess_specs']), len(self.subprocesses))
+        self.assertEqual(len(self.spec_cache.serializations), len(self.subprocesses) + 1)
+        self.assertIs(self.spec_cache.get(state['spec']), self.spec)
+        # A second instance of the same process reuses the stored specs
+        workflow = BpmnWorkflow(self.spec, self.subprocesses)
+        self.assertDictEqual(json.loads(self.serializer.serialize_json(workflow))['subprocess_specs'],
+                             state['subprocess_specs'])
+        self.assertEqual(len(self.spec_cache.serializations), len(self.subprocesses) + 1)
+
+    def test_restore_from_cache(self):
+        self.workflow.do_engine_steps()
+        state = self.serializer.serialize_json(self.workflow)
+        with patch.object(self.spec_cache, 'load') as load:
+            restored = self.serializer.deserialize_json(state)
+            load.assert_not_called()
+        self.assertIs(restored.spec, self.spec)
+        self.assertTrue(restored.completed)
+        self.assertDictEqual(restored.data, self.workflow.data)
+
+    def test_restore_from_serializations(self):
+        state = self.serializer.serialize_json(self.workflow)
+        spec_cache = SpecCache()
+        spec_cache.serializations = self.spec_cache.serializations
+        serializer = BpmnWorkflowSerializer(registry, spec_cache=spec_cache)
+        first = serializer.deserialize_json(state)
+        second = serializer.deserialize_json(state)
+        self.assertIsNot(first.spec, self.spec)
+        self.assertIs(second.spec, first.spec)
+        self.assertEqual(first.spec.name, self.spec.name)
+        second.do_engine_steps()
+        self.assertTrue(second.completed)
+        # Specs restored from the cache are not serialized again
+        with patch.object(spec_cache, 'save') as save:
+            self.assertEqual(json.loads(serializer.serialize_json(second))['spec'], json.loads(state)['spec'])
+            save.assert_not_called()
+        self.assertDictEqual(spec_cache.serializations, self.spec_cache.serializations)
+
+    def test_lru_eviction(self):
+        spec_cache = SpecCache(maxsize=2)
+        spec_cache.add('a', 1)
+        spec_cache.add('b', 2)
+        spec_cache.get('a')
+        spec_cache.add('c', 3)
+        self.assertListEqual(list(spec_cache.specs), ['a', 'c'])
+
+    def test_missing_specs(self):
+        state = self.serializer.serialize_json(self.workflow)
+        self.assertRaises(WorkflowException, BpmnWorkflowSerializer(registry).deserialize_json, state)
+        serializer = BpmnWorkflowSerializer(registry, spec_cache=SpecCache())
+        self.assertRaises(WorkflowException, serializer.deserialize_json, state)
+
+    def test_cached_specs_are_migrated(self):
+        state = self.serializer.serialize_json(self.workflow)
+        key = json.loads(state)['spec']
+        stored = json.loads(self.spec_cache.serializations[key])
+        self.assertEqual(stored[self.serializer.VERSION_KEY], self.serializer.VERSION)
+
+        def migrate(dct):
+            dct['spec']['description'] = 'migrated'
+
+        spec_cache = SpecCache()
+        spec_cache.serializations = dict(self.spec_cache.serializations)
+        stored[self.serializer.VERSION_KEY] = 'old'
+        spec_cache.serializations[key] = json.dumps(stored)
+        serializer = BpmnWorkflowSerializer(registry, spec_cache=spec_cache)
+        with patch.dict('SpiffWorkflow.bpmn.serializer.workflow.MIGRATIONS', {'old': migrate}):
+            restored = serializer.deserialize_json(state)
+        self.assertEqual(restored.spec.description, 'migrated')
+        self.assertNotEqual(restored.subprocess_specs[list(self.subprocesses)[0]].description, 'migrated')
+
+    def test_unversioned_cached_specs(self):
+        state = self.serializer.serialize_json(self.workflow)
+        spec_cache = SpecCache()
+        spec_cache.serializations = dict(
+            (key, json.dumps(json.loads(value)['spec'])) for key, value in self.spec_cache.serializations.items()
+        )
+        serializer = BpmnWorkflowSerializer(registry, spec_cache=spec_cache)
+        restored = serializer.deserialize_json(state)
+        restored.do_engine_steps()
+        self.assertTrue(restored.completed)
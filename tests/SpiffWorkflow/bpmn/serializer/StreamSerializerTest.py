@@ -0,0 +1,64 @@
+import gzip
+from io import BytesIO
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn import BpmnWorkflow
+from SpiffWorkflow.bpmn.serializer import BpmnWorkflowSerializer, SpecCache
+
+from ..BpmnWorkflowTestCase import BpmnWorkflowTestCase, registry
+
+
+class StreamSerializerTest(BpmnWorkflowTestCase):
+
+    # Options passed to the workflow that change how task data is stored
+    data_options = {}
+
+    def setUp(self):
+        spec, subprocesses = self.load_workflow_spec('resetworkflowA-*.bpmn', 'TopLevel')
+        self.workflow = BpmnWorkflow(spec, subprocesses, **self.data_options)
+        self.workflow.do_engine_steps()
+        # Start the subprocess so that there are nested tasks
+        self.get_ready_user_tasks()[0].run()
+        self.workflow.do_engine_steps()
+        self.assertEqual(len(self.workflow.subprocesses), 1)
+
+    def check_stream(self, serializer):
+        stream = BytesIO()
+        serializer.serialize_stream(self.workflow, stream)
+        self.assertEqual(stream.getvalue().decode('utf-8'), serializer.serialize_json(self.workflow))
+        stream.seek(0)
+        restored = serializer.deserialize_stream(stream)
+        self.assertEqual(serializer.serialize_json(restored), serializer.serialize_json(self.workflow))
+
+    def test_stream_matches_json(self):
+        self.check_stream(self.serializer)
+
+    def test_stream_with_spec_cache(self):
+        self.check_stream(BpmnWorkflowSerializer(registry, spec_cache=SpecCache()))
+
+    def test_gzip_stream(self):
+        stream = BytesIO()
+        self.serializer.serialize_stream(self.workflow, stream, use_gzip=True)
+        self.assertFalse(stream.closed)
+        self.assertEqual(gzip.decompress(stream.getvalue()).decode('utf-8'), self.serializer.serialize_json(self.workflow))
+        stream.seek(0)
+        restored = self.serializer.deserialize_stream(stream, use_gzip=True)
+        self.assertEqual(restored.get_next_task(spec_name='SubTask2').state, TaskState.READY)
+
+    def test_stream_with_patches(self):
+        stream = BytesIO()
+        self.serializer.serialize_stream(self.workflow, stream)
+        self.workflow.get_next_task(spec_name='SubTask2').run()
+        self.workflow.do_engine_steps()
+        patch = self.serializer.serialize_patch_json(self.workflow)
+        stream.seek(0)
+        restored = self.serializer.deserialize_stream(stream, patches=[patch])
+        self.assertEqual(self.serializer.serialize_json(restored), self.serializer.serialize_json(self.workflow))
+
+
+class CopyOnWriteStreamSerializerTest(StreamSerializerTest):
+    data_options = {'copy_on_write_data': True}
+
+
+class PersistentStreamSerializerTest(StreamSerializerTest):
+    data_options = {'persistent_data': True}
@@ -0,0 +1,42 @@
+import json
+from uuid import uuid4
+
+from SpiffWorkflow.bpmn import BpmnWorkflow
+from SpiffWorkflow.bpmn.serializer.helpers.task_table import tasks_to_table, table_to_tasks
+
+from ..BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class TaskTableTest(BpmnWorkflowTestCase):
+
+    def setUp(self):
+        spec, subprocesses = self.load_workflow_spec('resetworkflowA-*.bpmn', 'TopLevel')
+        self.workflow = BpmnWorkflow(spec, subprocesses)
+        self.workflow.do_engine_steps()
+        self.table = json.loads(self.serializer.serialize_json(self.workflow))['tasks']
+        self.tasks = table_to_tasks(self.table)
+
+    def test_table_round_trip(self):
+        self.assertListEqual(self.table['ids'], [str(task_id) for task_id in self.workflow.tasks])
+        self.assertEqual(self.table['parents'][0], -1)
+        self.assertDictEqual(self.table['children'], {})
+        self.assertListEqual(self.table['values']['typename'], ['Task'])
+        self.assertCountEqual(self.table['values']['task_spec'], [t.task_spec.name for t in self.workflow.tasks.values()])
+        task = self.workflow.get_next_task(spec_name='Task1')
+        self.assertEqual(self.tasks[str(task.id)]['parent'], str(task.parent.id))
+        self.assertListEqual(self.tasks[str(task.id)]['children'], [str(c.id) for c in task.children])
+        self.assertDictEqual(tasks_to_table(self.tasks), self.table)
+
+    def test_children_not_derived_from_parents(self):
+        root = next(iter(self.tasks.values()))
+        first, second = list(self.tasks.values())[1:3]
+        first['children'], second['children'] = second['children'], first['children']
+        root['children'].append(str(uuid4()))
+        table = tasks_to_table(self.tasks)
+        self.assertEqual(len(table['children']), 3)
+        self.assertIsInstance(table['children']['0'][-1], str)
+        self.assertDictEqual(table_to_tasks(table), self.tasks)
+
+    def test_inconsistent_attributes(self):
+        del next(iter(self.tasks.values()))['triggered']
+        self.assertRaises(ValueError, tasks_to_table, self.tasks)
@@ -1,9 +1,12 @@
+import json
+import os
 import time
 from uuid import UUID
 
 from SpiffWorkflow import TaskState
 from SpiffWorkflow.bpmn.script_engine import PythonScriptEngine, TaskDataEnvironment
 from SpiffWorkflow.bpmn.serializer.exceptions import VersionMigrationError
+from SpiffWorkflow.bpmn.serializer.migration.version_migration import from_version_1_4
 
 from .BaseTestCase import BaseTestCase
 
@@ -24,7 +27,9 @@ class Version_1_0_Test(BaseTestCase):
 class Version_1_1_Test(BaseTestCase):
 
     def test_timers(self):
-        wf = self.deserialize_workflow('v1.1-timers.json')
+        # The tasks removed from the cycle timer are removed with their descendants
+        with self.assertNoLogs('spiff.serializer', level='WARNING'):
+            wf = self.deserialize_workflow('v1.1-timers.json')
         wf.script_engine = PythonScriptEngine(environment=TaskDataEnvironment({"time": time}))
         wf.refresh_timers()
         wf.do_engine_steps()
@@ -195,3 +200,25 @@ class Version_1_3_Test(BaseTestCase):
         self.assertEqual(len(task_info['running']), 0)
         self.assertEqual(len(task_info['future']), 0)
         self.assertTrue(wf.completed)
+
+
+class Version_1_4_Test(BaseTestCase):
+
+    def test_convert_tasks_to_tables(self):
+        fn = os.path.join(self.DATA_DIR, 'serialization', 'v1.4-subprocess.json')
+        with open(fn) as fh:
+            dct = json.load(fh)
+        tasks = dct['tasks']
+        from_version_1_4(dct)
+        self.assertListEqual(dct['tasks']['ids'], list(tasks))
+        self.assertIn('SubTask2', dct['subprocesses'][next(iter(dct['subprocesses']))]['tasks']['values']['task_spec'])
+
+        wf = self.deserialize_workflow('v1.4-subprocess.json')
+        self.assertEqual(len(wf.subprocesses), 1)
+        ready_tasks = wf.get_tasks(state=TaskState.READY, manual=True)
+        self.assertEqual(len(ready_tasks), 1)
+        while len(ready_tasks) > 0:
+            ready_tasks[0].run()
+            wf.do_engine_steps()
+            ready_tasks = wf.get_tasks(state=TaskState.READY, manual=True)
+        self.assertTrue(wf.completed)
@@ -0,0 +1,85 @@
+"""
+Performance tests for the binary serialization backend.
+Compares the size and the serialization and deserialization time of msgpack and JSON serializations of a
+completed performance_test.bpmn workflow.
+"""
+import os
+import time
+import unittest
+
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class BinarySerializationPerformanceTest(BpmnWorkflowTestCase):
+    """
+    Measure serialize_binary and deserialize_binary against serialize_json and deserialize_json.
+    """
+
+    def _create_workflow(self, count):
+        """
+        Create a workflow from performance_test.bpmn with modified item count.
+
+        Args:
+            count: Number of items to create (replaces the hardcoded 20)
+
+        Returns:
+            BpmnWorkflow instance ready to execute
+        """
+        bpmn_path = os.path.join(os.path.dirname(__file__), 'data', 'performance_test.bpmn')
+        with open(bpmn_path) as f:
+            bpmn_content = f.read()
+
+        modified_content = bpmn_content.replace('items = [item]*20', f'items = [item]*{count}')
+
+        tmp_filename = f'_temp_binary_performance_test_{count}.bpmn'
+        tmp_path = os.path.join(os.path.dirname(__file__), 'data', tmp_filename)
+        with open(tmp_path, 'w') as f:
+            f.write(modified_content)
+
+        try:
+            spec, subprocesses = self.load_workflow_spec(tmp_filename, 'Process_3no3Cw9', validate=False)
+            workflow = BpmnWorkflow(spec, subprocesses)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        return workflow
+
+    def _measure(self, serialize, deserialize, workflow, iterations=5):
+        start = time.time()
+        for _ in range(iterations):
+            state = serialize(workflow)
+        serialize_time = (time.time() - start) / iterations
+        start = time.time()
+        for _ in range(iterations):
+            restored = deserialize(state)
+        deserialize_time = (time.time() - start) / iterations
+        self.assertTrue(restored.completed)
+        return len(state), serialize_time, deserialize_time
+
+    def test_binary_serialization_100_items(self):
+        """Compare msgpack and JSON serializations with 100 items."""
+        workflow = self._create_workflow(100)
+        workflow.do_engine_steps()
+        self.assertTrue(workflow.completed)
+
+        json_results = self._measure(self.serializer.serialize_json, self.serializer.deserialize_json, workflow)
+        binary_results = self._measure(self.serializer.serialize_binary, self.serializer.deserialize_binary, workflow)
+        self.assertLess(binary_results[0], json_results[0])
+
+        print("\n" + "="*80)
+        print(f"BINARY SERIALIZATION PERFORMANCE TEST ({len(workflow.tasks)} tasks)")
+        print("="*80)
+        for name, (size, serialize_time, deserialize_time) in [('JSON', json_results), ('msgpack', binary_results)]:
+            print(f"  {name}:")
+            print(f"    Size:            {size} bytes")
+            print(f"    Serialization:   {serialize_time:.6f} seconds")
+            print(f"    Deserialization: {deserialize_time:.6f} seconds")
+        print("="*80)
@@ -0,0 +1,114 @@
+"""
+Performance tests for task data delta encoding.
+Compares serialization and deserialization of workflows with large task data when unchanged values are compared
+by equality and copied on restore with comparing them by identity and sharing them on restore.
+"""
+import os
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from SpiffWorkflow.task import Task
+from SpiffWorkflow.util.deep_merge import DeepMerge
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+def get_updated_keys_by_equality(a, b):
+    """Find updated keys the way the serializer used to, comparing every value."""
+    return {key: b[key] for key in b if key not in a or b[key] != a[key]}
+
+
+def copy_data(task, other, updates=None, deletions=None):
+    """Restore data the way the serializer used to, copying the parent's data for every task."""
+    data = DeepMerge.merge({}, other._peek_data())
+    data.update(updates or {})
+    for key in deletions or []:
+        data.pop(key, None)
+    task.data = data
+
+
+class DataDeltaPerformanceTest(BpmnWorkflowTestCase):
+    """
+    Measure serialize_json and deserialize_json on parallel_multiinstance_cardinality.bpmn with large task data.
+    """
+
+    def _create_workflow(self, count, size):
+        """
+        Create a workflow from parallel_multiinstance_cardinality.bpmn with modified cardinality and large data.
+
+        Args:
+            count: Number of instances to create (replaces the hardcoded 3)
+            size: The number of records added to the workflow's data
+
+        Returns:
+            BpmnWorkflow instance ready to execute
+        """
+        bpmn_path = os.path.join(os.path.dirname(__file__), 'data', 'parallel_multiinstance_cardinality.bpmn')
+        with open(bpmn_path) as f:
+            bpmn_content = f.read()
+
+        modified_content = bpmn_content.replace(
+            '>3</bpmn:loopCardinality>',
+            f'>{count}</bpmn:loopCardinality>'
+        )
+
+        tmp_filename = f'_temp_data_delta_performance_{count}.bpmn'
+        tmp_path = os.path.join(os.path.dirname(__file__), 'data', tmp_filename)
+        with open(tmp_path, 'w') as f:
+            f.write(modified_content)
+
+        try:
+            spec, subprocesses = self.load_workflow_spec(tmp_filename, 'main', validate=False)
+            workflow = BpmnWorkflow(spec, subprocesses)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        workflow.task_tree.data['records'] = [
+            {'id': idx, 'name': f'record {idx}', 'values': list(range(10))} for idx in range(size)
+        ]
+        return workflow
+
+    def _measure(self, workflow):
+        start = time.time()
+        state = self.serializer.serialize_json(workflow)
+        serialize_time = time.time() - start
+        start = time.time()
+        restored = self.serializer.deserialize_json(state)
+        deserialize_time = time.time() - start
+        start = time.time()
+        self.serializer.serialize_json(restored)
+        reserialize_time = time.time() - start
+        del restored
+        tracemalloc.start()
+        restored = self.serializer.deserialize_json(state)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.assertEqual(len(restored.tasks), len(workflow.tasks))
+        return len(state), serialize_time, deserialize_time, reserialize_time, memory
+
+    def test_data_delta_1000_instances(self):
+        """Measure delta encoding with 1000 instances and about 1MB of records in every task's data."""
+        workflow = self._create_workflow(1000, 10000)
+        workflow.do_engine_steps()
+
+        with patch.object(DeepMerge, 'get_updated_keys', staticmethod(get_updated_keys_by_equality)), \
+                patch.object(Task, '_borrow_data', copy_data), patch.object(Task, '_share_data', copy_data):
+            copied = self._measure(workflow)
+        shared = self._measure(workflow)
+        self.assertEqual(copied[0], shared[0])
+
+        print("\n" + "="*80)
+        print(f"DATA DELTA PERFORMANCE TEST ({len(workflow.tasks)} tasks, {shared[0]} bytes)")
+        print("="*80)
+        for name, (size, serialize_time, deserialize_time, reserialize_time, memory) in [
+            ('Compared by equality, copied on restore', copied),
+            ('Compared by identity, shared on restore', shared),
+        ]:
+            print(f"  {name}:")
+            print(f"    Serialization:                 {serialize_time:.6f} seconds")
+            print(f"    Deserialization:               {deserialize_time:.6f} seconds")
+            print(f"    Serialization after restoring: {reserialize_time:.6f} seconds")
+            print(f"    Memory used by restored tasks: {memory / 1024 / 1024:.1f} MB")
+        print("="*80)
@@ -0,0 +1,85 @@
+"""
+Performance tests for lazy deserialization.
+Compares restoring every subprocess of a workflow with restoring the tasks of completed subprocesses only when
+they are used.
+"""
+import os
+import time
+
+from SpiffWorkflow.util.task import TaskState
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class LazyDeserializationPerformanceTest(BpmnWorkflowTestCase):
+    """
+    Measure deserialize_json on performance_test.bpmn, where each item is processed by a subprocess.
+    """
+
+    def _create_workflow_with_item_count(self, count):
+        """
+        Create a workflow from performance_test.bpmn with modified item count.
+
+        Args:
+            count: Number of items to create (replaces the hardcoded 20)
+
+        Returns:
+            BpmnWorkflow instance ready to execute
+        """
+        bpmn_path = os.path.join(os.path.dirname(__file__), 'data', 'performance_test.bpmn')
+        with open(bpmn_path) as f:
+            bpmn_content = f.read()
+
+        modified_content = bpmn_content.replace('items = [item]*20', f'items = [item]*{count}')
+
+        tmp_filename = f'_temp_lazy_deserialization_performance_{count}.bpmn'
+        tmp_path = os.path.join(os.path.dirname(__file__), 'data', tmp_filename)
+        with open(tmp_path, 'w') as f:
+            f.write(modified_content)
+
+        try:
+            spec, subprocesses = self.load_workflow_spec(tmp_filename, 'Process_3no3Cw9', validate=False)
+            workflow = BpmnWorkflow(spec, subprocesses)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        return workflow
+
+    def _measure(self, state, lazy):
+        start = time.time()
+        restored = self.serializer.deserialize_json(state, lazy=lazy)
+        deserialize_time = time.time() - start
+        # What a request that only looks for the tasks that can run next would do after restoring the workflow
+        start = time.time()
+        restored.get_tasks(state=TaskState.READY)
+        restored.do_engine_steps()
+        self.serializer.serialize_json(restored)
+        request_time = time.time() - start
+        start = time.time()
+        restored.get_tasks()
+        restore_all_time = time.time() - start
+        return deserialize_time, request_time, restore_all_time
+
+    def test_lazy_deserialization_100_items(self):
+        """Measure restoring a workflow with 100 completed subprocesses."""
+        workflow = self._create_workflow_with_item_count(100)
+        workflow.do_engine_steps()
+        state = self.serializer.serialize_json(workflow)
+
+        eager = self._measure(state, False)
+        lazy = self._measure(state, True)
+
+        print("\n" + "="*80)
+        print(f"LAZY DESERIALIZATION PERFORMANCE TEST ({len(workflow.subprocesses)} subprocesses, {len(state)} bytes)")
+        print("="*80)
+        for name, (deserialize_time, request_time, restore_all_time) in [
+            ('Eager', eager),
+            ('Lazy', lazy),
+        ]:
+            print(f"  {name}:")
+            print(f"    Deserialization:                 {deserialize_time:.6f} seconds")
+            print(f"    Find ready tasks and serialize:  {request_time:.6f} seconds")
+            print(f"    Iterate over all tasks:          {restore_all_time:.6f} seconds")
+            print(f"    Total:                           {sum((deserialize_time, request_time, restore_all_time)):.6f} seconds")
+        print("="*80)
@@ -0,0 +1,89 @@
+"""
+Performance tests for logging during workflow execution.
+Compares engine step throughput when the spiff loggers are set to WARNING (no records are created) and to INFO
+and DEBUG (a record with extras is created for every state change).
+"""
+import logging
+import os
+import time
+
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class CountingHandler(logging.Handler):
+    """Handler that counts records without formatting them."""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+class LoggingPerformanceTest(BpmnWorkflowTestCase):
+    """
+    Measure do_engine_steps on performance_test.bpmn at different log levels.
+    """
+
+    def _create_workflow(self, count):
+        """
+        Create a workflow from performance_test.bpmn with modified item count.
+
+        Args:
+            count: Number of items to create (replaces the hardcoded 20)
+
+        Returns:
+            BpmnWorkflow instance ready to execute
+        """
+        bpmn_path = os.path.join(os.path.dirname(__file__), 'data', 'performance_test.bpmn')
+        with open(bpmn_path) as f:
+            bpmn_content = f.read()
+
+        modified_content = bpmn_content.replace('items = [item]*20', f'items = [item]*{count}')
+
+        tmp_filename = f'_temp_logging_performance_test_{count}.bpmn'
+        tmp_path = os.path.join(os.path.dirname(__file__), 'data', tmp_filename)
+        with open(tmp_path, 'w') as f:
+            f.write(modified_content)
+
+        try:
+            spec, subprocesses = self.load_workflow_spec(tmp_filename, 'Process_3no3Cw9', validate=False)
+            workflow = BpmnWorkflow(spec, subprocesses)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        return workflow
+
+    def _measure(self, count, level):
+        logger = logging.getLogger('spiff')
+        handler = CountingHandler()
+        previous_level, previous_propagate = logger.level, logger.propagate
+        logger.addHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = False
+        try:
+            workflow = self._create_workflow(count)
+            start = time.time()
+            workflow.do_engine_steps()
+            elapsed = time.time() - start
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(previous_level)
+            logger.propagate = previous_propagate
+        self.assertTrue(workflow.completed)
+        return elapsed, len(workflow.tasks), handler.count
+
+    def test_logging_300_items(self):
+        """Measure engine steps with 300 items at WARNING, INFO and DEBUG."""
+        print("\n" + "="*80)
+        print("LOGGING PERFORMANCE TEST (performance_test.bpmn)")
+        print("="*80)
+        print("  300 items:")
+        for name, level in [('WARNING', logging.WARNING), ('INFO', logging.INFO), ('DEBUG', logging.DEBUG)]:
+            elapsed, tasks, records = self._measure(300, level)
+            print(f"    {name + ':':9s} {elapsed:.4f} seconds, {tasks / elapsed:9.0f} tasks/second, "
+                  f"{records} records")
+        print("="*80)
@@ -0,0 +1,139 @@
+"""
+Memory tests for a large parallel multi-instance process and for the task data options.
+Measures memory allocated by a workflow instance across different instance counts.
+"""
+import os
+import tracemalloc
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class MemoryPerformanceTest(BpmnWorkflowTestCase):
+    """
+    Measure the memory used by workflows from parallel_multiinstance_cardinality.bpmn.
+    """
+
+    def _create_workflow_with_cardinality(self, count):
+        """
+        Create a workflow from parallel_multiinstance_cardinality.bpmn with modified cardinality.
+
+        Args:
+            count: Number of instances to create (replaces the hardcoded 3)
+
+        Returns:
+            BpmnWorkflow instance ready to execute
+        """
+        bpmn_path = os.path.join(os.path.dirname(__file__), 'data', 'parallel_multiinstance_cardinality.bpmn')
+        with open(bpmn_path) as f:
+            bpmn_content = f.read()
+
+        modified_content = bpmn_content.replace(
+            '>3</bpmn:loopCardinality>',
+            f'>{count}</bpmn:loopCardinality>'
+        )
+
+        tmp_filename = f'_temp_parallel_multiinstance_{count}.bpmn'
+        tmp_path = os.path.join(os.path.dirname(__file__), 'data', tmp_filename)
+        with open(tmp_path, 'w') as f:
+            f.write(modified_content)
+
+        try:
+            spec, subprocesses = self.load_workflow_spec(tmp_filename, 'main', validate=False)
+            workflow = BpmnWorkflow(spec, subprocesses)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        return workflow
+
+    def _create_performance_workflow(self, count, **kwargs):
+        """
+        Create a workflow from performance_test.bpmn with modified item count.
+
+        Args:
+            count: Number of items to create (replaces the hardcoded 20)
+            kwargs: Workflow options
+
+        Returns:
+            BpmnWorkflow instance ready to execute
+        """
+        bpmn_path = os.path.join(os.path.dirname(__file__), 'data', 'performance_test.bpmn')
+        with open(bpmn_path) as f:
+            bpmn_content = f.read()
+
+        modified_content = bpmn_content.replace('items = [item]*20', f'items = [item]*{count}')
+
+        tmp_filename = f'_temp_memory_performance_test_{count}.bpmn'
+        tmp_path = os.path.join(os.path.dirname(__file__), 'data', tmp_filename)
+        with open(tmp_path, 'w') as f:
+            f.write(modified_content)
+
+        try:
+            spec, subprocesses = self.load_workflow_spec(tmp_filename, 'Process_3no3Cw9', validate=False)
+            workflow = BpmnWorkflow(spec, subprocesses, **kwargs)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        return workflow
+
+    def _measure(self, count):
+        tracemalloc.start()
+        workflow = self._create_workflow_with_cardinality(count)
+        workflow.do_engine_steps()
+        ready_memory = tracemalloc.get_traced_memory()[0]
+        ready_tasks = len(workflow.tasks)
+
+        for task in workflow.get_tasks(state=TaskState.READY, manual=True):
+            task.data['output_item'] = 1
+            task.run()
+        workflow.do_engine_steps()
+        completed_memory = tracemalloc.get_traced_memory()[0]
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        self.assertTrue(workflow.completed)
+
+        print("\n" + "="*80)
+        print("MEMORY TEST (parallel_multiinstance_cardinality.bpmn)")
+        print("="*80)
+        print(f"  {count} instances:")
+        print(f"    Instances ready:  {ready_memory / 1024:.1f} KiB ({ready_tasks} tasks, "
+              f"{ready_memory / ready_tasks:.0f} bytes per task)")
+        print(f"    Completed:        {completed_memory / 1024:.1f} KiB ({len(workflow.tasks)} tasks, "
+              f"{completed_memory / len(workflow.tasks):.0f} bytes per task)")
+        print(f"    Peak:             {peak_memory / 1024:.1f} KiB")
+        print("="*80)
+
+    def test_memory_1000_instances(self):
+        """Measure memory with 1000 instances."""
+        self._measure(1000)
+
+    def test_memory_5000_instances(self):
+        """Measure memory with 5000 instances."""
+        self._measure(5000)
+
+    def test_data_options_300_items(self):
+        """Measure memory of workflow execution and of snapshotting every task's data with each data option."""
+        print("\n" + "="*80)
+        print("TASK DATA MEMORY TEST (performance_test.bpmn)")
+        print("="*80)
+        print("  300 items:")
+        for name, options in [
+            ('default', {}),
+            ('copy on write', {'copy_on_write_data': True}),
+            ('persistent', {'persistent_data': True}),
+        ]:
+            tracemalloc.start()
+            workflow = self._create_performance_workflow(300, **options)
+            workflow.do_engine_steps()
+            execution_memory = tracemalloc.get_traced_memory()[0]
+            snapshots = [task.snapshot_data() for task in workflow.get_tasks()]
+            snapshot_memory = tracemalloc.get_traced_memory()[0] - execution_memory
+            tracemalloc.stop()
+            self.assertTrue(workflow.completed)
+            print(f"    {name:14s} execution: {execution_memory / 1024:9.1f} KiB   "
+                  f"snapshots of {len(snapshots)} tasks: {snapshot_memory / 1024:9.1f} KiB")
+        print("="*80)
@@ -0,0 +1,115 @@
+"""
+Performance tests for creating the instances of a large parallel multi-instance task.
+Compares adding the instances one at a time with adding them in bulk, with and without INFO logging.
+"""
+import logging
+import os
+import time
+from unittest.mock import patch
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.task import Task
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+def add_children_individually(task, task_specs, state=TaskState.MAYBE):
+    """Add children the way tasks used to, notifying the parent for each one."""
+    return [task._add_child(task_spec, state) for task_spec in task_specs]
+
+
+def update_children_individually(task, children):
+    """Update children the way tasks used to, logging and emitting the update event for each one."""
+    for child in children:
+        child.task_spec._update(child)
+
+
+class MultiInstancePerformanceTest(BpmnWorkflowTestCase):
+    """
+    Measure the time taken to create the instances of parallel_multiinstance_cardinality.bpmn.
+    """
+
+    def _create_workflow_with_cardinality(self, count):
+        """
+        Create a workflow from parallel_multiinstance_cardinality.bpmn with modified cardinality.
+
+        Args:
+            count: Number of instances to create (replaces the hardcoded 3)
+
+        Returns:
+            BpmnWorkflow instance ready to execute
+        """
+        bpmn_path = os.path.join(os.path.dirname(__file__), 'data', 'parallel_multiinstance_cardinality.bpmn')
+        with open(bpmn_path) as f:
+            bpmn_content = f.read()
+
+        modified_content = bpmn_content.replace(
+            '>3</bpmn:loopCardinality>',
+            f'>{count}</bpmn:loopCardinality>'
+        )
+
+        tmp_filename = f'_temp_multiinstance_performance_{count}.bpmn'
+        tmp_path = os.path.join(os.path.dirname(__file__), 'data', tmp_filename)
+        with open(tmp_path, 'w') as f:
+            f.write(modified_content)
+
+        try:
+            spec, subprocesses = self.load_workflow_spec(tmp_filename, 'main', validate=False)
+            workflow = BpmnWorkflow(spec, subprocesses)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        return workflow
+
+    def _measure(self, count, level=logging.WARNING):
+        logger = logging.getLogger('spiff')
+        handler = logging.NullHandler()
+        previous_level, previous_propagate = logger.level, logger.propagate
+        logger.addHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = False
+        try:
+            self._measure_instances(count)
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(previous_level)
+            logger.propagate = previous_propagate
+
+    def _measure_instances(self, count):
+        workflow = self._create_workflow_with_cardinality(count)
+        start = time.time()
+        with patch.object(Task, '_add_children_bulk', add_children_individually), \
+                patch.object(Task, '_update_children_bulk', update_children_individually):
+            workflow.do_engine_steps()
+        individual_time = time.time() - start
+        individual_ready = len(workflow.get_tasks(state=TaskState.READY))
+
+        workflow = self._create_workflow_with_cardinality(count)
+        start = time.time()
+        workflow.do_engine_steps()
+        bulk_time = time.time() - start
+        ready = len(workflow.get_tasks(state=TaskState.READY))
+
+        self.assertEqual(ready, count)
+        self.assertEqual(individual_ready, ready)
+        print(f"  {count} instances:")
+        print(f"    Added individually: {individual_time:.6f} seconds")
+        print(f"    Added in bulk:      {bulk_time:.6f} seconds")
+
+    def test_performance_10000_instances(self):
+        """Measure creation of 1000 and 10000 instances."""
+        print("\n" + "="*80)
+        print("MULTIINSTANCE PERFORMANCE TEST (parallel_multiinstance_cardinality.bpmn)")
+        print("="*80)
+        self._measure(1000)
+        self._measure(10000)
+        print("="*80)
+
+    def test_performance_10000_instances_with_logging(self):
+        """Measure creation of 10000 instances with the spiff loggers set to INFO."""
+        print("\n" + "="*80)
+        print("MULTIINSTANCE PERFORMANCE TEST WITH INFO LOGGING (parallel_multiinstance_cardinality.bpmn)")
+        print("="*80)
+        self._measure(10000, logging.INFO)
+        print("="*80)
@@ -0,0 +1,116 @@
+"""
+Performance tests for registry conversion.
+Compares converting and restoring task data by looking up every value's typename with dispatching on the value's
+class and passing JSON primitives through.
+"""
+import time
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+from uuid import uuid4
+
+from SpiffWorkflow.bpmn.serializer.helpers.dictionary import DictionaryConverter
+from SpiffWorkflow.bpmn.serializer.helpers.registry import DefaultRegistry
+
+
+def convert_by_typename(self, obj, **kwargs):
+    """Convert data the way the registry used to, looking up the typename of every value."""
+    typename = self.typenames.get(obj.__class__)
+    if typename in self.convert_to_dict:
+        return self.convert_to_dict[typename](obj, **kwargs)
+    elif isinstance(obj, dict):
+        return {k: self.convert(v, **kwargs) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple, set)):
+        return obj.__class__([self.convert(item, **kwargs) for item in obj])
+    else:
+        return obj
+
+
+def clean_and_convert(self, obj, **kwargs):
+    """Convert data the way the default registry used to, cleaning every value."""
+    if self._encoder_mode:
+        return self._convert_for_encoder(obj, **kwargs)
+    return DictionaryConverter.convert(self, self.clean(obj), **kwargs)
+
+
+def restore_each_value(self, val, **kwargs):
+    """Restore data the way the registry used to, restoring every value of a container."""
+    if type(val) in (str, int, float, bool, type(None)):
+        return val
+    if isinstance(val, dict):
+        if 'typename' in val:
+            dct = dict(val)
+            return self.convert_from_dict.get(dct.pop('typename'))(dct, **kwargs)
+        return {k: self.restore(v, **kwargs) for k, v in val.items()}
+    if isinstance(val, (list, tuple, set)):
+        return val.__class__([self.restore(item, **kwargs) for item in val])
+    return val
+
+
+class RegistryConversionPerformanceTest(TestCase):
+    """
+    Measure DefaultRegistry.convert and restore on task data containing mostly JSON primitives.
+    """
+
+    def _create_data(self, count):
+        """
+        Create task data resembling the results of a service call.
+
+        Args:
+            count: the number of records
+
+        Returns:
+            dict: the task data
+        """
+        return {
+            'customer': {'name': 'Example Customer', 'id': 12345, 'active': True, 'tags': ['a', 'b', 'c']},
+            'requested': datetime(2024, 1, 1, 12, 0),
+            'request_id': uuid4(),
+            'records': [
+                {
+                    'id': idx,
+                    'name': f'record {idx}',
+                    'price': idx * 1.5,
+                    'available': idx % 2 == 0,
+                    'codes': [idx, idx + 1, idx + 2],
+                    'address': {'street': f'{idx} Main St', 'city': 'Springfield', 'zip': None},
+                } for idx in range(count)
+            ],
+        }
+
+    def _measure(self, registry, data, iterations):
+        start = time.time()
+        for _ in range(iterations):
+            converted = registry.convert(data)
+        convert_time = time.time() - start
+        start = time.time()
+        for _ in range(iterations):
+            restored = registry.restore(converted)
+        restore_time = time.time() - start
+        return converted, restored, convert_time, restore_time
+
+    def test_registry_conversion_10000_records(self):
+        """Measure conversion of task data with 10000 records."""
+        registry = DefaultRegistry()
+        data = self._create_data(10000)
+        iterations = 5
+
+        with patch.object(DictionaryConverter, 'convert', convert_by_typename), \
+                patch.object(DefaultRegistry, 'convert', clean_and_convert), \
+                patch.object(DictionaryConverter, 'restore', restore_each_value):
+            old = self._measure(registry, data, iterations)
+        new = self._measure(registry, data, iterations)
+        self.assertEqual(old[0], new[0])
+        self.assertEqual(new[1], data)
+
+        print("\n" + "="*80)
+        print(f"REGISTRY CONVERSION PERFORMANCE TEST (10000 records, {iterations} iterations)")
+        print("="*80)
+        for name, (_, _, convert_time, restore_time) in [
+            ('Typename lookup for every value', old),
+            ('Class dispatch, primitives passed through', new),
+        ]:
+            print(f"  {name}:")
+            print(f"    Conversion:  {convert_time:.6f} seconds ({iterations * len(data['records']) / convert_time:.0f} records/s)")
+            print(f"    Restoration: {restore_time:.6f} seconds ({iterations * len(data['records']) / restore_time:.0f} records/s)")
+        print("="*80)
@@ -0,0 +1,90 @@
+"""
+Performance tests for the task table serialization format.
+Compares the size and parse time of workflows serialized with task tables (version 1.5) and with a dictionary of
+task id to task (version 1.4).
+"""
+import json
+import os
+import time
+
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from SpiffWorkflow.bpmn.serializer.helpers.task_table import table_to_tasks
+from .BpmnWorkflowTestCase import BpmnWorkflowTestCase
+
+
+class TaskTablePerformanceTest(BpmnWorkflowTestCase):
+    """
+    Measure serializations of parallel_multiinstance_cardinality.bpmn with many instances.
+    """
+
+    def _create_workflow_with_cardinality(self, count):
+        """
+        Create a workflow from parallel_multiinstance_cardinality.bpmn with modified cardinality.
+
+        Args:
+            count: Number of instances to create (replaces the hardcoded 3)
+
+        Returns:
+            BpmnWorkflow instance ready to execute
+        """
+        bpmn_path = os.path.join(os.path.dirname(__file__), 'data', 'parallel_multiinstance_cardinality.bpmn')
+        with open(bpmn_path) as f:
+            bpmn_content = f.read()
+
+        modified_content = bpmn_content.replace(
+            '>3</bpmn:loopCardinality>',
+            f'>{count}</bpmn:loopCardinality>'
+        )
+
+        tmp_filename = f'_temp_task_table_performance_{count}.bpmn'
+        tmp_path = os.path.join(os.path.dirname(__file__), 'data', tmp_filename)
+        with open(tmp_path, 'w') as f:
+            f.write(modified_content)
+
+        try:
+            spec, subprocesses = self.load_workflow_spec(tmp_filename, 'main', validate=False)
+            workflow = BpmnWorkflow(spec, subprocesses)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        return workflow
+
+    def _measure(self, state, iterations=5):
+        start = time.time()
+        for _ in range(iterations):
+            json.loads(state)
+        parse_time = (time.time() - start) / iterations
+        start = time.time()
+        for _ in range(iterations):
+            self.serializer.deserialize_json(state)
+        deserialize_time = (time.time() - start) / iterations
+        return len(state), parse_time, deserialize_time
+
+    def test_task_table_10000_instances(self):
+        """Compare task table and task dictionary serializations with 10000 instances."""
+        workflow = self._create_workflow_with_cardinality(10000)
+        workflow.do_engine_steps()
+
+        table_state = self.serializer.serialize_json(workflow)
+        dct = json.loads(table_state)
+        dct['tasks'] = table_to_tasks(dct['tasks'])
+        dct['serializer_version'] = '1.4'
+        mapping_state = json.dumps(dct)
+
+        table_results = self._measure(table_state)
+        mapping_results = self._measure(mapping_state)
+        self.assertLess(table_results[0], mapping_results[0])
+
+        print("\n" + "="*80)
+        print(f"TASK TABLE PERFORMANCE TEST ({len(workflow.tasks)} tasks)")
+        print("="*80)
+        for name, (size, parse_time, deserialize_time) in [('1.4 (task dictionary)', mapping_results),
+                                                            ('1.5 (task table)', table_results)]:
+            print(f"  {name}:")
+            print(f"    Size:            {size} bytes")
+            print(f"    JSON parse:      {parse_time:.6f} seconds")
+            print(f"    Deserialization: {deserialize_time:.6f} seconds")
+        print(f"  Size reduction:    {1 - table_results[0] / mapping_results[0]:.1%}")
+        print(f"  Parse reduction:   {1 - table_results[1] / mapping_results[1]:.1%}")
+        print("="*80)
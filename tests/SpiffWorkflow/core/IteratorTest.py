@@ -1,10 +1,13 @@
 import unittest
 import os
 from datetime import datetime
+from unittest.mock import patch
 
 from lxml import etree
 
 from SpiffWorkflow import TaskState, Workflow
+from SpiffWorkflow.task import Task
+from SpiffWorkflow.util.task import TaskFilter
 from SpiffWorkflow.specs.WorkflowSpec import WorkflowSpec
 from SpiffWorkflow.serializer.prettyxml import XmlSerializer
 
@@ -74,3 +77,84 @@ class BreadthFirstTest(IterationTest):
             [t.task_spec.name for t in tasks],
             ['Start', 'a', 'b', 'a1', 'a2', 'c', 'b1', 'b2']
         )
+
+class StateIndexTest(IterationTest):
+
+    def assert_index_matches_tree(self):
+        for state in TaskState._values:
+            self.assertSetEqual(
+                self.workflow._state_index[state],
+                set(t.id for t in self.workflow.get_tasks(depth_first=False) if t.state == state)
+            )
+
+    def test_index_is_updated(self):
+        self.assert_index_matches_tree()
+        super().get_tasks_updated_after()
+        self.assert_index_matches_tree()
+        self.workflow.reset_from_task_id(self.workflow.get_next_task(spec_name='a').id)
+        self.assert_index_matches_tree()
+
+    def test_get_tasks_from_index(self):
+        super().get_tasks_updated_after()
+        for state in [TaskState.READY, TaskState.FUTURE, TaskState.COMPLETED, TaskState.READY|TaskState.COMPLETED]:
+            _iter = self.workflow.get_tasks_iterator(state=state)
+            tasks = list(_iter)
+            traversed = self.workflow.get_tasks_iterator(state=state)
+            traversed.indexed_tasks = None
+            self.assertListEqual(tasks, list(traversed))
+        # The index is not used when most tasks would be returned
+        self.assertIsNone(self.workflow.get_tasks_iterator().indexed_tasks)
+        self.assertIsNotNone(self.workflow.get_tasks_iterator(state=TaskState.READY).indexed_tasks)
+
+class SubtreeStatesTest(IterationTest):
+
+    def assert_states_match_tree(self):
+        for task in self.workflow.get_tasks(depth_first=False):
+            states = task.state
+            for descendant in task:
+                states |= descendant.state
+            self.assertEqual(task._get_subtree_states(), states)
+
+    def test_states_are_updated(self):
+        self.assert_states_match_tree()
+        super().get_tasks_updated_after()
+        self.assert_states_match_tree()
+        self.workflow.reset_from_task_id(self.workflow.get_next_task(spec_name='a').id)
+        self.assert_states_match_tree()
+
+    def test_child_states_are_counted(self):
+        # Count the states of children of every task rather than only those with many children
+        with patch.object(Task, '_max_scanned_children', 0):
+            self.test_states_are_updated()
+        self.assertIsNotNone(self.workflow.task_tree._child_states)
+
+    def test_finished_subtrees_are_skipped(self):
+        super().get_tasks_updated_after()
+        start = self.workflow.get_next_task(end_at_spec='Start')
+        start._set_state(TaskState.COMPLETED)
+        for task in start:
+            task._set_state(TaskState.COMPLETED)
+        self.assertEqual(start._get_subtree_states(), TaskState.COMPLETED)
+        _iter = self.workflow.get_tasks_iterator(state=TaskState.NOT_FINISHED_MASK, depth_first=False)
+        self.assertListEqual(list(_iter), [])
+        self.assertEqual(len(_iter.task_list), 0)
+
+    def test_compiled_filter(self):
+        super().get_tasks_updated_after()
+        task_filter = TaskFilter(state=TaskState.READY, spec_name='b1')
+        matches = task_filter.compile()
+        for task in self.workflow.get_tasks():
+            self.assertEqual(matches(task), task.state == TaskState.READY and task.task_spec.name == 'b1')
+        self.assertTrue(TaskFilter().compile()(self.workflow.task_tree))
+
+    def test_filter_subclass_calls_super(self):
+
+        class ReadyFilter(TaskFilter):
+            def matches(self, task):
+                return task.state == TaskState.READY and super().matches(task)
+
+        super().get_tasks_updated_after()
+        task_filter = ReadyFilter(spec_name='b1')
+        tasks = self.workflow.get_tasks(task_filter=task_filter)
+        self.assertListEqual([t.task_spec.name for t in tasks], ['b1'])
+        self.assertTrue(task_filter.compile()(tasks[0]))
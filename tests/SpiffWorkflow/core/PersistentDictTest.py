@@ -0,0 +1,74 @@
+import random
+from copy import deepcopy
+from unittest import TestCase
+
+from SpiffWorkflow.util.persistent_dict import PersistentDict
+
+
+class CollidingKey:
+
+    def __init__(self, value, hash_value):
+        self.value = value
+        self.hash_value = hash_value
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and self.value == other.value
+
+    def __hash__(self):
+        return self.hash_value
+
+
+class PersistentDictTest(TestCase):
+
+    def testBasicOperations(self):
+        original = PersistentDict({'a': 1, 'b': [1, 2]})
+        updated = original.set('a', 2).set('c', 3)
+        self.assertEqual(original, {'a': 1, 'b': [1, 2]})
+        self.assertEqual(updated, {'a': 2, 'b': [1, 2], 'c': 3})
+        self.assertIs(updated['b'], original['b'])
+        self.assertEqual(len(updated), 3)
+        self.assertEqual(updated.delete('a'), {'b': [1, 2], 'c': 3})
+        self.assertRaises(KeyError, updated.delete, 'x')
+        self.assertEqual(original.update({'d': 4}, e=5), {'a': 1, 'b': [1, 2], 'd': 4, 'e': 5})
+        self.assertIs(original.set('a', 1), original)
+
+    def testSync(self):
+        original = PersistentDict({'a': [1], 'b': [2], 'c': 3})
+        synced = original.sync({'a': [1], 'b': [2, 3], 'd': 4})
+        self.assertEqual(synced, {'a': [1], 'b': [2, 3], 'd': 4})
+        self.assertIs(synced['a'], original['a'])
+        self.assertIs(original.sync({'a': [1], 'b': [2], 'c': 3}), original)
+
+    def testSyncChangedTypes(self):
+        original = PersistentDict({'a': 1, 'b': 1, 'c': [1], 'd': {'x': 1}, 'e': 1.0})
+        synced = original.sync({'a': True, 'b': 1.0, 'c': [True], 'd': {'x': 1.0}, 'e': 1.0})
+        self.assertIs(synced['a'], True)
+        self.assertIs(type(synced['b']), float)
+        self.assertIs(synced['c'][0], True)
+        self.assertIs(type(synced['d']['x']), float)
+        self.assertIs(synced['e'], original['e'])
+
+    def testSyncCopiesValues(self):
+        data = {'a': [1], 'b': {'x': [2]}}
+        original = PersistentDict({'a': [1]})
+        synced = original.sync(data, copy_value=deepcopy)
+        self.assertIs(synced['a'], original['a'])
+        data['b']['x'].append(3)
+        self.assertEqual(synced['b'], {'x': [2]})
+
+    def testRandomOperations(self):
+        rng = random.Random(42)
+        keys = list(range(100)) + [CollidingKey(idx, rng.choice([1, 2, 1 << 40])) for idx in range(20)]
+        expected, current, versions = {}, PersistentDict(), []
+        for _ in range(2000):
+            key = rng.choice(keys)
+            if rng.random() < 0.3 and key in expected:
+                del expected[key]
+                current = current.delete(key)
+            else:
+                expected[key] = rng.randint(0, 5)
+                current = current.set(key, expected[key])
+            self.assertEqual(len(current), len(expected))
+            versions.append((dict(expected), current))
+        for contents, version in versions:
+            self.assertEqual(version, contents)
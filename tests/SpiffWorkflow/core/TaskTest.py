@@ -1,15 +1,32 @@
+import logging
 import unittest
 import re
+from unittest.mock import patch
 
 from SpiffWorkflow.task import Task, TaskState, TaskIterator
+from SpiffWorkflow.workflow import Workflow
 from SpiffWorkflow.specs.WorkflowSpec import WorkflowSpec
 from SpiffWorkflow.specs.Simple import Simple
+from SpiffWorkflow.exceptions import WorkflowException
 
 
 class MockWorkflow:
+
+    _state_hooks = ()
+    _dirty_tasks = None
+    _task_batch = None
+
     def __init__(self, spec):
         self.spec = spec
         self.tasks = {}
+        self._state_index = dict((state, set()) for state in TaskState._values)
+        self._unfinished_task_count = 0
+
+    def _get_subtree_parent(self, task):
+        return task.parent
+
+    def _get_subtree_children(self, task):
+        return task._get_children()
 
 
 class TaskTest(unittest.TestCase):
@@ -73,3 +90,98 @@ class TaskTest(unittest.TestCase):
         self.assertTrue(expected2.match(result),
                         'Expected:\n' + repr(expected2.pattern) + '\n' +
                         'but got:\n' + repr(result))
+
+    def testCachedRelations(self):
+        spec = WorkflowSpec(name='Mock Workflow')
+        workflow = MockWorkflow(spec)
+        root = Task(workflow, Simple(spec, 'Simple 1'))
+        child = root._add_child(Simple(spec, 'Simple 2'))
+        grandchild = child._add_child(Simple(spec, 'Simple 3'))
+        self.assertEqual(grandchild.depth, 2)
+        self.assertListEqual(root.children, [child])
+
+        # Modifying the returned list should not affect the task
+        root.children.append(grandchild)
+        self.assertListEqual(root.children, [child])
+
+        # Reparent the grandchild, the way the serializer sets relations by id
+        grandchild._parent = root.id
+        child._children = []
+        root._children = root._children + [grandchild.id]
+        self.assertIs(grandchild.parent, root)
+        self.assertListEqual(root.children, [child, grandchild])
+        self.assertListEqual(child.children, [])
+        self.assertEqual(grandchild.depth, 1)
+
+        # Moving a subtree updates the depths of its descendants
+        great_grandchild = grandchild._add_child(Simple(spec, 'Simple 4'))
+        self.assertEqual(great_grandchild.depth, 2)
+        grandchild.parent = child
+        self.assertEqual(great_grandchild.depth, 3)
+
+    def testAddChildrenBulk(self):
+        spec = WorkflowSpec(name='Mock Workflow')
+        workflow = MockWorkflow(spec)
+        root = Task(workflow, Simple(spec, 'Simple 1'), state=TaskState.COMPLETED)
+        first = root._add_child(Simple(spec, 'Simple 2'), TaskState.FUTURE)
+        specs = [Simple(spec, f'Simple {idx}') for idx in range(3, 23)]
+        children = root._add_children_bulk(specs, TaskState.WAITING)
+        self.assertListEqual(root.children, [first] + children)
+        self.assertListEqual([child.task_spec for child in children], specs)
+        for child in children:
+            self.assertIs(child.parent, root)
+            self.assertEqual(child.state, TaskState.WAITING)
+            self.assertEqual(child.thread_id, root.thread_id)
+        self.assertEqual(root._get_subtree_states(), TaskState.COMPLETED | TaskState.FUTURE | TaskState.WAITING)
+        self.assertSetEqual(workflow._state_index[TaskState.WAITING], set(child.id for child in children))
+
+        predicted = first._add_child(Simple(spec, 'Simple 23'), TaskState.LIKELY)
+        self.assertRaises(WorkflowException, predicted._add_children_bulk, specs, TaskState.WAITING)
+
+    def testUpdateChildrenBulk(self):
+        spec = WorkflowSpec(name='Mock Workflow', addstart=True)
+        child_spec = Simple(spec, 'Simple 1')
+        spec.start.connect(child_spec)
+        workflow = Workflow(spec)
+        updated, changes = [], []
+        child_spec.update_event.connect(lambda workflow, tasks: updated.append(tasks))
+        workflow.add_state_hook(lambda task, previous, state, timestamp: changes.append(task))
+        root = workflow.task_tree
+        children = root._add_children_bulk([child_spec] * 5, TaskState.FUTURE)
+        with self.assertLogs('spiff.task', level=logging.INFO) as logs:
+            root._update_children_bulk(children)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].getMessage(), 'State changed to READY')
+        self.assertListEqual(logs.records[0].task_ids, [child.id for child in children])
+        self.assertListEqual(updated, [children])
+        self.assertListEqual(changes, children)
+        self.assertIsNone(workflow._task_batch)
+        for child in children:
+            self.assertEqual(child.state, TaskState.READY)
+
+    def testStateNames(self):
+        self.assertEqual(TaskState.get_name(TaskState.READY), 'READY')
+        self.assertEqual(TaskState.get_name(TaskState.FINISHED_MASK), 'FINISHED_MASK')
+        self.assertEqual(TaskState.get_name(TaskState.READY | TaskState.WAITING), 'WAITING|READY')
+        self.assertEqual(TaskState.get_value('ready'), TaskState.READY)
+        self.assertEqual(TaskState.get_value('WAITING|READY'), TaskState.READY | TaskState.WAITING)
+        self.assertEqual(TaskState.get_value('NOT_FINISHED_MASK'), TaskState.NOT_FINISHED_MASK)
+
+    def testLogExtrasAreLazy(self):
+        spec = WorkflowSpec(name='Mock Workflow')
+        workflow = MockWorkflow(spec)
+        task = Task(workflow, Simple(spec, 'Simple 1'), state=TaskState.FUTURE)
+        logger = logging.getLogger('spiff.task')
+        level = logger.level
+        try:
+            with patch.object(Task, 'collect_log_extras', return_value={}) as collect:
+                logger.setLevel(logging.WARNING)
+                task._set_state(TaskState.WAITING)
+                task._set_state(TaskState.WAITING)
+                collect.assert_not_called()
+                logger.setLevel(logging.INFO)
+                task._set_state(TaskState.COMPLETED)
+                task._set_state(TaskState.COMPLETED)
+                self.assertEqual(collect.call_count, 1)
+        finally:
+            logger.setLevel(level)
@@ -58,3 +58,16 @@ class WorkflowTest(unittest.TestCase):
         tasks = self.workflow.get_tasks(state=TaskState.READY)
         self.assertEqual(len(tasks), 1)
         self.assertEqual(tasks[0].task_spec.name, 'synch_1')
+
+    def test_is_completed(self):
+        self.assertFalse(self.workflow.is_completed())
+        # The count of unfinished tasks is kept up to date as tasks are added, run and removed
+        task = self.workflow.get_next_task(state=TaskState.READY)
+        while task is not None:
+            task.run()
+            unfinished = self.workflow.get_tasks(state=TaskState.NOT_FINISHED_MASK)
+            self.assertEqual(self.workflow._unfinished_task_count, len(unfinished))
+            task = self.workflow.get_next_task(state=TaskState.READY)
+        self.assertEqual(self.workflow._unfinished_task_count, 0)
+        self.workflow.completed = False
+        self.assertTrue(self.workflow.is_completed())
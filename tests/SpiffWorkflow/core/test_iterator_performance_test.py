@@ -0,0 +1,167 @@
+"""
+Performance tests for task tree traversal.
+Compares the list based traversal TaskIterator used to have with the current one on 50,000 task trees, and
+measures how much pruning finished subtrees saves when searching mostly completed trees.
+"""
+import time
+import unittest
+
+from SpiffWorkflow import Workflow, TaskState
+from SpiffWorkflow.specs.WorkflowSpec import WorkflowSpec
+from SpiffWorkflow.specs.Simple import Simple
+from SpiffWorkflow.util.task import TaskIterator
+
+
+class LegacyTaskIterator(TaskIterator):
+    """The previous traversal, which copies lists of children and walks parent chains to track depth."""
+
+    def __init__(self, task, **kwargs):
+        super().__init__(task, **kwargs)
+        self.task_list = [task]
+        self.depth = 0
+        self.indexed_tasks = None
+
+    def _next(self):
+
+        if not self.task_list:
+            raise StopIteration()
+
+        task = self.task_list.pop(0)
+        if task._children and \
+            task.state >= self.min_state and \
+            self.depth < self.max_depth and \
+            task.task_spec.name != self.end_at_spec:
+
+            if self.depth_first:
+                self.task_list = task.children + self.task_list
+            else:
+                self.task_list.extend(task.children)
+            self._update_depth(task)
+        elif self.depth_first and self.task_list:
+            self._handle_leaf_depth(task)
+
+        return task
+
+    def _update_depth(self, task):
+
+        if self.depth_first:
+            self.depth += 1
+        else:
+            first, second = task, self.task_list[0]
+            for i in range(self.depth):
+                first = first.parent if first is not None else None
+                second = second.parent if second is not None else None
+            if first != second:
+                self.depth += 1
+
+    def _handle_leaf_depth(self, task):
+
+        ancestor = self.task_list[0].parent
+        current = task.parent
+        while current is not None and current != ancestor:
+            current = current.parent
+            self.depth -= 1
+
+
+class UnprunedTaskIterator(TaskIterator):
+    """Traversal that visits every subtree, regardless of the states it contains."""
+
+    def _pop(self):
+        if not self.task_list:
+            raise StopIteration()
+        return self.task_list.pop() if self.depth_first else self.task_list.popleft()
+
+
+class IteratorPerformanceTest(unittest.TestCase):
+    """
+    Measure traversal of wide and deep trees of 50,000 tasks.
+    """
+
+    def _create_workflow(self, count, width):
+        """
+        Create a workflow whose task tree has the given number of tasks.
+
+        Args:
+            count: Number of tasks to add
+            width: Number of children of each branch task (1 creates a single chain)
+
+        Returns:
+            Workflow instance containing the tree
+        """
+        spec = WorkflowSpec(name='Performance Test', addstart=True)
+        task_spec = Simple(spec, 'Simple')
+        spec.start.connect(task_spec)
+        workflow = Workflow(spec)
+        workflow.task_tree._set_state(TaskState.COMPLETED)
+        parents = [workflow.task_tree]
+        while len(workflow.tasks) < count:
+            parent = parents.pop(0)
+            for _ in range(min(width, count - len(workflow.tasks))):
+                parents.append(parent._add_child(task_spec, TaskState.COMPLETED))
+        return workflow
+
+    def _measure(self, workflow, **kwargs):
+        start = time.time()
+        legacy = list(LegacyTaskIterator(workflow.task_tree, **kwargs))
+        legacy_time = time.time() - start
+
+        start = time.time()
+        current = list(TaskIterator(workflow.task_tree, **kwargs))
+        current_time = time.time() - start
+
+        self.assertListEqual(current, legacy)
+        return len(current), legacy_time, current_time
+
+    def test_performance_50000_tasks(self):
+        """Measure depth first and breadth first traversal of 50,000 tasks."""
+        print("\n" + "="*80)
+        print("ITERATOR PERFORMANCE TEST")
+        print("="*80)
+        for name, width in [
+            ('flat (one parent)', 50000),
+            ('wide (10 children per task)', 10),
+            ('deep (a single chain)', 1),
+        ]:
+            workflow = self._create_workflow(50000, width)
+            print(f"  50000 tasks, {name}:")
+            for order, depth_first in [('Depth first', True), ('Breadth first', False)]:
+                if depth_first or width > 1:
+                    count, legacy_time, current_time = self._measure(
+                        workflow, depth_first=depth_first, max_depth=100000)
+                    print(f"    {order + ':':15s} {legacy_time:.6f} seconds (list based), "
+                          f"{current_time:.6f} seconds (deque), {count} tasks")
+        print("="*80)
+
+    def test_finished_subtrees_50000_tasks(self):
+        """Measure searches for unfinished tasks in a tree of 50,000 tasks where only a few are unfinished."""
+        print("\n" + "="*80)
+        print("SUBTREE PRUNING PERFORMANCE TEST")
+        print("="*80)
+        workflow = self._create_workflow(50000, 10)
+        leaves = [task for task in workflow.get_tasks() if not task._children]
+        for task in leaves[::5000]:
+            task._set_state(TaskState.READY)
+        print(f"  50000 tasks, {len(leaves[::5000])} ready:")
+        for name, kwargs in [
+            ('Ready', {'state': TaskState.READY}),
+            ('Unfinished', {'state': TaskState.NOT_FINISHED_MASK}),
+            ('Ready by name', {'state': TaskState.READY, 'spec_name': 'Simple'}),
+        ]:
+            start = time.time()
+            unpruned = list(UnprunedTaskIterator(workflow.task_tree, depth_first=False, **kwargs))
+            unpruned_time = time.time() - start
+
+            start = time.time()
+            pruned = list(TaskIterator(workflow.task_tree, depth_first=False, **kwargs))
+            pruned_time = time.time() - start
+
+            self.assertListEqual(pruned, unpruned)
+            print(f"    {name + ':':15s} {unpruned_time:.6f} seconds (all subtrees), "
+                  f"{pruned_time:.6f} seconds (pruned), {len(pruned)} tasks")
+
+        for task in leaves[::5000]:
+            task._set_state(TaskState.COMPLETED)
+        start = time.time()
+        self.assertTrue(workflow.is_completed())
+        print(f"    {'Completed:':15s} {time.time() - start:.6f} seconds")
+        print("="*80)
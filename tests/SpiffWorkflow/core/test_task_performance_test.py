@@ -0,0 +1,103 @@
+"""
+Micro-benchmarks for navigating a large task tree.
+Compares cached parent/children/depth resolution with resolving ids through the workflow's task dict.
+"""
+import time
+import unittest
+
+from SpiffWorkflow import Workflow
+from SpiffWorkflow.specs.WorkflowSpec import WorkflowSpec
+from SpiffWorkflow.specs.Simple import Simple
+
+
+class TaskPerformanceTest(unittest.TestCase):
+    """
+    Measure tree navigation on a tree of 10,000 tasks.
+    """
+
+    def _create_workflow_with_task_count(self, count, width=10):
+        """
+        Create a workflow whose task tree has the given number of tasks.
+
+        Args:
+            count: Number of tasks to add
+            width: Number of children of each branch task
+
+        Returns:
+            Workflow instance containing the tree
+        """
+        spec = WorkflowSpec(name='Performance Test', addstart=True)
+        task_spec = Simple(spec, 'Simple')
+        spec.start.connect(task_spec)
+        workflow = Workflow(spec)
+        parents = [workflow.task_tree]
+        while len(workflow.tasks) < count:
+            parent = parents.pop(0)
+            for _ in range(min(width, count - len(workflow.tasks))):
+                parents.append(parent._add_child(task_spec))
+        return workflow
+
+    def _uncached_children(self, task):
+        return [task.workflow.tasks.get(child) for child in task._children]
+
+    def _uncached_depth(self, task):
+        depth = 0
+        parent = task.workflow.tasks.get(task._parent)
+        while parent is not None:
+            depth += 1
+            parent = parent.workflow.tasks.get(parent._parent)
+        return depth
+
+    def test_performance_10000_tasks(self):
+        """Measure children, parent and depth access on 10,000 tasks."""
+        workflow = self._create_workflow_with_task_count(10000)
+        tasks = list(workflow.tasks.values())
+        self.assertEqual(len(tasks), 10000)
+
+        # Make sure the caches are populated before measuring
+        self.assertListEqual([task.depth for task in tasks], [self._uncached_depth(task) for task in tasks])
+
+        start = time.time()
+        for task in tasks:
+            self._uncached_children(task)
+        uncached_children_time = time.time() - start
+
+        start = time.time()
+        for task in tasks:
+            task.children
+        children_time = time.time() - start
+
+        start = time.time()
+        for task in tasks:
+            self._uncached_depth(task)
+        uncached_depth_time = time.time() - start
+
+        start = time.time()
+        for task in tasks:
+            task.depth
+        depth_time = time.time() - start
+
+        start = time.time()
+        for task in tasks:
+            parent = task
+            while parent is not None:
+                parent = parent.parent
+        parent_time = time.time() - start
+
+        start = time.time()
+        count = len(list(workflow.task_tree))
+        iteration_time = time.time() - start
+        self.assertEqual(count, 10000)
+
+        # Print results
+        print("\n" + "="*80)
+        print("TASK TREE PERFORMANCE TEST")
+        print("="*80)
+        print("  10000 tasks:")
+        print(f"    Children (dict lookups): {uncached_children_time:.6f} seconds")
+        print(f"    Children (cached):       {children_time:.6f} seconds")
+        print(f"    Depth (dict lookups):    {uncached_depth_time:.6f} seconds")
+        print(f"    Depth (cached):          {depth_time:.6f} seconds")
+        print(f"    Walk to root (cached):   {parent_time:.6f} seconds")
+        print(f"    Iterate tree:            {iteration_time:.6f} seconds")
+        print("="*80)
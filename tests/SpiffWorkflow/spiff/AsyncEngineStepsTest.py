@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.bpmn.exceptions import WorkflowTaskException
+from SpiffWorkflow.bpmn.script_engine import PythonScriptEngine, TaskDataEnvironment
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from .BaseTestCase import BaseTestCase
+
+
+class FakeService:
+    """A local stand-in for a network service that records how many requests it is handling at once."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.requests = []
+
+    async def lookup(self, key):
+        self.requests.append(key)
+        self.active += 1
+        self.max_active = max(self.active, self.max_active)
+        try:
+            await asyncio.sleep(self.delay)
+            if key == 'error':
+                raise ConnectionError('service unavailable')
+            elif key == 'cancel':
+                raise asyncio.CancelledError()
+            return {'key': key}
+        finally:
+            self.active -= 1
+
+
+class AsyncServiceEnvironment(TaskDataEnvironment):
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    async def call_service(self, context, operation_name, operation_params):
+        result = await self.service.lookup(operation_params['key']['value'])
+        return json.dumps(result)
+
+
+class AsyncEngineStepsTest(BaseTestCase):
+
+    def setUp(self):
+        spec, subprocesses = self.load_workflow_spec('parallel_service_tasks.bpmn', 'parallel_service_tasks')
+        self.service = FakeService()
+        script_engine = PythonScriptEngine(environment=AsyncServiceEnvironment(self.service))
+        self.workflow = BpmnWorkflow(spec, subprocesses, script_engine=script_engine)
+
+    def assertCompleted(self):
+        self.assertTrue(self.workflow.completed)
+        self.assertListEqual(self.workflow.get_tasks(state=TaskState.STARTED), [])
+        self.assertListEqual(self.workflow.service_calls.pending, [])
+        self.assertDictEqual(self.workflow.data, {'c': 1, 'result_a': {'key': 'a'}, 'result_b': {'key': 'b'}})
+
+    def testServiceCallsRunConcurrently(self):
+        asyncio.run(self.workflow.async_do_engine_steps())
+        self.assertCompleted()
+        self.assertEqual(self.service.max_active, 2)
+
+    def testConcurrencyLimit(self):
+        asyncio.run(self.workflow.async_do_engine_steps(max_concurrency=1))
+        self.assertCompleted()
+        self.assertEqual(self.service.max_active, 1)
+        self.assertCountEqual(self.service.requests, ['a', 'b'])
+
+    def testCallbacks(self):
+        states = []
+        asyncio.run(self.workflow.async_do_engine_steps(
+            did_complete_task=lambda t: states.append((t.task_spec.name, t.state))
+        ))
+        self.assertCompleted()
+        # Service tasks are STARTED when they run, as they are with the synchronous engine
+        self.assertIn(('service_a', TaskState.STARTED), states)
+        self.assertIn(('script', TaskState.COMPLETED), states)
+
+    def testSynchronousEngineSteps(self):
+        self.workflow.do_engine_steps()
+        self.assertCompleted()
+        self.assertEqual(self.service.max_active, 1)
+
+    def testSynchronousEngineStepsInEventLoop(self):
+
+        async def run():
+            self.workflow.do_engine_steps()
+
+        with self.assertRaises(WorkflowTaskException) as ctx:
+            asyncio.run(run())
+        self.assertIn('async_do_engine_steps', str(ctx.exception))
+        self.assertEqual(self.service.requests, [])
+
+    def testServiceCallError(self):
+        self.workflow.spec.task_specs['service_b'].operation_params['key']['value'] = "'error'"
+        with self.assertRaises(WorkflowTaskException) as ctx:
+            asyncio.run(self.workflow.async_do_engine_steps())
+        self.assertEqual(ctx.exception.error_type, 'ConnectionError')
+        self.assertEqual(self.workflow.get_next_task(spec_name='service_b').state, TaskState.ERROR)
+
+    def testCancelledServiceCall(self):
+        self.workflow.spec.task_specs['service_b'].operation_params['key']['value'] = "'cancel'"
+        with self.assertRaises(WorkflowTaskException):
+            asyncio.run(self.workflow.async_do_engine_steps())
+        self.assertEqual(self.workflow.get_next_task(spec_name='service_b').state, TaskState.ERROR)
+        self.assertNotIn(self.workflow.get_next_task(spec_name='service_b').id, self.workflow.service_calls.pending)
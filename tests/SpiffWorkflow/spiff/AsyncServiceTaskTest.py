@@ -0,0 +1,100 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from SpiffWorkflow import TaskState
+from SpiffWorkflow.operators import Assign
+from SpiffWorkflow.bpmn.exceptions import WorkflowTaskException
+from SpiffWorkflow.bpmn.script_engine import PythonScriptEngine, TaskDataEnvironment
+from SpiffWorkflow.bpmn.workflow import BpmnWorkflow
+from .BaseTestCase import BaseTestCase
+
+
+class FakeServiceEnvironment(TaskDataEnvironment):
+
+    def __init__(self):
+        super().__init__()
+        self.release = Event()
+        self.contexts = []
+
+    def call_service(self, context, operation_name, operation_params):
+        self.release.wait(5)
+        self.contexts.append(context)
+        key = operation_params['key']['value']
+        if key == 'error':
+            raise ValueError('lookup failed')
+        return json.dumps({'key': key})
+
+
+class AsyncServiceTaskTest(BaseTestCase):
+
+    def setUp(self):
+        spec, subprocesses = self.load_workflow_spec('parallel_service_tasks.bpmn', 'parallel_service_tasks')
+        self.environment = FakeServiceEnvironment()
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        script_engine = PythonScriptEngine(environment=self.environment, service_executor=self.executor)
+        self.workflow = BpmnWorkflow(spec, subprocesses, script_engine=script_engine)
+
+    def tearDown(self):
+        self.environment.release.set()
+        self.executor.shutdown()
+
+    def testServiceTasksAreStarted(self):
+        self.workflow.do_engine_steps()
+        # The calls don't block the other branch
+        self.assertEqual(self.workflow.get_next_task(spec_name='script').state, TaskState.COMPLETED)
+        service_tasks = self.workflow.get_tasks(state=TaskState.STARTED)
+        self.assertEqual(len(service_tasks), 2)
+        self.assertCountEqual(self.workflow.service_calls.pending, [t.id for t in service_tasks])
+        self.assertListEqual(self.workflow.complete_service_tasks(), [])
+
+        self.environment.release.set()
+        completed = []
+        while len(completed) < 2:
+            completed.extend(self.workflow.complete_service_tasks(wait=True, timeout=5))
+        self.assertCountEqual(completed, service_tasks)
+        self.workflow.do_engine_steps()
+        self.assertTrue(self.workflow.completed)
+        self.assertDictEqual(self.workflow.data, {'c': 1, 'result_a': {'key': 'a'}, 'result_b': {'key': 'b'}})
+
+    def testServiceCallDataIsCopied(self):
+        self.workflow.get_next_task(state=TaskState.READY).data['items'] = [1]
+        self.workflow.do_engine_steps()
+        for task in self.workflow.get_tasks(state=TaskState.STARTED):
+            task.data['items'].append(2)
+        self.environment.release.set()
+        completed = []
+        while len(completed) < 2:
+            completed.extend(self.workflow.complete_service_tasks(wait=True, timeout=5))
+        self.assertListEqual([context['items'] for context in self.environment.contexts], [[1], [1]])
+
+    def testPostAssignmentsWaitForResult(self):
+        self.workflow.spec.task_specs['service_b'].post_assign = [Assign('copied', right_attribute='result_b')]
+        self.workflow.do_engine_steps()
+        task = self.workflow.get_next_task(spec_name='service_b')
+        self.assertNotIn('copied', task.data)
+        self.environment.release.set()
+        completed = []
+        while len(completed) < 2:
+            completed.extend(self.workflow.complete_service_tasks(wait=True, timeout=5))
+        self.assertDictEqual(task.data['copied'], {'key': 'b'})
+
+    def testServiceTaskError(self):
+        self.workflow.spec.task_specs['service_b'].operation_params['key']['value'] = "'error'"
+        self.environment.release.set()
+        self.workflow.do_engine_steps()
+        task = self.workflow.get_next_task(spec_name='service_b')
+        self.executor.shutdown()
+        with self.assertRaises(WorkflowTaskException) as ctx:
+            self.workflow.complete_service_tasks()
+        self.assertEqual(ctx.exception.error_type, 'ValueError')
+        self.assertEqual(task.state, TaskState.ERROR)
+
+    def testSynchronousServiceTasks(self):
+        self.workflow.script_engine.service_executor = None
+        self.workflow.spec.task_specs['service_b'].post_assign = [Assign('copied', right_attribute='result_b')]
+        self.environment.release.set()
+        self.workflow.do_engine_steps()
+        self.assertTrue(self.workflow.completed)
+        self.assertEqual(self.workflow.data['result_b'], {'key': 'b'})
+        self.assertEqual(self.workflow.data['copied'], {'key': 'b'})